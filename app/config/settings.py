@@ -9,6 +9,111 @@ class Settings(BaseSettings):
     firebase_db_url: str
     firebase_service_account: str = "firebase_service.json"
     port: int = 8000
+    log_level: str = "INFO"  # DEBUG adds per-request fetch/generation detail and stage timings
+    
+    # Backends: "fake" swaps in offline stand-ins (app/services/fakes.py) for benchmarks
+    firebase_backend: str = "firebase"  # firebase | fake
+    gemini_backend: str = "gemini"  # gemini | fake
+    fake_history_size: int = 1000  # generated gaitData samples
+    fake_read_latency: float = 0.02  # seconds per database read
+    fake_generation_latency: float = 0.5  # seconds per model reply
+    fake_stream_chunks: int = 8  # chunks per streamed reply
+    fake_slow_fraction: float = 0.0  # share of fake replies that take 10x longer (tail latency)
+    
+    # Startup: fill caches and open connections before reporting ready on /api/chat/ready
+    warmup_enabled: bool = True
+    
+    # Thread pool for blocking SDK calls (Firebase Admin has no async API)
+    blocking_io_workers: int = 32
+    
+    # Firebase reads
+    firebase_bounded_reads: bool = True  # limit-to-last query instead of downloading all of gaitData
+    firebase_latest_window: int = 1  # number of newest samples fetched per bounded read
+    
+    # Read cache shared by concurrent requests
+    firebase_cache_mode: str = "swr"  # off | ttl | swr (stale-while-revalidate)
+    firebase_cache_ttl: float = 2.0  # seconds a fetched value counts as fresh
+    firebase_cache_max_stale: float = 30.0  # seconds past the TTL a stale value may still be served
+    
+    # Live snapshot (streaming listener instead of per-request reads)
+    firebase_live_snapshot: bool = False
+    firebase_snapshot_max_staleness: float = 0  # seconds; 0 serves the snapshot however old
+    firebase_listener_check_seconds: float = 5
+    firebase_listener_retry_seconds: float = 1
+    firebase_listener_max_backoff_seconds: float = 60
+    
+    # Transports: connection reuse and per-call deadlines
+    firebase_pool_size: int = 32  # keep-alive HTTPS connections to the database (>= blocking_io_workers)
+    firebase_http_timeout: float = 10.0  # seconds per database request
+    tcp_keepalive: bool = True  # TCP keep-alive probes on pooled HTTPS connections
+    gemini_transport: str = "grpc"  # grpc (async, multiplexed channels) | rest (pooled HTTPS on the blocking pool)
+    gemini_channels: int = 1  # gRPC channels shared round-robin; each multiplexes many calls
+    gemini_keepalive_seconds: float = 30  # gRPC keep-alive ping interval on idle channels
+    gemini_timeout: float = 60.0  # seconds per model call
+    
+    # WebSocket feed (/api/chat/ws): one shared read per change, fanned out to all clients
+    ws_poll_interval: float = 2.0  # seconds between shared reads when no live snapshot pushes changes
+    ws_max_pending: int = 32  # queued messages per client before its backlog collapses into one snapshot
+    gait_data_max_wait: float = 30.0  # longest GET /gait-data?wait= long-poll, in seconds (same shared feed)
+    
+    # Sensor ingest (/api/gait/ingest): buffered, batched writes to gaitData
+    ingest_enabled: bool = False  # opt-in write endpoint; stays off unless ingest_token is set too
+    ingest_token: Optional[str] = None  # shared secret sensors send in the X-Ingest-Token header
+    ingest_batch_size: int = 500  # samples per multi-path update; a full batch is written right away
+    ingest_flush_interval: float = 0.5  # seconds a partial batch may wait before it is written
+    ingest_max_concurrent_writes: int = 4  # multi-path updates in flight at once
+    ingest_max_pending: int = 10000  # samples buffered or being written before batches get a 429
+    ingest_max_request_samples: int = 1000  # samples accepted per request
+    
+    # Multi-worker serving (python -m app.main --workers N): one refresher process reads Firebase for all workers
+    shared_snapshot_path: Optional[str] = None  # set by the launcher; workers then read gait data from this memory-mapped file
+    shared_snapshot_size: int = 65536  # bytes reserved for the serialized snapshot
+    shared_snapshot_interval: float = 1.0  # seconds between refresher reads and heartbeats when no live snapshot pushes changes
+    shared_snapshot_max_age: float = 10.0  # seconds without a refresher heartbeat before workers read Firebase themselves
+    shared_snapshot_poll: float = 0.05  # seconds between a worker's version checks for change notifications
+    shared_snapshot_startup_wait: float = 10.0  # seconds a starting worker waits for the refresher's first write
+    
+    # Rolling statistics over the newest samples (kept in memory)
+    rolling_stats_enabled: bool = True
+    rolling_window: int = 200
+    
+    # Local columnar history (memory-mapped files) behind /api/chat/gait-data/history
+    history_store_enabled: bool = True
+    history_store_dir: str = "gait_history"
+    history_sync_interval: float = 30.0  # seconds between incremental pulls from gaitData
+    history_sync_page_size: int = 1000
+    
+    # Daily/weekly rollups under gaitRollups, cited in the prompt as long-term trends
+    rollups_enabled: bool = False  # opt-in: the job writes gaitRollups, so enable it on one deployment only
+    rollup_interval: float = 300.0  # seconds between incremental runs
+    rollup_page_size: int = 1000  # samples read per page
+    rollup_timezone: str = "UTC"  # where days and ISO weeks begin
+    rollup_trend_days: int = 7  # newest daily summaries in the prompt
+    rollup_trend_weeks: int = 4  # newest weekly summaries in the prompt
+    
+    # Gemini
+    gemini_model: str = "gemini-1.5-flash"  # gemini-pro / gemini-1.0-pro take no system instruction, so the guidance goes inline
+    gemini_max_concurrent: int = 16  # generations in flight at once, per worker process (N workers allow N x this)
+    gemini_max_queue: int = 64  # requests allowed to wait for a slot, per worker; beyond this they get a 429
+    gemini_queue_timeout: float = 10.0  # seconds a request may wait for a slot
+    gemini_max_retries: int = 3  # retries on rate-limit errors
+    gemini_retry_base_delay: float = 0.5
+    gemini_retry_max_delay: float = 8.0
+    chat_deadline: float = 30.0  # seconds a chat request may take end to end; requests may ask for less
+    gemini_hedge_model: Optional[str] = None  # faster model raced against a slow primary, e.g. gemini-1.5-flash-8b
+    gemini_hedge_delay: float = 2.0  # seconds without a first token before the hedge is sent
+    batch_max_questions: int = 20  # questions accepted by /api/chat/batch
+    fast_path_enabled: bool = True  # answer pure metric lookups without calling the model
+    response_cache_size: int = 512  # cached replies, per worker process; 0 disables the response cache
+    response_cache_ttl: float = 300.0  # seconds a cached reply may be reused
+    
+    # Conversation sessions
+    session_backend: str = "memory"  # memory (per process) | firebase (chatSessions node, needed with --workers > 1)
+    session_max_sessions: int = 1000  # in-memory sessions kept before LRU eviction
+    history_token_budget: int = 800  # recent messages sent to the model
+    history_summary_token_budget: int = 200  # running summary of older turns
+    prompt_token_budget: int = 3000  # estimated input tokens per prompt; history, then the question, is trimmed to fit (0: no limit)
+    prompt_min_question_tokens: int = 256  # a long question is never cut below this
     
     model_config = SettingsConfigDict(
         env_file=".env",
@@ -0,0 +1,47 @@
+from fastapi import HTTPException, Request
+from starlette.requests import HTTPConnection
+from app.services.session_store import SessionStore
+from app.services.startup import ServiceContainer, ServiceUnavailable
+
+
+def get_container(request: HTTPConnection) -> ServiceContainer:
+    return request.app.state.services
+
+
+async def _wait_for_services(container: ServiceContainer):
+    try:
+        await container.wait_for_services()
+    except ServiceUnavailable as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+
+async def get_firebase_service(request: Request):
+    """FirebaseService of the running app, once it has been built"""
+    container = get_container(request)
+    await _wait_for_services(container)
+    return container.firebase_service
+
+
+async def get_gemini_service(request: Request):
+    """GeminiService of the running app, once it has been built"""
+    container = get_container(request)
+    await _wait_for_services(container)
+    return container.gemini_service
+
+
+async def get_gait_broadcaster(request: Request):
+    """Shared gait data feed of the running app, once the services have been built"""
+    container = get_container(request)
+    await _wait_for_services(container)
+    return container.broadcaster
+
+
+async def get_ingest_buffer(request: Request):
+    """Ingest buffer of the running app (None when ingest is disabled), once the services have been built"""
+    container = get_container(request)
+    await _wait_for_services(container)
+    return container.ingest
+
+
+def get_session_store(request: HTTPConnection) -> SessionStore:
+    return get_container(request).session_store
@@ -1,15 +1,38 @@
+import logging
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from app.routers import chat
+from fastapi.responses import ORJSONResponse, PlainTextResponse
+from app.routers import chat, gait
 from app.config.settings import get_settings
+from app.services.executor import shutdown_blocking_executor
+from app.services.metrics import REGISTRY, CONTENT_TYPE
+from app.services.startup import ServiceContainer
 
 settings = get_settings()
 
+logging.basicConfig(
+    level=settings.log_level.upper(),
+    format="%(asctime)s %(levelname)s %(name)s: %(message)s"
+)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Build services in the background so the server accepts connections immediately"""
+    services = ServiceContainer()
+    app.state.services = services
+    services.start()
+    yield
+    await services.stop()
+    shutdown_blocking_executor()
+
 # Create FastAPI app
 app = FastAPI(
     title="Gait Analysis Chatbot API",
     description="AI-powered chatbot for gait analysis using Gemini AI",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse
 )
 
 # Configure CORS
@@ -23,6 +46,7 @@ app.add_middleware(
 
 # Include routers
 app.include_router(chat.router)
+app.include_router(gait.router)
 
 @app.get("/")
 async def root():
@@ -30,9 +54,25 @@ async def root():
     return {
         "message": "Gait Analysis Chatbot API",
         "docs": "/docs",
-        "health": "/api/chat/health"
+        "health": "/api/chat/health",
+        "ready": "/api/chat/ready"
     }
 
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Prometheus metrics: per-stage latency, errors, prompt/response size and tokens"""
+    return PlainTextResponse(REGISTRY.render(), media_type=CONTENT_TYPE)
+
 if __name__ == "__main__":
-    import uvicorn
-    uvicorn.run("app.main:app", host="0.0.0.0", port=settings.port, reload=True)
\ No newline at end of file
+    import argparse
+    parser = argparse.ArgumentParser(description="Run the gait analysis chatbot API")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="production mode: worker processes sharing one gait data refresher (no auto-reload)")
+    args = parser.parse_args()
+    
+    if args.workers > 1:
+        from app.services.shared_snapshot import serve_workers
+        serve_workers(args.workers, host="0.0.0.0", port=settings.port)
+    else:
+        import uvicorn
+        uvicorn.run("app.main:app", host="0.0.0.0", port=settings.port, reload=True)
\ No newline at end of file
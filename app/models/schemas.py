@@ -1,5 +1,134 @@
+import math
+from dataclasses import dataclass
 from pydantic import BaseModel
-from typing import List, Optional
+from typing import Any, Dict, List, Optional, Tuple
+
+# (attribute, Firebase field) of each sensor value in a gaitData entry
+GAIT_SAMPLE_FIELDS: Tuple[Tuple[str, str], ...] = (
+    ('steps', 'steps'),
+    ('cadence', 'cadence'),
+    ('walking_speed', 'walkingSpeed'),
+    ('stride_length', 'strideLength'),
+    ('step_width', 'stepWidth'),
+    ('equilibrium_score', 'equilibriumScore'),
+    ('postural_sway', 'posturalSway'),
+    ('frequency', 'frequency'),
+    ('gait_cycle_phase_mean', 'gaitCyclePhaseMean'),
+    ('timestamp', 'timestamp'),
+)
+
+# Counters rather than measurements
+INTEGER_FIELDS = ('steps', 'timestamp')
+
+def _number(raw: Dict, field: str) -> Optional[float]:
+    """A finite float from a Firebase value (numeric strings included); ValueError otherwise"""
+    value = raw.get(field)
+    if value is None:
+        return None
+    if isinstance(value, bool):
+        raise ValueError(f"{field}: expected a number, got {value!r}")
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"{field}: expected a number, got {value!r}") from None
+    if not math.isfinite(number):
+        raise ValueError(f"{field}: expected a finite number, got {value!r}")
+    return number
+
+@dataclass(frozen=True, slots=True)
+class GaitSample:
+    """One sensor sample, validated and coerced once when it enters the service"""
+    steps: Optional[int] = None
+    cadence: Optional[float] = None
+    walking_speed: Optional[float] = None
+    stride_length: Optional[float] = None
+    step_width: Optional[float] = None
+    equilibrium_score: Optional[float] = None
+    postural_sway: Optional[float] = None
+    frequency: Optional[float] = None
+    gait_cycle_phase_mean: Optional[float] = None
+    timestamp: Optional[int] = None
+    
+    @classmethod
+    def from_firebase(cls, raw, errors: Optional[List[str]] = None) -> "GaitSample":
+        """Parse a gaitData entry; ValueError if it is not an object
+
+        An invalid field raises too, unless an `errors` list is given: then
+        the field is left None and its message appended to the list.
+        """
+        if not isinstance(raw, dict):
+            raise ValueError(f"expected an object, got {type(raw).__name__}")
+        
+        values = {}
+        for attribute, field in GAIT_SAMPLE_FIELDS:
+            try:
+                number = _number(raw, field)
+                if number is not None and attribute in INTEGER_FIELDS:
+                    if number < 0:
+                        raise ValueError(f"{field}: must not be negative, got {number:g}")
+                    number = int(number)
+            except ValueError as e:
+                if errors is None:
+                    raise
+                errors.append(str(e))
+                number = None
+            values[attribute] = number
+        return cls(**values)
+    
+    def to_dict(self) -> Dict:
+        """The sample under its Firebase field names, as the API returns it"""
+        return {
+            field: value for attribute, field in GAIT_SAMPLE_FIELDS
+            if (value := getattr(self, attribute)) is not None
+        }
+
+@dataclass(frozen=True, slots=True)
+class GaitAverages:
+    """Average gait score and classification from the average_scores node"""
+    avg_gait_score: float = 0.0
+    classification: str = "Unknown"
+    
+    @classmethod
+    def from_firebase(cls, raw, errors: Optional[List[str]] = None) -> "GaitAverages":
+        """Pick the fields the chatbot uses (the 100-sample score stands in for a missing 20-sample one)
+
+        `errors` works as for GaitSample.from_firebase; an invalid score counts as missing.
+        """
+        if not isinstance(raw, dict):
+            raise ValueError(f"expected an object, got {type(raw).__name__}")
+        
+        score = 0.0
+        for field in ('avgGaitScoreLast20', 'avgGaitScoreLast100'):
+            try:
+                score = _number(raw, field)
+            except ValueError as e:
+                if errors is None:
+                    raise
+                errors.append(str(e))
+                score = None
+            if score:
+                break
+        score = score or 0.0
+        classification = raw.get('avgClassificationLast20') or "Unknown"
+        return cls(avg_gait_score=score, classification=str(classification))
+    
+    def to_dict(self) -> Dict:
+        return {
+            'avgGaitScoreLast20': self.avg_gait_score,
+            'avgClassificationLast20': self.classification
+        }
+
+def gait_payload(gait_data: Dict) -> Dict:
+    """A get_all_data() result as plain JSON-ready dicts"""
+    return {
+        name: value.to_dict() if isinstance(value, (GaitSample, GaitAverages)) else value
+        for name, value in gait_data.items()
+    }
+
+def gait_summary(gait_data: Dict) -> Optional[Dict]:
+    """The current sample for a response's gait_data_summary"""
+    current = gait_data.get("current")
+    return current.to_dict() if current else None
 
 class Message(BaseModel):
     """Single chat message"""
@@ -10,13 +139,87 @@ class ChatRequest(BaseModel):
     """Request body for chat endpoint"""
     message: str
     conversation_history: Optional[List[Message]] = []
+    session_id: Optional[str] = None  # server-side history; an unknown id starts a new session under a fresh id, seeded with conversation_history
+    timeout: Optional[float] = None  # seconds for the whole request; capped at the server's CHAT_DEADLINE
+
+class TokenUsage(BaseModel):
+    """Token accounting for one reply"""
+    source: str = "model"  # model | fast_path | cache (the last two call no model and cost no tokens) | error (a fallback reply)
+    input_tokens: int = 0
+    output_tokens: int = 0
+    estimated: bool = False  # counted locally because the model reported no usage metadata
+    prompt_sections: Dict[str, int] = {}  # estimated tokens per prompt section, after trimming
+    trimmed: Dict[str, int] = {}  # prompt parts dropped or cut to fit the input budget
 
 class ChatResponse(BaseModel):
     """Response from chat endpoint"""
     response: str
-    gait_data_summary: Optional[dict] = None
+    gait_data_summary: Optional[Dict[str, float]] = None  # GaitSample.to_dict() of the current sample
+    session_id: Optional[str] = None
+    usage: Optional[TokenUsage] = None
+
+class BatchChatRequest(BaseModel):
+    """Request body for the batch chat endpoint"""
+    questions: List[str]
+    conversation_history: Optional[List[Message]] = []
+    session_id: Optional[str] = None  # read for context; batch answers are not added to it
+    timeout: Optional[float] = None  # seconds for the whole batch; capped at the server's CHAT_DEADLINE
+
+class BatchAnswer(BaseModel):
+    """Result for one question of a batch"""
+    question: str
+    response: Optional[str] = None
+    error: Optional[str] = None
+
+class BatchChatResponse(BaseModel):
+    """Response from the batch chat endpoint"""
+    results: List[BatchAnswer]
+    gait_data_summary: Optional[Dict[str, float]] = None
 
 class HealthResponse(BaseModel):
     """Health check response"""
     status: str
-    message: str
\ No newline at end of file
+    message: str
+
+class ReadinessResponse(BaseModel):
+    """Readiness, with how long each startup phase took (seconds)"""
+    ready: bool
+    error: Optional[str] = None
+    uptime_seconds: float
+    phases: Dict[str, float] = {}
+
+class SnapshotStatus(BaseModel):
+    """State of the live gait snapshot"""
+    enabled: bool
+    version: int = 0
+    latest_key: Optional[str] = None
+    connected: bool = False
+    updated_at: Optional[float] = None
+    staleness_seconds: Optional[float] = None
+
+class CacheStats(BaseModel):
+    """Counters of one read cache"""
+    mode: str
+    ttl: float
+    hits: int
+    stale_hits: int
+    misses: int
+    refreshes: int
+    errors: int
+    age_seconds: Optional[float] = None
+
+class IngestRequest(BaseModel):
+    """Request body for the ingest endpoint: sensor samples under their Firebase field names"""
+    samples: List[Any]  # validated one by one, so a bad sample does not fail the batch
+
+class IngestError(BaseModel):
+    """Why one sample of an ingest batch was rejected"""
+    index: int
+    error: str
+
+class IngestResponse(BaseModel):
+    """Keys assigned to the accepted samples (in request order) and the rejected ones"""
+    accepted: int
+    keys: List[str]
+    rejected: List[IngestError] = []
+    pending: int  # samples this server has buffered but not yet written
@@ -1,55 +1,438 @@
-from fastapi import APIRouter, HTTPException
-from app.models.schemas import ChatRequest, ChatResponse, HealthResponse
-from app.services.firebase_service import FirebaseService
-from app.services.gemini_service import GeminiService
+from contextlib import aclosing
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response, WebSocket, WebSocketDisconnect
+from fastapi.responses import JSONResponse, ORJSONResponse, StreamingResponse
+from pydantic import ValidationError
+from typing import Awaitable, Callable, Dict, Optional
+import asyncio
+import logging
+import orjson
+from app.models.schemas import (
+    ChatRequest, ChatResponse, BatchChatRequest, BatchChatResponse,
+    HealthResponse, ReadinessResponse, SnapshotStatus, CacheStats, TokenUsage, gait_summary
+)
+from app.dependencies import (
+    get_container, get_firebase_service, get_gait_broadcaster, get_gemini_service, get_session_store
+)
+from app.services.admission import OverloadedError
+from app.services.deadlines import DeadlineExceeded, deadline_after
+from app.services.executor import run_blocking
+from app.services.gait_broadcaster import GAIT_DATA_RESPONSES, GaitSubscriber, etag_matches
+from app.services.startup import ServiceUnavailable
+from app.services.gait_history import get_history_store
+from app.config.settings import get_settings
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/api/chat", tags=["chat"])
 
-firebase_service = FirebaseService()
-gemini_service = GeminiService()
+# Services are built at startup (see app/services/startup.py) and injected per request
 
 @router.post("/", response_model=ChatResponse)
-async def chat(request: ChatRequest):
+async def chat(
+    request: ChatRequest,
+    firebase_service=Depends(get_firebase_service),
+    gemini_service=Depends(get_gemini_service),
+    session_store=Depends(get_session_store)
+):
     """
     Main chat endpoint
     
-    Accepts a user message and optional conversation history,
-    returns an AI-generated response based on current gait data
+    Accepts a user message and an optional session id (or, for a new
+    session, the conversation history so far), returns an AI-generated
+    response based on current gait data
     """
+    deadline = deadline_after(request.timeout)
     try:
+        session = await session_store.open_async(request.session_id, request.conversation_history)
+        
         # Fetch latest gait data
-        gait_data = firebase_service.get_all_data()
+        gait_data = await firebase_service.get_all_data_async()
         
         # Generate AI response
-        response = gemini_service.generate_response(
+        usage = TokenUsage()
+        response = await gemini_service.generate_response(
             user_message=request.message,
             gait_data=gait_data,
-            conversation_history=request.conversation_history
+            conversation_history=session.messages,
+            history_summary=session.summary,
+            deadline=deadline,
+            usage=usage
         )
         
-        return ChatResponse(
-            response=response,
-            gait_data_summary=gait_data.get("current")
-        )
+        if usage.source != "error":
+            await session_store.record_turn_async(session, request.message, response)
         
+        # Built already typed: returned as-is rather than re-validated through response_model
+        return ORJSONResponse({
+            "response": response,
+            "gait_data_summary": gait_summary(gait_data),
+            "session_id": session.session_id,
+            "usage": usage.model_dump()
+        })
+        
+    except OverloadedError as e:
+        raise overloaded(e)
+    except DeadlineExceeded as e:
+        raise HTTPException(status_code=504, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error processing chat: {str(e)}")
 
+def overloaded(error: OverloadedError) -> HTTPException:
+    """429 telling the client when to retry"""
+    retry_after = int(error.retry_after)
+    return HTTPException(
+        status_code=429,
+        detail=f"Chat service is busy: {str(error)}",
+        headers={"Retry-After": str(retry_after)}
+    )
+
+@router.post("/batch", response_model=BatchChatResponse)
+async def chat_batch(
+    request: BatchChatRequest,
+    firebase_service=Depends(get_firebase_service),
+    gemini_service=Depends(get_gemini_service),
+    session_store=Depends(get_session_store)
+):
+    """
+    Batch chat endpoint
+    
+    Answers a list of questions against one gait snapshot: data is fetched
+    and the context built once, then the questions are answered
+    concurrently. Each result carries either a response or an error.
+    """
+    if not request.questions:
+        raise HTTPException(status_code=400, detail="No questions given")
+    if len(request.questions) > settings.batch_max_questions:
+        raise HTTPException(
+            status_code=400,
+            detail=f"At most {settings.batch_max_questions} questions per batch"
+        )
+    
+    deadline = deadline_after(request.timeout)
+    try:
+        session = await session_store.get_async(request.session_id) if request.session_id else None
+        history = session.messages if session else request.conversation_history
+        
+        gait_data = await firebase_service.get_all_data_async()
+        
+        answers = await gemini_service.generate_batch(
+            questions=request.questions,
+            gait_data=gait_data,
+            conversation_history=history,
+            history_summary=session.summary if session else None,
+            deadline=deadline
+        )
+        
+        return ORJSONResponse({
+            "results": [
+                {"question": question, "response": response, "error": error}
+                for question, (response, error) in zip(request.questions, answers)
+            ],
+            "gait_data_summary": gait_summary(gait_data)
+        })
+        
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error processing batch: {str(e)}")
+
+def sse_event(event: str, data: dict) -> str:
+    """Format one Server-Sent Event"""
+    return f"event: {event}\ndata: {orjson.dumps(data).decode()}\n\n"
+
+@router.post("/stream")
+async def chat_stream(
+    request: ChatRequest,
+    firebase_service=Depends(get_firebase_service),
+    gemini_service=Depends(get_gemini_service),
+    session_store=Depends(get_session_store)
+):
+    """
+    Streaming chat endpoint
+    
+    Sends the response as Server-Sent Events: a 'token' event per generated
+    chunk, then a 'done' event carrying gait_data_summary (or an 'error' event).
+    If the client disconnects the generation is cancelled upstream.
+    """
+    deadline = deadline_after(request.timeout)
+    try:
+        session = await session_store.open_async(request.session_id, request.conversation_history)
+        gait_data = await firebase_service.get_all_data_async()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error fetching data: {str(e)}")
+    
+    async def events():
+        try:
+            parts = []
+            usage = TokenUsage()
+            async with aclosing(gemini_service.stream_response(
+                user_message=request.message,
+                gait_data=gait_data,
+                conversation_history=session.messages,
+                history_summary=session.summary,
+                deadline=deadline,
+                usage=usage
+            )) as chunks:
+                async for text in chunks:
+                    parts.append(text)
+                    yield sse_event("token", {"text": text})
+            
+            # Only reached when the stream completed; a failed one leaves the session as it was
+            await session_store.record_turn_async(session, request.message, "".join(parts).strip())
+            yield sse_event("done", {
+                "gait_data_summary": gait_summary(gait_data),
+                "session_id": session.session_id,
+                "usage": usage.model_dump()
+            })
+        except OverloadedError as e:
+            yield sse_event("error", {"detail": f"Chat service is busy: {str(e)}", "retry_after": int(e.retry_after)})
+        except DeadlineExceeded as e:
+            yield sse_event("error", {"detail": str(e)})
+        except Exception as e:
+            logger.exception("❌ Streaming Error: %s", e)
+            yield sse_event("error", {"detail": f"Error processing chat: {str(e)}"})
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+def ws_event(event: str, **data) -> str:
+    """Format one WebSocket message"""
+    return orjson.dumps({"type": event, **data}).decode()
+
+@router.websocket("/ws")
+async def chat_socket(
+    websocket: WebSocket,
+    container=Depends(get_container),
+    session_store=Depends(get_session_store)
+):
+    """
+    Live gait feed and chat on one WebSocket
+    
+    The server first sends a 'gait_snapshot' with the current and averages
+    sections, then a 'gait_delta' whenever a new sample arrives, carrying
+    only the fields that changed (null removes a field or section). A
+    client that falls behind gets a fresh 'gait_snapshot' instead of its
+    backlog. Clients send {"type": "chat", "id", "message", "session_id",
+    "conversation_history"} to chat; the reply streams back as 'token'
+    messages followed by 'done' (or 'error'), tagged with the same id.
+    {"type": "ping"} is answered with 'pong'.
+    """
+    await websocket.accept()
+    try:
+        await container.wait_for_services()
+    except ServiceUnavailable as e:
+        await websocket.close(code=1011, reason=str(e)[:120])
+        return
+    
+    send_lock = asyncio.Lock()
+    closed = asyncio.Event()
+    
+    async def send(message: str):
+        async with send_lock:
+            if closed.is_set():
+                return
+            try:
+                await websocket.send_text(message)
+            except Exception:
+                closed.set()
+    
+    broadcaster = container.broadcaster
+    subscriber = await broadcaster.subscribe()
+    tasks = {asyncio.create_task(push_gait_updates(subscriber, send, closed))}
+    
+    try:
+        while True:
+            try:
+                payload = orjson.loads(await websocket.receive_text())
+            except ValueError:
+                await send(ws_event("error", detail="Messages must be JSON"))
+                continue
+            
+            kind = payload.get("type") if isinstance(payload, dict) else None
+            if kind == "ping":
+                await send(ws_event("pong"))
+            elif kind == "chat":
+                task = asyncio.create_task(socket_chat(payload, container, session_store, send))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            else:
+                await send(ws_event("error", detail=f"Unknown message type: {kind}"))
+    except WebSocketDisconnect:
+        pass
+    finally:
+        closed.set()
+        broadcaster.unsubscribe(subscriber)
+        for task in list(tasks):
+            task.cancel()
+
+async def push_gait_updates(subscriber: GaitSubscriber, send: Callable[[str], Awaitable[None]], closed: asyncio.Event):
+    """Forward the shared gait feed to one socket"""
+    while not closed.is_set():
+        await send(await subscriber.get())
+
+async def socket_chat(payload: Dict, container, session_store, send: Callable[[str], Awaitable[None]]):
+    """Answer one chat message of a WebSocket, streaming the reply"""
+    request_id = payload.get("id")
+    try:
+        request = ChatRequest(**{key: payload[key] for key in ChatRequest.model_fields if key in payload})
+    except ValidationError as e:
+        await send(ws_event("error", id=request_id, detail=f"Invalid chat message: {e.errors()[0]['msg']}"))
+        return
+    
+    deadline = deadline_after(request.timeout)
+    try:
+        session = await session_store.open_async(request.session_id, request.conversation_history)
+        gait_data = await container.firebase_service.get_all_data_async()
+        
+        parts = []
+        usage = TokenUsage()
+        async with aclosing(container.gemini_service.stream_response(
+            user_message=request.message,
+            gait_data=gait_data,
+            conversation_history=session.messages,
+            history_summary=session.summary,
+            deadline=deadline,
+            usage=usage
+        )) as chunks:
+            async for text in chunks:
+                parts.append(text)
+                await send(ws_event("token", id=request_id, text=text))
+        
+        await session_store.record_turn_async(session, request.message, "".join(parts).strip())
+        await send(ws_event(
+            "done",
+            id=request_id,
+            gait_data_summary=gait_summary(gait_data),
+            session_id=session.session_id,
+            usage=usage.model_dump()
+        ))
+    except OverloadedError as e:
+        await send(ws_event("error", id=request_id, detail=f"Chat service is busy: {str(e)}",
+                            retry_after=int(e.retry_after)))
+    except DeadlineExceeded as e:
+        await send(ws_event("error", id=request_id, detail=str(e)))
+    except Exception as e:
+        logger.exception("❌ WebSocket Chat Error: %s", e)
+        await send(ws_event("error", id=request_id, detail=f"Error processing chat: {str(e)}"))
+
 @router.get("/gait-data")
-async def get_gait_data():
-    """Endpoint to fetch current gait data"""
+async def get_gait_data(
+    wait: float = Query(0, ge=0, description="With If-None-Match: seconds to hold the request open for a newer sample"),
+    if_none_match: Optional[str] = Header(None),
+    broadcaster=Depends(get_gait_broadcaster)
+):
+    """Endpoint to fetch current gait data
+
+    Answers 304 when If-None-Match still names the current ETag; with `wait`,
+    first holds the request until a newer sample arrives or the wait ends.
+    Served from the shared gait feed: however many clients poll, Firebase
+    is read at most once per `ws_poll_interval`, and not at all with the
+    live snapshot on (FIREBASE_LIVE_SNAPSHOT), whose pushed copy is used.
+    """
     try:
-        data = firebase_service.get_all_data()
-        if not data.get("current"):
-            raise HTTPException(status_code=404, detail="No gait data available")
-        return data
+        etag, body = await broadcaster.latest()
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching data: {str(e)}")
+    
+    waited = "false"
+    if etag_matches(if_none_match, etag) and wait > 0:
+        waited = "true"
+        await broadcaster.wait_for_change(etag, min(wait, settings.gait_data_max_wait))
+        etag, body = broadcaster.etag, broadcaster.body
+    # Checked after the wait too: the data may have gone while the request was held
+    if etag is None:
+        raise HTTPException(status_code=404, detail="No gait data available")
+    
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if etag_matches(if_none_match, etag):
+        GAIT_DATA_RESPONSES.inc(status="304", waited=waited)
+        return Response(status_code=304, headers=headers)
+    GAIT_DATA_RESPONSES.inc(status="200", waited=waited)
+    # Serialized once per change by the feed and shared by every poller
+    return Response(content=body, media_type="application/json", headers=headers)
+
+@router.get("/gait-data/history")
+async def get_gait_history(
+    start: Optional[float] = Query(None, description="Range start (epoch seconds)"),
+    end: Optional[float] = Query(None, description="Range end (epoch seconds)"),
+    metrics: Optional[str] = Query(None, description="Comma-separated metric names"),
+    bucket: float = Query(0, ge=0, description="Downsample to per-bucket means (seconds)"),
+    offset: int = Query(0, ge=0),
+    limit: int = Query(500, ge=1, le=5000),
+    firebase_service=Depends(get_firebase_service)  # unused; makes a sync wait until Firebase is initialized
+):
+    """Gait history over a time range from the local columnar store"""
+    if not settings.history_store_enabled:
+        raise HTTPException(status_code=404, detail="Gait history is disabled")
+    
+    store = get_history_store()
+    try:
+        # Skipped while another sync runs: serve what is already stored locally
+        await run_blocking(store.sync_if_due)
+    except Exception as e:
+        logger.error("❌ Error syncing gait history: %s", e)
+    
+    try:
+        return await run_blocking(
+            store.query,
+            start=start,
+            end=end,
+            metrics=metrics.split(",") if metrics else None,
+            bucket_seconds=bucket,
+            offset=offset,
+            limit=limit
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error querying history: {str(e)}")
+
+@router.get("/gait-data/status", response_model=SnapshotStatus)
+async def get_snapshot_status(firebase_service=Depends(get_firebase_service)):
+    """Version, staleness and last-update time of the live gait snapshot"""
+    snapshot = firebase_service.live_snapshot
+    if snapshot is None:
+        return SnapshotStatus(enabled=False)
+    return SnapshotStatus(enabled=True, **snapshot.status())
+
+@router.get("/gait-data/cache", response_model=Dict[str, CacheStats])
+async def get_cache_stats(firebase_service=Depends(get_firebase_service)):
+    """Hit, miss and refresh counters of the gait data caches"""
+    return firebase_service.cache_stats()
+
+@router.get("/fast-path")
+async def get_fast_path_stats(gemini_service=Depends(get_gemini_service)):
+    """Per-intent hit counts of the deterministic fast path"""
+    return gemini_service.fast_path.stats()
+
+@router.get("/response-cache")
+async def get_response_cache_stats(gemini_service=Depends(get_gemini_service)):
+    """Size and hit ratio of the model response cache"""
+    return gemini_service.response_cache.stats()
+
+@router.get("/admission")
+async def get_admission_stats(gemini_service=Depends(get_gemini_service)):
+    """Concurrency, queue and load-shedding counters for model calls"""
+    return {**gemini_service.admission.stats(), "rate_limit_retries": gemini_service.rate_limit_retries}
+
+@router.delete("/sessions/{session_id}")
+async def end_session(session_id: str, session_store=Depends(get_session_store)):
+    """Forget a conversation session"""
+    await session_store.delete_async(session_id)
+    return {"session_id": session_id, "deleted": True}
 
 @router.get("/health", response_model=HealthResponse)
 async def health_check():
-    """Health check endpoint"""
+    """Health check endpoint (liveness: the process is serving requests)"""
     return HealthResponse(
         status="healthy",
         message="Gait Chatbot API is running"
-    )
\ No newline at end of file
+    )
+
+@router.get("/ready", response_model=ReadinessResponse, responses={503: {"model": ReadinessResponse}})
+async def readiness_check(container=Depends(get_container)):
+    """Readiness: services built and warmed up; 503 until then. Reports startup phase timings."""
+    status = container.status()
+    if not status["ready"]:
+        return JSONResponse(status_code=503, content=status)
+    return status
\ No newline at end of file
@@ -0,0 +1,61 @@
+from fastapi import APIRouter, Depends, Header, HTTPException
+from typing import Optional
+import hmac
+from app.models.schemas import IngestError, IngestRequest, IngestResponse
+from app.dependencies import get_ingest_buffer
+from app.services.admission import OverloadedError
+from app.config.settings import get_settings
+
+settings = get_settings()
+
+router = APIRouter(prefix="/api/gait", tags=["gait"])
+
+@router.post("/ingest", response_model=IngestResponse, status_code=202)
+async def ingest(
+    request: IngestRequest,
+    x_ingest_token: Optional[str] = Header(None),
+    ingest_buffer=Depends(get_ingest_buffer)
+):
+    """
+    Sensor ingest endpoint
+    
+    Requires the shared INGEST_TOKEN in the X-Ingest-Token header. Validates
+    a batch of gait samples and buffers the valid ones for a batched write
+    to Firebase; with a single worker they are served by reads right away,
+    with several only once written (reads come from the refresher's shared
+    snapshot). Invalid samples are reported by index and skipped. When too
+    many samples are waiting to be written the whole batch is refused with
+    429 and a Retry-After.
+    """
+    if ingest_buffer is None:
+        raise HTTPException(status_code=404, detail="Gait ingest is disabled")
+    if not hmac.compare_digest((x_ingest_token or "").encode(), settings.ingest_token.encode()):
+        raise HTTPException(status_code=401, detail="Invalid or missing X-Ingest-Token")
+    if not request.samples:
+        raise HTTPException(status_code=400, detail="No samples given")
+    if len(request.samples) > settings.ingest_max_request_samples:
+        raise HTTPException(
+            status_code=413,
+            detail=f"At most {settings.ingest_max_request_samples} samples per request"
+        )
+    
+    try:
+        keys, errors = ingest_buffer.submit(request.samples)
+    except OverloadedError as e:
+        raise HTTPException(
+            status_code=429,
+            detail=f"Ingest buffer is full: {str(e)}",
+            headers={"Retry-After": str(int(e.retry_after))}
+        )
+    
+    if not keys:
+        raise HTTPException(
+            status_code=422,
+            detail=[IngestError(index=index, error=error).model_dump() for index, error in errors]
+        )
+    return IngestResponse(
+        accepted=len(keys),
+        keys=keys,
+        rejected=[IngestError(index=index, error=error) for index, error in errors],
+        pending=ingest_buffer.pending
+    )
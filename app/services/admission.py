@@ -0,0 +1,122 @@
+import asyncio
+import heapq
+import itertools
+import math
+import time
+from contextlib import asynccontextmanager
+from typing import Dict, List, Optional, Tuple
+from app.services.deadlines import DeadlineExceeded
+from app.services.metrics import span
+
+
+class OverloadedError(Exception):
+    """Raised when a request cannot be admitted in time; maps to HTTP 429"""
+
+    def __init__(self, message: str, retry_after: float):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    """Bounds concurrent model calls behind a priority wait queue
+
+    Up to `max_concurrent` callers hold a slot at once. Others wait in a queue
+    of at most `max_queue` entries, ordered by priority (lower first) and
+    arrival. A caller that cannot get a slot in time, or that finds the
+    queue full, gets an OverloadedError with a Retry-After hint; one whose
+    own request deadline ran out while queued gets DeadlineExceeded.
+    """
+
+    def __init__(self, max_concurrent: int, max_queue: int, queue_timeout: float):
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+
+        self._active = 0
+        self._waiters: List[Tuple[int, int, asyncio.Future]] = []
+        self._sequence = itertools.count()
+        self._avg_hold = 1.0  # moving average of slot hold time (seconds)
+
+        self.admitted = 0
+        self.rejected = 0
+        self.timed_out = 0
+
+    @property
+    def queued(self) -> int:
+        return sum(1 for _, _, waiter in self._waiters if not waiter.done())
+
+    def retry_after(self) -> float:
+        """Rough time until a newly queued request would be served"""
+        backlog = self.queued + 1
+        return max(1, math.ceil(self._avg_hold * backlog / self.max_concurrent))
+
+    def try_acquire(self) -> bool:
+        """Take a slot only if one is free right now and nobody is queued for it"""
+        if self._active < self.max_concurrent and not self.queued:
+            self._active += 1
+            self.admitted += 1
+            return True
+        return False
+
+    async def acquire(self, priority: int = 0, timeout: Optional[float] = None, deadline: Optional[float] = None):
+        """Wait up to `timeout` for a slot; `deadline` is the request's own (monotonic) deadline, if any"""
+        if self.try_acquire():
+            return
+
+        if self.queued >= self.max_queue:
+            self.rejected += 1
+            raise OverloadedError("Too many requests waiting for the model", self.retry_after())
+
+        waiter = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._sequence), waiter))
+
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), timeout if timeout is not None else self.queue_timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if waiter.done() and not waiter.cancelled():
+                # The slot was handed over just as we gave up: pass it on
+                self.release()
+            else:
+                waiter.cancel()
+
+            if isinstance(e, asyncio.CancelledError):
+                raise
+            self.timed_out += 1
+            if deadline is not None and time.monotonic() >= deadline:
+                # The request ran out of time, not the service out of capacity
+                raise DeadlineExceeded("Request deadline exceeded while waiting for the model") from None
+            raise OverloadedError("Timed out waiting for the model", self.retry_after())
+
+        self.admitted += 1
+
+    def release(self):
+        # Hand the slot straight to the next live waiter, if any
+        while self._waiters:
+            _, _, waiter = heapq.heappop(self._waiters)
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self._active -= 1
+
+    @asynccontextmanager
+    async def slot(self, priority: int = 0, timeout: Optional[float] = None, deadline: Optional[float] = None):
+        with span("admission_wait"):
+            await self.acquire(priority, timeout, deadline)
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self._avg_hold = 0.9 * self._avg_hold + 0.1 * (time.monotonic() - started)
+            self.release()
+
+    def stats(self) -> Dict:
+        return {
+            "active": self._active,
+            "queued": self.queued,
+            "max_concurrent": self.max_concurrent,
+            "max_queue": self.max_queue,
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "timed_out": self.timed_out,
+            "avg_hold_seconds": self._avg_hold
+        }
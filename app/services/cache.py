@@ -0,0 +1,132 @@
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, Dict, Generic, Optional, TypeVar
+
+T = TypeVar("T")
+
+CACHE_MODES = ("off", "ttl", "swr")
+
+
+class CachedCall(Generic[T]):
+    """Caches the result of a zero-argument fetch
+
+    Modes:
+    - off: every call fetches
+    - ttl: values are reused for `ttl` seconds, then the next caller fetches
+    - swr: after `ttl` the stale value keeps being served (up to `max_stale`
+      seconds old) while a single background refresh runs
+
+    Concurrent misses share one in-flight fetch (single-flight), and a failed
+    fetch is never cached. set() and invalidate() start a new generation: a
+    fetch that began before them does not overwrite what they left.
+    """
+
+    def __init__(self, name: str, fetch: Callable[[], T], ttl: float, mode: str = "ttl", max_stale: float = 0):
+        if mode not in CACHE_MODES:
+            raise ValueError(f"Unknown cache mode '{mode}', expected one of {CACHE_MODES}")
+
+        self.name = name
+        self.ttl = ttl
+        self.mode = mode
+        self.max_stale = max_stale
+        self._fetch = fetch
+        self._lock = threading.Lock()
+        self._value: Optional[T] = None
+        self._fetched_at: Optional[float] = None
+        self._in_flight: Optional[Future] = None
+        self._generation = 0
+
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.refreshes = 0
+        self.errors = 0
+
+    def get(self) -> T:
+        if self.mode == "off":
+            with self._lock:
+                self.misses += 1
+                self.refreshes += 1
+            return self._fetch()
+
+        with self._lock:
+            age = None if self._fetched_at is None else time.monotonic() - self._fetched_at
+
+            if age is not None and age < self.ttl:
+                self.hits += 1
+                return self._value
+
+            if self.mode == "swr" and age is not None and (self.max_stale <= 0 or age < self.ttl + self.max_stale):
+                self.stale_hits += 1
+                if self._in_flight is None:
+                    self._in_flight = Future()
+                    threading.Thread(target=self._refresh, args=(self._in_flight, self._generation),
+                                     name=f"cache-refresh-{self.name}", daemon=True).start()
+                return self._value
+
+            self.misses += 1
+            future = self._in_flight
+            leader = future is None
+            if leader:
+                future = self._in_flight = Future()
+            generation = self._generation
+
+        if leader:
+            self._refresh(future, generation)
+        return future.result()
+
+    def _refresh(self, future: Future, generation: int):
+        try:
+            value = self._fetch()
+        except BaseException as e:
+            with self._lock:
+                self.errors += 1
+                if self._in_flight is future:
+                    self._in_flight = None
+            future.set_exception(e)
+            return
+
+        with self._lock:
+            self.refreshes += 1
+            if self._in_flight is future:
+                self._in_flight = None
+            if generation == self._generation:
+                self._value = value
+                self._fetched_at = time.monotonic()
+            elif self._fetched_at is not None:
+                # Read before a set(): callers get the newer value instead
+                value = self._value
+        future.set_result(value)
+
+    def _new_generation(self):
+        # A fetch still in flight belongs to the old generation; the next miss starts a fresh one
+        self._generation += 1
+        self._in_flight = None
+
+    def set(self, value: T):
+        """Store a value known to be current, such as one this process has just written"""
+        with self._lock:
+            self._new_generation()
+            self._value = value
+            self._fetched_at = time.monotonic()
+
+    def invalidate(self):
+        """Drop the cached value so the next call fetches"""
+        with self._lock:
+            self._new_generation()
+            self._fetched_at = None
+            self._value = None
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "mode": self.mode,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "stale_hits": self.stale_hits,
+                "misses": self.misses,
+                "refreshes": self.refreshes,
+                "errors": self.errors,
+                "age_seconds": None if self._fetched_at is None else time.monotonic() - self._fetched_at
+            }
@@ -0,0 +1,31 @@
+import time
+from typing import Optional
+from app.config.settings import get_settings
+
+settings = get_settings()
+
+
+class DeadlineExceeded(Exception):
+    """The request ran out of time; maps to HTTP 504"""
+
+
+def deadline_after(timeout: Optional[float] = None) -> float:
+    """Absolute (monotonic) deadline for a request; clients may ask for less than chat_deadline, not more"""
+    budget = settings.chat_deadline if timeout is None else min(timeout, settings.chat_deadline)
+    return time.monotonic() + budget
+
+
+def remaining(deadline: Optional[float]) -> Optional[float]:
+    """Seconds left before `deadline` (None: no deadline); DeadlineExceeded once it has passed"""
+    if deadline is None:
+        return None
+    left = deadline - time.monotonic()
+    if left <= 0:
+        raise DeadlineExceeded("Request deadline exceeded")
+    return left
+
+
+def bounded(timeout: float, deadline: Optional[float]) -> float:
+    """`timeout`, shortened to what is left of the deadline"""
+    left = remaining(deadline)
+    return timeout if left is None else min(timeout, left)
@@ -0,0 +1,300 @@
+import asyncio
+import copy
+import hashlib
+import random
+import threading
+import time
+from collections import OrderedDict
+from types import SimpleNamespace
+from typing import Callable, Dict, List, Optional
+from app.services.gait_history import PUSH_CHARS
+from app.services.gait_snapshot import firebase_key_order
+
+
+def push_key(millis: int, rng: random.Random) -> str:
+    """Firebase-style push ID: 8 characters of timestamp, 12 random"""
+    prefix = ""
+    for _ in range(8):
+        prefix = PUSH_CHARS[millis % 64] + prefix
+        millis //= 64
+    return prefix + "".join(rng.choice(PUSH_CHARS) for _ in range(12))
+
+
+def fake_gait_sample(index: int, millis: int, rng: random.Random) -> Dict:
+    """A plausible sensor sample; values wander around healthy ranges"""
+    return {
+        'timestamp': millis,
+        'steps': 100 + index * 12,
+        'cadence': round(rng.gauss(108, 6), 2),
+        'walkingSpeed': round(rng.gauss(1.25, 0.12), 3),
+        'strideLength': round(rng.gauss(1.32, 0.08), 3),
+        'stepWidth': round(rng.gauss(0.09, 0.015), 3),
+        'equilibriumScore': round(min(1.0, rng.gauss(0.82, 0.06)), 3),
+        'posturalSway': round(abs(rng.gauss(3.2, 0.8)), 2),
+        'frequency': round(rng.gauss(1.8, 0.1), 3),
+        'gaitCyclePhaseMean': round(rng.uniform(0, 1), 3)
+    }
+
+
+def _split(path: Optional[str]) -> List[str]:
+    return [part for part in (path or '').split('/') if part]
+
+
+class FakeListenerRegistration:
+    """Stands in for firebase_admin's ListenerRegistration"""
+
+    def __init__(self, database: "FakeRealtimeDatabase", path: List[str], callback: Callable):
+        self.database = database
+        self.path = path
+        self.callback = callback
+        self._closed = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="fake-db-listener", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        # Like the SDK: the whole subtree arrives as one 'put' at '/', then changes follow
+        self.callback(SimpleNamespace(event_type='put', path='/', data=self.database.read(self.path)))
+        self._closed.wait()
+
+    def close(self):
+        self._closed.set()
+        self.database.unlisten(self)
+
+
+class FakeReference:
+    """In-memory db.Reference / db.Query supporting the calls this app makes"""
+
+    def __init__(self, database: "FakeRealtimeDatabase", path: List[str]):
+        self.database = database
+        self.path = path
+        self.key = path[-1] if path else None
+        self._ordered = False
+        self._start: Optional[str] = None
+        self._first: Optional[int] = None
+        self._last: Optional[int] = None
+
+    def child(self, path: str) -> "FakeReference":
+        return FakeReference(self.database, self.path + _split(path))
+
+    def order_by_key(self) -> "FakeReference":
+        self._ordered = True
+        return self
+
+    def start_at(self, key: str) -> "FakeReference":
+        self._start = key
+        return self
+
+    def limit_to_first(self, limit: int) -> "FakeReference":
+        self._first = limit
+        return self
+
+    def limit_to_last(self, limit: int) -> "FakeReference":
+        self._last = limit
+        return self
+
+    def get(self):
+        self.database.simulate_latency()
+        data = self.database.read(self.path)
+        if not self._ordered or not isinstance(data, dict):
+            return data
+
+        keys = sorted(data, key=firebase_key_order)
+        if self._start is not None:
+            start = firebase_key_order(self._start)
+            keys = [key for key in keys if firebase_key_order(key) >= start]
+        if self._first is not None:
+            keys = keys[:self._first]
+        if self._last is not None:
+            keys = keys[-self._last:]
+        return OrderedDict((key, data[key]) for key in keys)
+
+    def set(self, value):
+        self.database.simulate_latency()
+        self.database.write({'/'.join(self.path): value})
+
+    def delete(self):
+        self.database.simulate_latency()
+        self.database.write({'/'.join(self.path): None})
+
+    def update(self, value: Dict):
+        """Multi-path update: keys may be nested paths relative to this reference"""
+        self.database.simulate_latency()
+        base = '/'.join(self.path)
+        self.database.write({f"{base}/{key}" if base else key: item for key, item in value.items()})
+
+    def push(self, value=None) -> "FakeReference":
+        child = self.child(self.database.new_key())
+        if value is not None:
+            child.set(value)
+        return child
+
+    def listen(self, callback: Callable) -> FakeListenerRegistration:
+        return self.database.listen(self.path, callback)
+
+
+class FakeRealtimeDatabase:
+    """Offline stand-in for the Realtime Database: a JSON tree with simulated read latency"""
+
+    def __init__(self, data: Optional[Dict] = None, read_latency: float = 0.0, seed: int = 7):
+        self.data = data or {}
+        self.read_latency = read_latency
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._listeners: List[FakeListenerRegistration] = []
+        self.reads = 0
+        self.writes = 0
+
+    @classmethod
+    def with_history(cls, samples: int, read_latency: float = 0.0, seed: int = 7,
+                     interval_ms: int = 1000) -> "FakeRealtimeDatabase":
+        """A database whose gaitData holds `samples` generated samples plus average_scores"""
+        rng = random.Random(seed)
+        start = int(time.time() * 1000) - samples * interval_ms
+        gait_data = {}
+        for index in range(samples):
+            millis = start + index * interval_ms
+            gait_data[push_key(millis, rng)] = fake_gait_sample(index, millis, rng)
+        gait_data['average_scores'] = {
+            'avgGaitScoreLast20': 78.5,
+            'avgGaitScoreLast100': 77.9,
+            'avgClassificationLast20': 'Normal'
+        }
+        return cls({'gaitData': gait_data}, read_latency, seed)
+
+    def reference(self, path: Optional[str] = '/') -> FakeReference:
+        return FakeReference(self, _split(path))
+
+    def new_key(self) -> str:
+        with self._lock:
+            return push_key(int(time.time() * 1000), self._rng)
+
+    def simulate_latency(self):
+        self.reads += 1
+        if self.read_latency > 0:
+            time.sleep(self.read_latency)
+
+    def read(self, path: List[str]):
+        with self._lock:
+            node = self.data
+            for part in path:
+                if not isinstance(node, dict):
+                    return None
+                node = node.get(part)
+            # Callers get their own copy, as they would after decoding a response
+            return copy.deepcopy(node)
+
+    def write(self, values: Dict):
+        """Apply {path: value} writes atomically, then notify listeners"""
+        with self._lock:
+            for path, value in values.items():
+                parts = _split(path)
+                node = self.data
+                for part in parts[:-1]:
+                    node = node.setdefault(part, {})
+                if value is None:
+                    node.pop(parts[-1], None)
+                else:
+                    node[parts[-1]] = copy.deepcopy(value)
+            self.writes += 1
+            listeners = list(self._listeners)
+
+        for path, value in values.items():
+            parts = _split(path)
+            for listener in listeners:
+                if parts[:len(listener.path)] == listener.path:
+                    relative = '/' + '/'.join(parts[len(listener.path):])
+                    listener.callback(SimpleNamespace(event_type='put', path=relative, data=value))
+
+    def listen(self, path: List[str], callback: Callable) -> FakeListenerRegistration:
+        registration = FakeListenerRegistration(self, path, callback)
+        with self._lock:
+            self._listeners.append(registration)
+        return registration
+
+    def unlisten(self, registration: FakeListenerRegistration):
+        with self._lock:
+            if registration in self._listeners:
+                self._listeners.remove(registration)
+
+
+def _fake_tokens(text: str) -> int:
+    return max(1, len(text) // 4)
+
+
+def fake_reply(prompt: str) -> str:
+    """Deterministic canned reply; its length varies a little with the prompt"""
+    digest = int(hashlib.sha1(prompt.encode()).hexdigest(), 16)
+    sentences = [
+        "Your gait metrics look steady compared with the healthy reference ranges.",
+        "Cadence and walking speed are close to where they should be for most adults.",
+        "Balance exercises such as single-leg stands can help keep your equilibrium strong.",
+        "Keep walking regularly and check back to see how your numbers trend. 😊"
+    ]
+    return " ".join(sentences[:2 + digest % 3])
+
+
+class FakeGenerativeModel:
+    """Offline stand-in for genai.GenerativeModel with simulated generation latency"""
+
+    def __init__(self, model_name: str, system_instruction: Optional[str] = None,
+                 latency: float = 0.0, stream_chunks: int = 8, slow_fraction: float = 0.0):
+        self.model_name = model_name
+        self.system_instruction = system_instruction
+        self.latency = latency
+        self.stream_chunks = max(1, stream_chunks)
+        self.slow_fraction = slow_fraction
+        self._rng = random.Random(model_name)
+        self.calls = 0
+
+    def _latency(self) -> float:
+        # A few replies are much slower, like the tail of a real model
+        if self.slow_fraction and self._rng.random() < self.slow_fraction:
+            return self.latency * 10
+        return self.latency
+
+    def _usage(self, prompt: str, reply: str):
+        instruction = _fake_tokens(self.system_instruction) if self.system_instruction else 0
+        return SimpleNamespace(
+            prompt_token_count=_fake_tokens(prompt) + instruction,
+            candidates_token_count=_fake_tokens(reply),
+            total_token_count=_fake_tokens(prompt) + instruction + _fake_tokens(reply)
+        )
+
+    async def generate_content_async(self, contents, stream: bool = False, **kwargs):
+        self.calls += 1
+        prompt = str(contents)
+        reply = fake_reply(prompt)
+        usage = self._usage(prompt, reply)
+        latency = self._latency()
+
+        if stream:
+            # A slow reply is slow to start, then streams at the usual pace
+            return FakeStreamResponse(reply, usage, self.latency, self.stream_chunks, wait=latency - self.latency)
+
+        await asyncio.sleep(latency)
+        return SimpleNamespace(text=reply, usage_metadata=usage)
+
+    async def count_tokens_async(self, contents, **kwargs):
+        return SimpleNamespace(total_tokens=_fake_tokens(str(contents)))
+
+
+class FakeStreamResponse:
+    """Async-iterable streamed response; after `wait`, the latency is spread evenly over the chunks"""
+
+    def __init__(self, reply: str, usage, latency: float, chunks: int, wait: float = 0.0):
+        self.usage_metadata = usage
+        words = reply.split(" ")
+        size = max(1, -(-len(words) // chunks))
+        self._parts = [" ".join(words[i:i + size]) + " " for i in range(0, len(words), size)]
+        self._delay = latency / len(self._parts)
+        self._wait = wait
+        self._iterator = self._chunks()
+
+    async def _chunks(self):
+        await asyncio.sleep(self._wait)
+        for part in self._parts:
+            await asyncio.sleep(self._delay)
+            yield SimpleNamespace(text=part)
+
+    def __aiter__(self):
+        return self._iterator
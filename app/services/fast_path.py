@@ -0,0 +1,148 @@
+import re
+import threading
+from collections import Counter
+from typing import Callable, Dict, Optional
+from app.models.schemas import GaitAverages, GaitSample
+from app.services import gait_analysis as analysis
+from app.services.gait_analysis import fmt
+
+# (GaitSample attribute, label, unit, decimals) for each metric that can be looked up directly
+METRICS = {
+    "steps": ("steps", "step count", "steps", 0),
+    "cadence": ("cadence", "cadence", "steps/min", 2),
+    "walking_speed": ("walking_speed", "walking speed", "m/s", 2),
+    "stride_length": ("stride_length", "stride length", "m", 2),
+    "step_width": ("step_width", "step width", "m", 2),
+    "equilibrium": ("equilibrium_score", "equilibrium score", "/1.0", 2),
+    "postural_sway": ("postural_sway", "postural sway", "degrees", 2),
+    "frequency": ("frequency", "step frequency", "Hz", 2),
+}
+
+# Metric name alternatives as they appear in normalized questions
+METRIC_WORDS = {
+    "steps": r"step count|steps? (?:count|total)|number of steps|steps",
+    "cadence": r"cadence",
+    "walking_speed": r"(?:walking |gait )?speed|pace",
+    "stride_length": r"stride(?: length)?",
+    "step_width": r"step width",
+    "equilibrium": r"equilibrium(?: score)?|balance(?: score)?",
+    "postural_sway": r"(?:postural )?sway",
+    "frequency": r"(?:step )?frequency",
+}
+
+# Metrics whose status comes from the same logic create_comprehensive_context uses
+STATUS_CHECKS: Dict[str, tuple] = {
+    "cadence": (analysis.cadence_status, analysis.CADENCE_RANGE, {"optimal"}),
+    "walking_speed": (analysis.speed_status, analysis.SPEED_RANGE, {"optimal"}),
+    "equilibrium": (analysis.equilibrium_status, analysis.EQUILIBRIUM_RANGE, {"excellent"}),
+}
+
+_LOOKUP = r"(?:what is|tell me|show me|give me|check)? ?(?:my|the) (?:current )?(?:{metric})(?: for today| today| right now| now| so far)?"
+_HOW_MANY_STEPS = r"how many steps (?:have i (?:taken|walked)|did i (?:take|walk)|do i have)(?: today| so far)?"
+_COMPARE = r"(?:is|are) my (?:current )?(?:{metric}) (?:normal|good|ok|okay|healthy|fine|in range|within range|in the healthy range)"
+_GAIT_SCORE = r"(?:what is|tell me|show me)? ?my (?:average |overall )?(?:gait score|score|classification|gait classification)"
+
+
+def normalize_question(text: str) -> str:
+    """Lower-case, drop punctuation and collapse whitespace"""
+    text = text.lower().replace("’", "").replace("'", "")
+    text = re.sub(r"[^a-z0-9 ]+", " ", text)
+    text = re.sub(r"\bwhats\b", "what is", text)
+    return re.sub(r"\s+", " ", text).strip()
+
+
+class FastPathResponder:
+    """Answers pure metric lookups and range checks without calling the model"""
+
+    def __init__(self):
+        self._patterns: list[tuple[str, str, re.Pattern]] = []
+        for metric, words in METRIC_WORDS.items():
+            self._patterns.append(("lookup", metric, re.compile(_LOOKUP.format(metric=words))))
+            if metric in STATUS_CHECKS:
+                self._patterns.append(("compare", metric, re.compile(_COMPARE.format(metric=words))))
+        self._patterns.append(("lookup", "steps", re.compile(_HOW_MANY_STEPS)))
+        self._patterns.append(("gait_score", "gait_score", re.compile(_GAIT_SCORE)))
+
+        self._lock = threading.Lock()
+        self.hits: Counter = Counter()
+        self.misses = 0
+
+    def classify(self, question: str) -> Optional[tuple]:
+        """Return (kind, metric) when the whole question is a simple lookup"""
+        normalized = normalize_question(question)
+        normalized = re.sub(r"^(?:hey|hi|hello|ok|okay|so)? ?(?:please )?", "", normalized)
+        normalized = re.sub(r" please$", "", normalized)
+        for kind, metric, pattern in self._patterns:
+            if pattern.fullmatch(normalized):
+                return kind, metric
+        return None
+
+    def answer(self, question: str, gait_data: Dict) -> Optional[str]:
+        """Answer directly from the gait snapshot, or None to fall through to the model"""
+        current = gait_data.get("current")
+        intent = self.classify(question) if current else None
+
+        reply = None
+        if intent:
+            kind, metric = intent
+            handler: Callable = getattr(self, f"_answer_{kind}")
+            reply = handler(metric, current, gait_data.get("averages"))
+
+        with self._lock:
+            if reply is None:
+                self.misses += 1
+            else:
+                self.hits[f"{intent[0]}:{intent[1]}"] += 1
+        return reply
+
+    @staticmethod
+    def _missing(label: str) -> str:
+        # Rendered as the context shows it to the model, rather than letting the model guess
+        return f"Your {label} is N/A: the latest sample has no {label} reading."
+
+    def _answer_lookup(self, metric: str, current: GaitSample, averages: Optional[GaitAverages]) -> Optional[str]:
+        field, label, unit, decimals = METRICS[metric]
+        value = getattr(current, field)
+        if value is None:
+            return self._missing(label)
+
+        if metric == "steps":
+            return f"You've taken {fmt(value, 0)} steps today! 🏃"
+
+        reply = f"Your {label} is {fmt(value, decimals)}{'' if unit.startswith('/') else ' '}{unit}"
+        if metric in STATUS_CHECKS:
+            status, healthy_range, _ = STATUS_CHECKS[metric]
+            reply += f", which is {status(value)} (healthy range: {healthy_range})"
+        return reply + "."
+
+    def _answer_compare(self, metric: str, current: GaitSample, averages: Optional[GaitAverages]) -> Optional[str]:
+        field, label, unit, decimals = METRICS[metric]
+        value = getattr(current, field)
+        if value is None:
+            return self._missing(label)
+
+        status, healthy_range, good = STATUS_CHECKS[metric]
+        state = status(value)
+        shown = f"{fmt(value, decimals)}{'' if unit.startswith('/') else ' '}{unit}"
+
+        if state in good:
+            return f"Yes! Your {label} of {shown} is {state} - right in the healthy range of {healthy_range}. Keep it up! 😊"
+        return (f"Your {label} of {shown} is {state} compared to the healthy range of {healthy_range}. "
+                f"Ask me how to improve it and I'll suggest some exercises. 👍")
+
+    def _answer_gait_score(self, metric: str, current: GaitSample, averages: Optional[GaitAverages]) -> Optional[str]:
+        if not averages:
+            return None
+        return (f"Your average gait score is {fmt(averages.avg_gait_score)}/100, "
+                f"which puts you in the {averages.classification} category.")
+
+    def stats(self) -> Dict:
+        with self._lock:
+            answered = sum(self.hits.values())
+            total = answered + self.misses
+            return {
+                "answered": answered,
+                "fell_through": self.misses,
+                "hit_rate": answered / total if total else 0.0,
+                "intents": dict(self.hits)
+            }
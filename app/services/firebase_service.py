@@ -1,134 +1,350 @@
 import firebase_admin
-from firebase_admin import credentials, db
-from typing import Dict, Optional
+from firebase_admin import credentials
+from typing import Dict, List, Optional, Tuple, Union
 from app.config.settings import get_settings
+from app.models.schemas import GaitAverages, GaitSample
+from app.services import realtime_db as db
+from app.services.cache import CachedCall
+from app.services.executor import run_blocking
+from app.services.gait_snapshot import GaitSnapshot, LiveGaitListener, firebase_key_order
+from app.services.shared_snapshot import SharedGaitSnapshot
+from app.services.gait_analysis import parse_averages, parse_sample
+from app.services.gait_rollups import read_trends
+from app.services.metrics import span
+from app.services.rolling_stats import RollingGaitStats
+from app.services.transports import configure_firebase_transport
+import asyncio
+import logging
 import os
+import threading
 
 settings = get_settings()
+logger = logging.getLogger(__name__)
+
+# Locations where the average_scores node may live, in lookup order
+AVERAGE_SCORES_PATHS = ('gaitData/average_scores', 'average_scores')
+
+_app_lock = threading.Lock()
 
 class FirebaseService:
     """Service to fetch gait data from Firebase Realtime Database using Admin SDK"""
     
-    def __init__(self):
-        # Initialize Firebase Admin SDK only once
-        if not firebase_admin._apps:
-            try:
-                service_account_path = settings.firebase_service_account
-                
-                if not os.path.exists(service_account_path):
-                    print(f"❌ Service account file not found: {service_account_path}")
-                    raise FileNotFoundError(f"Firebase service account file not found at {service_account_path}")
-                
-                cred = credentials.Certificate(service_account_path)
-                firebase_admin.initialize_app(cred, {
-                    'databaseURL': settings.firebase_db_url
-                })
-                print("✅ Firebase Admin SDK initialized successfully!")
-            except Exception as e:
-                print(f"❌ Error initializing Firebase: {e}")
-                raise
-    
-    def get_latest_gait_data(self) -> Optional[Dict]:
-        """Fetch the latest gait data from Firebase"""
+    def __init__(self, connect: bool = True):
+        # Location of the average_scores node once it has been found
+        self._average_scores_path: Optional[str] = None
+        
+        # Newest entry that parsed, served while newer ones are malformed
+        self._last_good_entry: Tuple[Optional[str], Optional[GaitSample]] = (None, None)
+        
+        # Push-maintained snapshot, populated by start_live_snapshot()
+        self.live_snapshot: Optional[Union[GaitSnapshot, SharedGaitSnapshot]] = None
+        self._live_listener: Optional[LiveGaitListener] = None
+        
+        # Rolling statistics over recent samples, fed by every read and live update (each sample once)
+        self.rolling_stats: Optional[RollingGaitStats] = (
+            RollingGaitStats(settings.rolling_window) if settings.rolling_stats_enabled else None
+        )
+        
+        # Newest gaitRollups summaries, kept current by the rollup job
+        self.trends: Optional[Dict] = None
+        
+        # Read caches shared by all requests; get_all_data is composed from these
+        self._latest_cache = CachedCall(
+            "latest_gait_entry", self._read_latest_entry,
+            ttl=settings.firebase_cache_ttl,
+            mode=settings.firebase_cache_mode,
+            max_stale=settings.firebase_cache_max_stale
+        )
+        self._averages_cache = CachedCall(
+            "average_scores", self._read_average_scores,
+            ttl=settings.firebase_cache_ttl,
+            mode=settings.firebase_cache_mode,
+            max_stale=settings.firebase_cache_max_stale
+        )
+        
+        # Workers of the multi-process mode read a shared snapshot and only connect for fallback reads
+        if connect:
+            self._ensure_app()
+    
+    def _ensure_app(self):
+        """Initialize the Firebase Admin SDK (once per process) and its pooled transport"""
+        with _app_lock:
+            if db.uses_fake() or firebase_admin._apps:
+                return
+            self._initialize_app()
+    
+    def _initialize_app(self):
         try:
-            print("🔍 Fetching gait data from Firebase...")
-            
-            # Reference to gaitData
-            ref = db.reference('gaitData')
-            data = ref.get()
-            
-            if not data or not isinstance(data, dict):
-                print("❌ No gait data found in Firebase")
-                return None
-            
-            print(f"📦 Found {len(data)} items in gaitData")
-            
-            # Filter out 'average_scores' and get actual gait entries
-            gait_entries = {k: v for k, v in data.items() if k != 'average_scores' and isinstance(v, dict)}
-            
-            if not gait_entries:
-                print("❌ No valid gait entries found")
-                return None
-            
-            # Get the latest entry (last key)
-            latest_key = list(gait_entries.keys())[-1]
-            latest_data = gait_entries[latest_key]
-            
-            print(f"✅ Got latest gait data (key: {latest_key})")
-            print(f"   Steps: {latest_data.get('steps', 'N/A')}")
-            print(f"   Cadence: {latest_data.get('cadence', 'N/A')}")
-            print(f"   Walking Speed: {latest_data.get('walkingSpeed', 'N/A')}")
+            service_account_path = settings.firebase_service_account
             
-            return latest_data
+            if not os.path.exists(service_account_path):
+                logger.error("❌ Service account file not found: %s", service_account_path)
+                raise FileNotFoundError(f"Firebase service account file not found at {service_account_path}")
             
+            cred = credentials.Certificate(service_account_path)
+            firebase_admin.initialize_app(cred, {
+                'databaseURL': settings.firebase_db_url,
+                'httpTimeout': settings.firebase_http_timeout
+            })
+            logger.info("✅ Firebase Admin SDK initialized successfully!")
         except Exception as e:
-            print(f"❌ Error fetching gait data: {e}")
-            import traceback
-            traceback.print_exc()
-            return None
+            logger.error("❌ Error initializing Firebase: %s", e)
+            raise
+        
+        # One pooled keep-alive session shared by all reads
+        configure_firebase_transport()
+    
+    def _fetch_gait_entries(self) -> Optional[Dict]:
+        """Read the newest gait entries, bounded when configured"""
+        self._ensure_app()
+        ref = db.reference('gaitData')
+        
+        if not settings.firebase_bounded_reads:
+            return ref.get()
+        
+        # Ordered, limit-to-last query so the payload does not grow with history.
+        # 'average_scores' sorts after push keys, so one extra child is requested.
+        query = ref.order_by_key()
+        limit = settings.firebase_latest_window
+        since = self.rolling_stats.last_key if self.rolling_stats is not None else None
+        if since is not None:
+            # Also everything written since the rolling window's newest sample (up to a
+            # window's worth), so the window holds consecutive samples, not one per refresh
+            query = query.start_at(since)
+            limit = max(limit, settings.rolling_window)
+        return query.limit_to_last(limit + 1).get()
+    
+    def get_latest_gait_data(self) -> Optional[GaitSample]:
+        """Fetch the latest gait data from Firebase"""
+        return self.get_latest_gait_entry()[1]
+    
+    def get_latest_gait_entry(self) -> Tuple[Optional[str], Optional[GaitSample]]:
+        """Fetch the key and data of the latest gait entry from Firebase"""
+        try:
+            with span("get_latest_gait_data"):
+                return self._latest_cache.get()
+        except Exception as e:
+            logger.exception("❌ Error fetching gait data: %s", e)
+            return None, None
+    
+    def _read_latest_entry(self) -> Tuple[Optional[str], Optional[GaitSample]]:
+        logger.debug("🔍 Fetching gait data from Firebase...")
+        
+        data = self._fetch_gait_entries()
+        
+        if not data or not isinstance(data, dict):
+            logger.warning("❌ No gait data found in Firebase")
+            return None, None
+        
+        logger.debug("📦 Found %d items in gaitData", len(data))
+        
+        # Filter out 'average_scores' and get actual gait entries
+        gait_entries = {k: v for k, v in data.items() if k != 'average_scores' and isinstance(v, dict)}
+        
+        if not gait_entries:
+            logger.warning("❌ No valid gait entries found")
+            return None, None
+        
+        for key, entry in gait_entries.items():
+            self.record_sample(key, entry)
+        
+        # Get the latest well-formed entry (last keys first), parsed once for all requests that share it
+        for latest_key in reversed(list(gait_entries.keys())):
+            latest_data = parse_sample(latest_key, gait_entries[latest_key])
+            if latest_data is not None:
+                break
+        else:
+            # Nothing usable in the read window: keep serving the last good sample
+            return self._last_good_entry
+        
+        self._last_good_entry = (latest_key, latest_data)
+        
+        logger.debug(
+            "✅ Got latest gait data (key: %s, steps: %s, cadence: %s, walking speed: %s)",
+            latest_key, latest_data.steps, latest_data.cadence, latest_data.walking_speed
+        )
+        
+        return latest_key, latest_data
     
-    def get_average_scores(self) -> Optional[Dict]:
+    @staticmethod
+    def _extract_average_scores(data: Dict) -> GaitAverages:
+        """Pick the score fields the chatbot uses out of an average_scores node"""
+        return parse_averages(data)
+    
+    def get_average_scores(self) -> Optional[GaitAverages]:
         """Fetch average scores from Firebase"""
         try:
-            print("🔍 Fetching average scores from Firebase...")
-            
-            # Try the nested path first (inside gaitData)
-            ref = db.reference('gaitData/average_scores')
-            data = ref.get()
+            with span("get_average_scores"):
+                return self._averages_cache.get()
+        except Exception as e:
+            logger.exception("❌ Error fetching average scores: %s", e)
+            return GaitAverages()
+    
+    def _read_average_scores(self) -> GaitAverages:
+        logger.debug("🔍 Fetching average scores from Firebase...")
+        
+        # Try the remembered location first, then the nested path, then root level
+        paths = list(AVERAGE_SCORES_PATHS)
+        if self._average_scores_path in paths:
+            paths.remove(self._average_scores_path)
+            paths.insert(0, self._average_scores_path)
+        
+        self._ensure_app()
+        for path in paths:
+            data = db.reference(path).get()
             
             if data and isinstance(data, dict):
-                print(f"✅ Found average scores in gaitData/average_scores")
-                print(f"   Keys found: {list(data.keys())}")
-                
-                # Extract the scores
-                result = {
-                    'avgGaitScoreLast20': data.get('avgGaitScoreLast20') or data.get('avgGaitScoreLast100', 0),
-                    'avgClassificationLast20': data.get('avgClassificationLast20', 'Unknown')
-                }
+                self._average_scores_path = path
+                result = self._extract_average_scores(data)
                 
-                print(f"   Average Score: {result['avgGaitScoreLast20']}")
-                print(f"   Classification: {result['avgClassificationLast20']}")
+                logger.debug(
+                    "✅ Found average scores in %s (average score: %s, classification: %s)",
+                    path, result.avg_gait_score, result.classification
+                )
                 
                 return result
-            
-            # Try root level as fallback
-            ref = db.reference('average_scores')
-            data = ref.get()
-            
-            if data and isinstance(data, dict):
-                print(f"✅ Found average scores at root level")
-                return {
-                    'avgGaitScoreLast20': data.get('avgGaitScoreLast20') or data.get('avgGaitScoreLast100', 0),
-                    'avgClassificationLast20': data.get('avgClassificationLast20', 'Unknown')
-                }
-            
-            print("⚠️ No average scores found, using defaults")
-            return {
-                'avgGaitScoreLast20': 0,
-                'avgClassificationLast20': 'Unknown'
-            }
-            
+        
+        self._average_scores_path = None
+        logger.warning("⚠️ No average scores found, using defaults")
+        return GaitAverages()
+    
+    def record_sample(self, key: Optional[str], sample: Optional[Dict]):
+        """Feed a sample seen by a read or a live update into the rolling statistics"""
+        if self.rolling_stats is not None:
+            self.rolling_stats.add(key, sample)
+    
+    def record_ingested(self, entries: List[Tuple[str, GaitSample]]):
+        """Make samples this process is writing (key-ordered, newest last) visible to reads right away"""
+        if self.rolling_stats is not None:
+            self.rolling_stats.extend((key, sample.to_dict()) for key, sample in entries)
+        
+        key, sample = entries[-1]
+        # The shared snapshot of multi-worker mode is read-only here, and reads are served from it:
+        # there the sample becomes visible once written, when the refresher picks it up
+        snapshot = self.live_snapshot if isinstance(self.live_snapshot, GaitSnapshot) else None
+        latest_key = snapshot.latest_key if snapshot is not None else self._last_good_entry[0]
+        if latest_key is not None and firebase_key_order(key) <= firebase_key_order(latest_key):
+            return
+        
+        self._last_good_entry = (key, sample)
+        self._latest_cache.set((key, sample))
+        if snapshot is not None:
+            snapshot.update(latest_key=key, current=sample)
+    
+    def replace_rolling_samples(self, entries: List[Tuple[str, Dict]]):
+        """Rebuild the rolling window from an authoritative, key-ordered list of samples"""
+        if self.rolling_stats is not None:
+            self.rolling_stats.reset()
+            self.rolling_stats.extend(entries[-self.rolling_stats.window:])
+    
+    def seed_rolling_stats(self):
+        """Fill the rolling window with one bounded read of the newest samples"""
+        if self.rolling_stats is None:
+            return
+        
+        try:
+            self._ensure_app()
+            data = db.reference('gaitData').order_by_key().limit_to_last(settings.rolling_window + 1).get()
+            entries = [(k, v) for k, v in (data or {}).items() if k != 'average_scores' and isinstance(v, dict)]
+            self.replace_rolling_samples(entries)
+            logger.info("✅ Rolling stats seeded with %d samples", len(entries))
         except Exception as e:
-            print(f"❌ Error fetching average scores: {e}")
-            import traceback
-            traceback.print_exc()
-            return {
-                'avgGaitScoreLast20': 0,
-                'avgClassificationLast20': 'Unknown'
-            }
+            logger.error("❌ Error seeding rolling stats: %s", e)
+    
+    def refresh_trends(self):
+        """Re-read the newest daily and weekly rollups (two bounded reads)"""
+        try:
+            self._ensure_app()
+            self.trends = read_trends(settings.rollup_trend_days, settings.rollup_trend_weeks)
+        except Exception as e:
+            logger.error("❌ Error reading gait rollups: %s", e)
+    
+    def cache_stats(self) -> Dict:
+        """Hit, miss and refresh counters of the Firebase read caches"""
+        return {
+            self._latest_cache.name: self._latest_cache.stats(),
+            self._averages_cache.name: self._averages_cache.stats()
+        }
+    
+    @property
+    def average_scores_path(self) -> Optional[str]:
+        """Location of the average_scores node found by the last lookup"""
+        return self._average_scores_path
+    
+    def start_live_snapshot(self):
+        """Subscribe to gaitData and keep an in-process snapshot of it"""
+        if self._live_listener:
+            return
+        
+        self._ensure_app()
+        self.live_snapshot = GaitSnapshot()
+        self._live_listener = LiveGaitListener(self, self.live_snapshot)
+        self._live_listener.start()
+    
+    def attach_shared_snapshot(self, path: str):
+        """Serve gait data from the segment the refresher process writes (multi-worker mode)"""
+        self.live_snapshot = SharedGaitSnapshot(path)
+        # The refresher keeps the rolling window; its summary comes with the snapshot
+        self.rolling_stats = None
+    
+    def stop_live_snapshot(self):
+        if self._live_listener:
+            self._live_listener.stop()
+        elif isinstance(self.live_snapshot, SharedGaitSnapshot):
+            self.live_snapshot.close()
+        self._live_listener = None
+        self.live_snapshot = None
+    
+    def _snapshot_usable(self) -> bool:
+        snapshot = self.live_snapshot
+        if not snapshot or not snapshot.ready or not snapshot.connected:
+            return False
+        
+        max_staleness = settings.firebase_snapshot_max_staleness
+        return max_staleness <= 0 or snapshot.staleness() <= max_staleness
     
     def get_all_data(self) -> Dict:
         """Get both current and average data"""
-        current = self.get_latest_gait_data()
+        # Live snapshot mode: no network I/O on the request path
+        if self._snapshot_usable():
+            return self._with_summaries(self.live_snapshot.read())
+        
+        latest_key, current = self.get_latest_gait_entry()
         averages = self.get_average_scores()
         
-        result = {
+        return self._combine(latest_key, current, averages)
+    
+    async def get_all_data_async(self) -> Dict:
+        """Async get_all_data: both reads run concurrently on the blocking-I/O pool"""
+        if self._snapshot_usable():
+            return self._with_summaries(self.live_snapshot.read())
+        
+        (latest_key, current), averages = await asyncio.gather(
+            run_blocking(self.get_latest_gait_entry),
+            run_blocking(self.get_average_scores)
+        )
+        
+        return self._combine(latest_key, current, averages)
+    
+    def _with_summaries(self, result: Dict) -> Dict:
+        if self.rolling_stats is not None and self.rolling_stats.size:
+            result["rolling"] = self.rolling_stats.summary()
+        # In multi-worker mode the shared snapshot already carries the refresher's trends
+        if self.trends and "trends" not in result:
+            result["trends"] = self.trends
+        return result
+    
+    def _combine(self, latest_key: Optional[str], current: Optional[GaitSample],
+                 averages: Optional[GaitAverages]) -> Dict:
+        result = self._with_summaries({
+            "latest_key": latest_key,
             "current": current,
             "averages": averages
-        }
+        })
         
-        print(f"\n📊 Firebase Data Summary:")
-        print(f"   Current data: {'✅ Available' if current else '❌ Missing'}")
-        print(f"   Average data: {'✅ Available' if averages else '❌ Missing'}\n")
+        logger.debug(
+            "📊 Firebase data summary: current %s, averages %s",
+            "available" if current else "missing", "available" if averages else "missing"
+        )
         
         return result
\ No newline at end of file
@@ -0,0 +1,79 @@
+import logging
+from typing import Optional
+from app.models.schemas import GaitAverages, GaitSample
+from app.services.metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+# Healthy adult reference ranges quoted to users
+CADENCE_RANGE = "100-120 steps/min"
+SPEED_RANGE = "1.2-1.4 m/s"
+EQUILIBRIUM_RANGE = "0.7-1.0"
+
+
+def fmt(value: Optional[float], decimals=2) -> str:
+    """Format a sensor value for display (values are already numbers, see GaitSample)"""
+    return f"{value:.{decimals}f}" if value is not None else "N/A"
+
+
+def cadence_status(cadence: Optional[float]) -> str:
+    if cadence is None:
+        return "unknown"
+    return "below optimal" if cadence < 100 else ("optimal" if cadence <= 120 else "above normal")
+
+
+def speed_status(walking_speed: Optional[float]) -> str:
+    if walking_speed is None:
+        return "unknown"
+    return "below normal" if walking_speed < 1.2 else ("optimal" if walking_speed <= 1.4 else "fast")
+
+
+def equilibrium_status(equilibrium: Optional[float]) -> str:
+    if equilibrium is None:
+        return "unknown"
+    return "poor" if equilibrium < 0.5 else ("fair" if equilibrium < 0.7 else "excellent")
+
+
+def as_number(value) -> Optional[float]:
+    """Coerce a sensor value to float, or None when it is missing or malformed"""
+    try:
+        return float(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+REJECTED_SAMPLES = REGISTRY.counter(
+    "gait_chat_rejected_samples_total", "Malformed gait payloads dropped as they entered the service", ("kind",))
+
+
+def parse_sample(key: Optional[str], raw) -> Optional[GaitSample]:
+    """GaitSample from a gaitData entry, or None (logged and counted) when it is not an object
+
+    Invalid fields are dropped (logged and counted) and the rest of the sample kept.
+    """
+    errors = []
+    try:
+        sample = GaitSample.from_firebase(raw, errors)
+    except ValueError as e:
+        REJECTED_SAMPLES.inc(kind="sample")
+        logger.warning("⚠️ Skipping malformed gait sample %s: %s", key, e)
+        return None
+    for error in errors:
+        REJECTED_SAMPLES.inc(kind="field")
+        logger.warning("⚠️ Dropping invalid field of gait sample %s: %s", key, error)
+    return sample
+
+
+def parse_averages(raw) -> GaitAverages:
+    """GaitAverages from an average_scores node; defaults when it is not an object"""
+    errors = []
+    try:
+        averages = GaitAverages.from_firebase(raw, errors)
+    except ValueError as e:
+        REJECTED_SAMPLES.inc(kind="averages")
+        logger.warning("⚠️ Ignoring malformed average scores: %s", e)
+        return GaitAverages()
+    for error in errors:
+        REJECTED_SAMPLES.inc(kind="field")
+        logger.warning("⚠️ Ignoring invalid average score: %s", error)
+    return averages
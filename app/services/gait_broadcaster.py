@@ -0,0 +1,248 @@
+import asyncio
+import logging
+import time
+import orjson
+from typing import Dict, Optional, Set
+from app.config.settings import get_settings
+from app.models.schemas import gait_payload
+from app.services.metrics import REGISTRY
+from app.services.response_cache import gait_fingerprint
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+# Parts of get_all_data() pushed to clients
+SECTIONS = ("current", "averages")
+
+WS_MESSAGES = REGISTRY.counter(
+    "gait_chat_ws_messages_total", "Gait feed messages queued to WebSocket clients", ("type",))
+WS_RESYNCS = REGISTRY.counter(
+    "gait_chat_ws_resyncs_total", "Slow WebSocket clients whose backlog was collapsed into one snapshot")
+FEED_READS = REGISTRY.counter(
+    "gait_chat_ws_feed_reads_total", "Gait data reads made by the shared WebSocket feed")
+GAIT_DATA_RESPONSES = REGISTRY.counter(
+    "gait_chat_gait_data_responses_total", "/gait-data responses by status and whether the client long-polled",
+    ("status", "waited"))
+
+_MISSING = object()
+
+
+def gait_etag(data: Dict) -> Optional[str]:
+    """Strong ETag for a get_all_data() result: the latest sample key plus a hash of every cited section"""
+    if not data.get("current"):
+        return None
+    return f'"{data.get("latest_key")}-{gait_fingerprint(data)}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: Optional[str]) -> bool:
+    """Whether an If-None-Match header names `etag` (weak comparison, as RFC 9110 asks for GET)"""
+    if not if_none_match or not etag:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.removeprefix("W/") == etag:
+            return True
+    return False
+
+
+def gait_delta(previous: Dict, data: Dict) -> Dict:
+    """Changed sections; dict sections carry only their changed fields (None marks a removed one)"""
+    delta = {}
+    for section in SECTIONS:
+        old, new = previous.get(section), data.get(section)
+        if old == new:
+            continue
+        if isinstance(old, dict) and isinstance(new, dict):
+            changes = {field: value for field, value in new.items() if old.get(field, _MISSING) != value}
+            changes.update({field: None for field in old if field not in new})
+            delta[section] = changes
+        else:
+            delta[section] = new
+    return delta
+
+
+class GaitSubscriber:
+    """One client's bounded queue of serialized feed messages"""
+
+    def __init__(self, broadcaster: "GaitBroadcaster"):
+        self.broadcaster = broadcaster
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max(1, settings.ws_max_pending))
+
+    def offer(self, message: str):
+        try:
+            self.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            # The client fell behind: replace its backlog with the current state
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(self.broadcaster.snapshot_message())
+            WS_RESYNCS.inc()
+
+    async def get(self) -> str:
+        return await self.queue.get()
+
+
+class GaitBroadcaster:
+    """A single gait data feed fanned out to every connected WebSocket client
+
+    The feed reads the data once per change, however many clients are
+    connected: on each live snapshot update when the streaming listener is
+    on, otherwise every `ws_poll_interval` seconds while anyone is
+    subscribed or long-polling. Each change is diffed against the last one
+    sent and serialized once; clients receive only the fields that changed.
+
+    It also backs GET /gait-data: the whole payload is kept serialized with
+    its ETag, and is re-read at most once per `ws_poll_interval` however
+    many clients poll.
+    """
+
+    def __init__(self, firebase_service):
+        self.firebase_service = firebase_service
+        self.poll_interval = settings.ws_poll_interval
+
+        self._subscribers: Set[GaitSubscriber] = set()
+        self._data: Optional[Dict] = None
+        self._sequence = 0
+        self._waiters = 0
+
+        # Full payload for GET /gait-data, serialized once per change
+        self.etag: Optional[str] = None
+        self.body: Optional[bytes] = None
+        self._read_at: Optional[float] = None
+        self._published = asyncio.Event()  # set and replaced whenever the ETag changes
+
+        self._changed = asyncio.Event()
+        self._refresh_lock = asyncio.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._snapshot = None
+        self._task: Optional[asyncio.Task] = None
+
+        REGISTRY.gauge("gait_chat_ws_clients", "Connected WebSocket clients",
+                       lambda: len(self._subscribers))
+        REGISTRY.gauge("gait_chat_gait_data_waiters", "GET /gait-data requests waiting for a newer sample",
+                       lambda: self._waiters)
+
+    def start(self):
+        self._loop = asyncio.get_running_loop()
+        self._task = asyncio.create_task(self._run())
+
+    def watch(self, snapshot):
+        """Publish as soon as the live snapshot changes instead of waiting for the next poll"""
+        self._snapshot = snapshot
+        snapshot.add_observer(self._on_snapshot_change)
+
+    async def stop(self):
+        if self._snapshot is not None:
+            self._snapshot.remove_observer(self._on_snapshot_change)
+        if self._task and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    def _on_snapshot_change(self):
+        # Runs on a Firebase listener thread
+        self._loop.call_soon_threadsafe(self._changed.set)
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._changed.wait(), self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._changed.clear()
+
+            if not self._subscribers and not self._waiters:
+                continue
+            try:
+                await self.refresh()
+            except Exception as e:
+                logger.error("❌ Error refreshing gait feed: %s", e)
+
+    async def refresh(self, max_age: Optional[float] = None):
+        """Read the gait data once and publish what changed
+
+        With `max_age`, skip the read if the last one is at most that many
+        seconds old; concurrent callers then share a single read.
+        """
+        async with self._refresh_lock:
+            if max_age is not None and self._read_at is not None and time.monotonic() - self._read_at <= max_age:
+                return
+            data = await self.firebase_service.get_all_data_async()
+            FEED_READS.inc()
+            self._read_at = time.monotonic()
+            self.publish(data)
+
+    def publish(self, data: Dict):
+        payload = gait_payload(data)
+        etag = gait_etag(data)
+        if etag != self.etag or self.body is None:
+            self.etag = etag
+            self.body = orjson.dumps(payload)
+            self._published.set()
+            self._published = asyncio.Event()
+
+        data = {section: payload.get(section) for section in SECTIONS}
+        delta = gait_delta(self._data, data) if self._data is not None else data
+        self._data = data
+        if not delta:
+            return
+
+        self._sequence += 1
+        message = orjson.dumps({"type": "gait_delta", "seq": self._sequence, **delta}).decode()
+        for subscriber in list(self._subscribers):
+            subscriber.offer(message)
+        WS_MESSAGES.inc(len(self._subscribers), type="gait_delta")
+
+    def invalidate(self):
+        """The data changed in this process (an ingest): re-read on the next request and push to clients"""
+        self._read_at = None
+        self._changed.set()
+
+    async def latest(self):
+        """ETag and serialized payload of the current gait data, re-read if older than the poll interval"""
+        await self.refresh(max_age=self.poll_interval)
+        return self.etag, self.body
+
+    async def wait_for_change(self, etag: str, timeout: float) -> bool:
+        """Wait until the data no longer matches `etag`; False if `timeout` passes first
+
+        Waiters keep the feed polling, the same as WebSocket subscribers.
+        """
+        deadline = time.monotonic() + timeout
+        self._waiters += 1
+        try:
+            while self.etag == etag:
+                left = deadline - time.monotonic()
+                if left <= 0:
+                    return False
+                try:
+                    await asyncio.wait_for(self._published.wait(), left)
+                except asyncio.TimeoutError:
+                    return False
+            return True
+        finally:
+            self._waiters -= 1
+
+    def snapshot_message(self) -> str:
+        data = self._data or {section: None for section in SECTIONS}
+        return orjson.dumps({"type": "gait_snapshot", "seq": self._sequence, **data}).decode()
+
+    async def subscribe(self) -> GaitSubscriber:
+        """Register a client; its first message is the full current state"""
+        if not self._subscribers:
+            # Nothing was read while nobody listened
+            try:
+                await self.refresh()
+            except Exception as e:
+                logger.error("❌ Error reading gait data for a new subscriber: %s", e)
+
+        subscriber = GaitSubscriber(self)
+        subscriber.offer(self.snapshot_message())
+        WS_MESSAGES.inc(type="gait_snapshot")
+        self._subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber: GaitSubscriber):
+        self._subscribers.discard(subscriber)
@@ -0,0 +1,265 @@
+import json
+import logging
+import os
+import threading
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+import numpy as np
+from app.services import realtime_db as db
+from app.config.settings import get_settings
+from app.services.gait_analysis import as_number
+from app.services.gait_snapshot import firebase_key_order
+from app.services.rolling_stats import ROLLING_METRICS
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+# Columns kept for every sample, besides the timestamp index
+HISTORY_METRICS = ('steps',) + ROLLING_METRICS
+
+# Alphabet of Firebase push IDs; the first 8 characters encode the creation time in ms
+PUSH_CHARS = '-0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ_abcdefghijklmnopqrstuvwxyz'
+_PUSH_VALUES = {char: index for index, char in enumerate(PUSH_CHARS)}
+
+
+def push_key_time(key: str) -> Optional[float]:
+    """Creation time (seconds) encoded in a Firebase push ID, if the key is one"""
+    if len(key) != 20:
+        return None
+    millis = 0
+    for char in key[:8]:
+        value = _PUSH_VALUES.get(char)
+        if value is None:
+            return None
+        millis = millis * 64 + value
+    return millis / 1000.0
+
+
+def sample_time(key: str, sample: Dict) -> float:
+    """Sample timestamp: its 'timestamp' field (s or ms), else the push ID time, else now"""
+    stamp = as_number(sample.get('timestamp'))
+    if stamp is not None:
+        return stamp / 1000.0 if stamp > 1e11 else stamp
+    return push_key_time(key) or time.time()
+
+
+class GaitHistoryStore:
+    """Columnar, memory-mapped local copy of gait history
+
+    One float64 file per metric plus a timestamp index, all the same length,
+    mapped with np.memmap. Samples are appended in key order, so timestamps are
+    sorted and time ranges resolve to slices with two binary searches; range
+    reads are views into the maps rather than copies.
+    """
+
+    def __init__(self, directory: str, initial_capacity: int = 4096):
+        self.directory = directory
+        self._lock = threading.RLock()
+        self._sync_lock = threading.Lock()
+        self._columns: Dict[str, np.memmap] = {}
+        self.count = 0
+        self.capacity = 0
+        self.last_key: Optional[str] = None
+        self.last_sync: Optional[float] = None
+
+        os.makedirs(directory, exist_ok=True)
+        meta = self._read_meta()
+        self.count = meta.get("count", 0)
+        self.last_key = meta.get("last_key")
+        self._map(max(meta.get("capacity", 0), initial_capacity))
+
+    # ---- storage ----
+
+    def _path(self, column: str) -> str:
+        return os.path.join(self.directory, f"{column}.f8")
+
+    def _read_meta(self) -> Dict:
+        try:
+            with open(os.path.join(self.directory, "meta.json")) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _write_meta(self):
+        path = os.path.join(self.directory, "meta.json")
+        with open(path + ".tmp", "w") as f:
+            json.dump({"count": self.count, "capacity": self.capacity, "last_key": self.last_key}, f)
+        os.replace(path + ".tmp", path)
+
+    def _map(self, capacity: int):
+        """(Re)map every column file with room for `capacity` samples"""
+        for column in ('timestamp',) + HISTORY_METRICS:
+            path = self._path(column)
+            size = capacity * 8
+            with open(path, "ab") as f:
+                if f.tell() < size:
+                    f.truncate(size)
+            self._columns[column] = np.memmap(path, dtype=np.float64, mode="r+", shape=(capacity,))
+        self.capacity = capacity
+
+    def append(self, entries: Sequence[Tuple[str, Dict]]) -> int:
+        """Append key-ordered samples newer than last_key; returns how many were stored"""
+        last = None if self.last_key is None else firebase_key_order(self.last_key)
+        entries = [(key, sample) for key, sample in entries
+                   if isinstance(sample, dict) and (last is None or firebase_key_order(key) > last)]
+        if not entries:
+            return 0
+
+        with self._lock:
+            needed = self.count + len(entries)
+            if needed > self.capacity:
+                self._flush()
+                self._map(max(needed, self.capacity * 2))
+
+            start, end = self.count, needed
+            stamps = np.array([sample_time(key, sample) for key, sample in entries])
+            # Keep the index sorted even if a sensor clock steps backwards
+            floor = self._columns['timestamp'][start - 1] if start else -np.inf
+            self._columns['timestamp'][start:end] = np.maximum.accumulate(np.maximum(stamps, floor))
+
+            for column in HISTORY_METRICS:
+                self._columns[column][start:end] = [
+                    np.nan if (value := as_number(sample.get(column))) is None else value
+                    for _, sample in entries
+                ]
+
+            self.count = end
+            self.last_key = entries[-1][0]
+            self._flush()
+            self._write_meta()
+        return len(entries)
+
+    def _flush(self):
+        for column in self._columns.values():
+            column.flush()
+
+    # ---- sync from Firebase ----
+
+    def sync(self, page_size: int = 1000, wait: bool = True) -> int:
+        """Pull samples newer than last_key from gaitData, one bounded page at a time
+
+        With wait=False, return 0 at once if another sync is running rather
+        than holding a thread until it ends.
+        """
+        added = 0
+        if not self._sync_lock.acquire(blocking=wait):
+            return 0
+        try:
+            cursor = self.last_key
+            while True:
+                query = db.reference('gaitData').order_by_key()
+                if cursor is not None:
+                    query = query.start_at(cursor)
+                data = query.limit_to_first(page_size + 1).get() or {}
+
+                keys = list(data.keys())
+                added += self.append([(key, value) for key, value in data.items()
+                                      if key != 'average_scores' and key != cursor])
+                # Page on the raw keys so a page of skipped entries still advances
+                if len(keys) <= page_size or keys[-1] == cursor:
+                    break
+                cursor = keys[-1]
+
+            self.last_sync = time.time()
+        finally:
+            self._sync_lock.release()
+        if added:
+            logger.info("✅ Gait history synced %d new samples (%d total)", added, self.count)
+        return added
+
+    def reload(self):
+        """Pick up samples another process (the multi-worker refresher) appended"""
+        meta = self._read_meta()
+        with self._lock:
+            if meta.get("capacity", 0) > self.capacity:
+                self._map(meta["capacity"])
+            self.count = meta.get("count", self.count)
+            self.last_key = meta.get("last_key", self.last_key)
+
+    def sync_if_due(self):
+        """Catch up if the last sync is old; never waits on a sync already running (e.g. the startup one)"""
+        if settings.shared_snapshot_path:
+            # Workers only read; the refresher process is the single writer
+            self.reload()
+            return
+        if self.last_sync is None or time.time() - self.last_sync >= settings.history_sync_interval:
+            self.sync(settings.history_sync_page_size, wait=False)
+
+    # ---- queries ----
+
+    def query(
+        self,
+        start: Optional[float] = None,
+        end: Optional[float] = None,
+        metrics: Optional[List[str]] = None,
+        bucket_seconds: float = 0,
+        offset: int = 0,
+        limit: int = 500
+    ) -> Dict:
+        """Samples (or per-bucket means) in [start, end], paginated, plus range aggregates"""
+        metrics = [m for m in (metrics or HISTORY_METRICS) if m in HISTORY_METRICS]
+
+        with self._lock:
+            stamps = self._columns['timestamp'][:self.count]
+            lo = 0 if start is None else int(np.searchsorted(stamps, start, side='left'))
+            hi = self.count if end is None else int(np.searchsorted(stamps, end, side='right'))
+            stamps = stamps[lo:hi]
+            columns = {m: self._columns[m][lo:hi] for m in metrics}
+
+            summary = {}
+            for metric, values in columns.items():
+                present = ~np.isnan(values)
+                n = int(present.sum())
+                summary[metric] = {
+                    "count": n,
+                    "mean": float(np.nanmean(values)) if n else None,
+                    "min": float(np.nanmin(values)) if n else None,
+                    "max": float(np.nanmax(values)) if n else None
+                }
+
+            if bucket_seconds > 0 and len(stamps):
+                # Buckets are contiguous runs of the sorted index: reduceat needs no Python loop
+                buckets = np.floor(stamps / bucket_seconds)
+                starts = np.concatenate(([0], np.flatnonzero(np.diff(buckets)) + 1))
+                times = buckets[starts] * bucket_seconds
+                series = {}
+                for metric, values in columns.items():
+                    present = ~np.isnan(values)
+                    totals = np.add.reduceat(np.where(present, values, 0.0), starts)
+                    counts = np.add.reduceat(present.astype(np.int64), starts)
+                    with np.errstate(invalid='ignore', divide='ignore'):
+                        series[metric] = np.where(counts > 0, totals / counts, np.nan)
+            else:
+                times = stamps
+                series = columns
+
+            total = len(times)
+            page = slice(offset, offset + limit)
+            return {
+                "start": start,
+                "end": end,
+                "bucket_seconds": bucket_seconds or None,
+                "total": total,
+                "offset": offset,
+                "limit": limit,
+                "timestamps": times[page].tolist(),
+                "series": {metric: _json_floats(values[page]) for metric, values in series.items()},
+                "summary": summary
+            }
+
+
+def _json_floats(values: np.ndarray) -> List[Optional[float]]:
+    return [None if value != value else value for value in values.tolist()]
+
+
+_store: Optional[GaitHistoryStore] = None
+_store_lock = threading.Lock()
+
+
+def get_history_store() -> GaitHistoryStore:
+    """Process-wide history store, opened on first use"""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = GaitHistoryStore(settings.history_store_dir)
+        return _store
@@ -0,0 +1,203 @@
+import asyncio
+import logging
+import random
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+from app.config.settings import get_settings
+from app.models.schemas import GAIT_SAMPLE_FIELDS, GaitSample
+from app.services import realtime_db as db
+from app.services.admission import OverloadedError
+from app.services.executor import run_blocking
+from app.services.gait_history import PUSH_CHARS
+from app.services.metrics import REGISTRY, span
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+# outcome: accepted / rejected (invalid) / shed (buffer full) / written / failed (write errors, retried)
+INGEST_SAMPLES = REGISTRY.counter(
+    "gait_chat_ingest_samples_total", "Ingested gait samples by outcome", ("outcome",))
+INGEST_FLUSHES = REGISTRY.counter(
+    "gait_chat_ingest_flushes_total", "Multi-path updates written by the ingest buffer", ("result",))
+
+_MEASUREMENT_FIELDS = tuple(field for _, field in GAIT_SAMPLE_FIELDS if field != 'timestamp')
+
+
+class PushKeyGenerator:
+    """Firebase push IDs (8 characters of ms timestamp, 12 random), strictly increasing per process
+
+    Within one millisecond, or if the clock steps back, the random part is
+    incremented instead of redrawn, as the Firebase clients do.
+    """
+
+    def __init__(self, rng: Optional[random.Random] = None):
+        self._rng = rng or random.SystemRandom()
+        self._lock = threading.Lock()
+        self._last_millis = 0
+        self._prefix = ""
+        self._random = [0] * 12
+
+    def __call__(self) -> str:
+        with self._lock:
+            millis = int(time.time() * 1000)
+            if millis > self._last_millis:
+                self._random = [self._rng.randrange(64) for _ in range(12)]
+                self._last_millis = millis
+                self._prefix = ""
+                for _ in range(8):
+                    self._prefix = PUSH_CHARS[millis % 64] + self._prefix
+                    millis //= 64
+            else:
+                for index in range(11, -1, -1):
+                    if self._random[index] < 63:
+                        self._random[index] += 1
+                        break
+                    self._random[index] = 0
+            return self._prefix + "".join(PUSH_CHARS[value] for value in self._random)
+
+
+def validate_sample(raw) -> GaitSample:
+    """A sensor sample as it will be stored (stamped with the arrival time if it has none)
+
+    ValueError if it is malformed or has no gait fields.
+    """
+    if isinstance(raw, dict) and raw.get('timestamp') is None:
+        raw = {**raw, 'timestamp': int(time.time() * 1000)}
+    sample = GaitSample.from_firebase(raw)
+    if not any(raw.get(field) is not None for field in _MEASUREMENT_FIELDS):
+        raise ValueError("no gait fields")
+    return sample
+
+
+class GaitIngestBuffer:
+    """Buffers ingested gait samples and writes them to gaitData in batches
+
+    Accepted samples get push keys right away and are applied to this
+    process's latest-entry cache, live snapshot and rolling statistics, so
+    reads see them without a round-trip (in multi-worker mode reads come
+    from the shared snapshot, so there they show up once written). Writes
+    go out as one multi-path update once `ingest_batch_size` samples are
+    pending or every `ingest_flush_interval` seconds, up to
+    `ingest_max_concurrent_writes` at a time (push keys carry their order,
+    so writes may land in any order); a failed write is put back and retried.
+    Samples buffered or in flight are capped at `ingest_max_pending`; beyond
+    that, batches are refused with OverloadedError (HTTP 429).
+    """
+
+    def __init__(self, firebase_service, broadcaster=None):
+        self.firebase_service = firebase_service
+        self.broadcaster = broadcaster
+        self.batch_size = max(1, settings.ingest_batch_size)
+        self.flush_interval = settings.ingest_flush_interval
+        self.max_pending = settings.ingest_max_pending
+        self.max_writes = max(1, settings.ingest_max_concurrent_writes)
+
+        self._new_key = PushKeyGenerator()
+        self._pending: "OrderedDict[str, Dict]" = OrderedDict()
+        self._in_flight = 0
+        self._full = asyncio.Event()
+        self._stopping = False
+        self._task: Optional[asyncio.Task] = None
+
+        REGISTRY.gauge("gait_chat_ingest_pending", "Ingested samples not yet written to Firebase",
+                       lambda: self.pending)
+
+    @property
+    def pending(self) -> int:
+        return len(self._pending) + self._in_flight
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the flusher and write what is still buffered"""
+        # Not cancelled: that could abandon a write, and wait_for() may swallow it
+        self._stopping = True
+        self._full.set()
+        if self._task is not None:
+            await self._task
+        await self.flush()
+        if self._pending:
+            logger.error("❌ %d ingested samples were not written before shutdown", len(self._pending))
+
+    def submit(self, samples: List) -> Tuple[List[str], List[Tuple[int, str]]]:
+        """Validate and buffer a batch; returns the keys of the accepted samples and (index, error) for the rest"""
+        if self.pending + len(samples) > self.max_pending:
+            INGEST_SAMPLES.inc(len(samples), outcome="shed")
+            raise OverloadedError(
+                f"{self.pending} samples are waiting to be written", retry_after=max(1.0, self.flush_interval))
+
+        accepted: List[Tuple[str, GaitSample]] = []
+        errors: List[Tuple[int, str]] = []
+        for index, raw in enumerate(samples):
+            try:
+                sample = validate_sample(raw)
+            except ValueError as e:
+                errors.append((index, str(e)))
+                continue
+            accepted.append((self._new_key(), sample))
+
+        if errors:
+            INGEST_SAMPLES.inc(len(errors), outcome="rejected")
+        if not accepted:
+            return [], errors
+
+        for key, sample in accepted:
+            self._pending[key] = sample.to_dict()
+        INGEST_SAMPLES.inc(len(accepted), outcome="accepted")
+
+        self.firebase_service.record_ingested(accepted)
+        if self.broadcaster is not None:
+            self.broadcaster.invalidate()
+        if len(self._pending) >= self.batch_size:
+            self._full.set()
+        return [key for key, _ in accepted], errors
+
+    async def _run(self):
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self._full.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._full.clear()
+            await self.flush()
+
+    async def flush(self):
+        """Write everything buffered, `batch_size` samples per multi-path update"""
+        while self._pending:
+            batches = []
+            while self._pending and len(batches) < self.max_writes:
+                batch = OrderedDict()
+                while self._pending and len(batch) < self.batch_size:
+                    key, sample = self._pending.popitem(last=False)
+                    batch[key] = sample
+                batches.append(batch)
+
+            written = await asyncio.gather(*[self._write_batch(batch) for batch in batches])
+            if not all(written):
+                return
+
+    async def _write_batch(self, batch: Dict[str, Dict]) -> bool:
+        self._in_flight += len(batch)
+        try:
+            await run_blocking(self._write, batch)
+        except Exception as e:
+            # Back to the front of the queue, to be retried on the next flush
+            self._pending = OrderedDict(list(batch.items()) + list(self._pending.items()))
+            INGEST_FLUSHES.inc(result="error")
+            INGEST_SAMPLES.inc(len(batch), outcome="failed")
+            logger.error("❌ Error writing %d ingested samples: %s", len(batch), e)
+            return False
+        finally:
+            self._in_flight -= len(batch)
+
+        INGEST_FLUSHES.inc(result="ok")
+        INGEST_SAMPLES.inc(len(batch), outcome="written")
+        return True
+
+    def _write(self, batch: Dict[str, Dict]):
+        with span("ingest_flush"):
+            self.firebase_service._ensure_app()
+            db.reference('gaitData').update(batch)
@@ -0,0 +1,258 @@
+import logging
+import math
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+from zoneinfo import ZoneInfo
+from app.config.settings import get_settings
+from app.services import realtime_db as db
+from app.services.gait_analysis import as_number, cadence_status, equilibrium_status, speed_status
+from app.services.gait_history import sample_time
+from app.services.metrics import REGISTRY
+from app.services.rolling_stats import ROLLING_METRICS
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+ROLLUPS_PATH = 'gaitRollups'
+
+# Fixed histogram range per metric; percentiles are read off the histogram so
+# that a period's state merges new samples without keeping them
+METRIC_RANGES = {
+    'cadence': (0.0, 200.0),
+    'walkingSpeed': (0.0, 3.0),
+    'strideLength': (0.0, 2.5),
+    'stepWidth': (0.0, 0.5),
+    'equilibriumScore': (0.0, 1.0),
+    'posturalSway': (0.0, 20.0),
+    'frequency': (0.0, 4.0),
+}
+HISTOGRAM_BINS = 100
+PERCENTILES = (10, 50, 90)
+
+# Per-sample classifications counted in each period, from the thresholds the prompt uses
+STATUS_FUNCTIONS = {
+    'cadence': cadence_status,
+    'walkingSpeed': speed_status,
+    'equilibriumScore': equilibrium_status,
+}
+
+# Open periods kept in memory between runs, so steady-state runs read no state back
+MAX_OPEN_PERIODS = 16
+
+ROLLUP_SAMPLES = REGISTRY.counter(
+    "gait_chat_rollup_samples_total", "Gait samples folded into the daily/weekly rollups")
+
+
+def period_keys(timestamp: float, tz) -> Dict[str, str]:
+    """Keys of the day and ISO week containing `timestamp`; both sort chronologically"""
+    moment = datetime.fromtimestamp(timestamp, tz)
+    year, week, _ = moment.isocalendar()
+    return {'daily': moment.date().isoformat(), 'weekly': f"{year}-W{week:02d}"}
+
+
+class PeriodRollup:
+    """Mergeable statistics of one day or week
+
+    The state (counts, sums, extremes and a fixed-bin histogram per metric,
+    status counts) is persisted under gaitRollups/state; summary() is the
+    compact form readers use.
+    """
+
+    def __init__(self, state: Optional[Dict] = None):
+        state = state or {}
+        self.count = int(state.get('count', 0))
+        self.first = state.get('first')
+        self.last = state.get('last')
+        self.metrics: Dict[str, Dict] = {}
+        for metric in ROLLING_METRICS:
+            saved = (state.get('metrics') or {}).get(metric) or {}
+            histogram = list(saved.get('histogram') or [])
+            self.metrics[metric] = {
+                'count': int(saved.get('count', 0)),
+                'sum': float(saved.get('sum', 0.0)),
+                'sum_sq': float(saved.get('sum_sq', 0.0)),
+                'min': saved.get('min'),
+                'max': saved.get('max'),
+                'histogram': (histogram + [0] * HISTOGRAM_BINS)[:HISTOGRAM_BINS]
+            }
+        self.classification: Dict[str, Dict[str, int]] = {
+            metric: dict((state.get('classification') or {}).get(metric) or {}) for metric in STATUS_FUNCTIONS
+        }
+
+    def add(self, timestamp: float, sample: Dict):
+        self.count += 1
+        self.first = timestamp if self.first is None else min(self.first, timestamp)
+        self.last = timestamp if self.last is None else max(self.last, timestamp)
+
+        for metric in ROLLING_METRICS:
+            value = as_number(sample.get(metric))
+            if value is None or not math.isfinite(value):
+                continue
+            stats = self.metrics[metric]
+            stats['count'] += 1
+            stats['sum'] += value
+            stats['sum_sq'] += value * value
+            stats['min'] = value if stats['min'] is None else min(stats['min'], value)
+            stats['max'] = value if stats['max'] is None else max(stats['max'], value)
+            low, high = METRIC_RANGES[metric]
+            index = int((value - low) / (high - low) * HISTOGRAM_BINS)
+            stats['histogram'][min(max(index, 0), HISTOGRAM_BINS - 1)] += 1
+
+        for metric, status in STATUS_FUNCTIONS.items():
+            label = status(as_number(sample.get(metric)))
+            if label != "unknown":
+                counts = self.classification[metric]
+                counts[label] = counts.get(label, 0) + 1
+
+    def state(self) -> Dict:
+        return {
+            'count': self.count,
+            'first': self.first,
+            'last': self.last,
+            'metrics': self.metrics,
+            'classification': self.classification
+        }
+
+    def summary(self) -> Dict:
+        metrics = {}
+        for metric, stats in self.metrics.items():
+            n = stats['count']
+            if not n:
+                continue
+            mean = stats['sum'] / n
+            summary = {
+                'count': n,
+                'mean': round(mean, 4),
+                'std': round(math.sqrt(max(stats['sum_sq'] / n - mean * mean, 0.0)), 4),
+                'min': stats['min'],
+                'max': stats['max']
+            }
+            for q in PERCENTILES:
+                summary[f'p{q}'] = round(self._percentile(metric, q), 4)
+            metrics[metric] = summary
+        return {
+            'count': self.count,
+            'first': self.first,
+            'last': self.last,
+            'metrics': metrics,
+            'classification': {metric: counts for metric, counts in self.classification.items() if counts}
+        }
+
+    def _percentile(self, metric: str, q: float) -> float:
+        """Percentile interpolated within its histogram bin, clamped to the observed range"""
+        stats = self.metrics[metric]
+        low, high = METRIC_RANGES[metric]
+        width = (high - low) / HISTOGRAM_BINS
+        target = q / 100 * stats['count']
+        seen = 0
+        for index, count in enumerate(stats['histogram']):
+            if count and seen + count >= target:
+                value = low + width * (index + (target - seen) / count)
+                return min(max(value, stats['min']), stats['max'])
+            seen += count
+        return stats['max']
+
+
+class GaitRollupJob:
+    """Folds new gaitData samples into per-day and per-week rollups under gaitRollups
+
+    Each run pages through the samples after the persisted checkpoint key,
+    and writes every page's touched periods (state and summary) together
+    with the advanced checkpoint in one multi-path update, so a sample is
+    counted once even if the process stops mid-run. Only one process should
+    run the job (the app itself, or the refresher in multi-worker mode).
+    """
+
+    def __init__(self, firebase_service=None):
+        self.firebase_service = firebase_service
+        self.tz = ZoneInfo(settings.rollup_timezone)
+        self.checkpoint: Optional[str] = None
+        self._loaded = False
+        self._open: "OrderedDict[Tuple[str, str], PeriodRollup]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def run(self) -> int:
+        """Fold in everything after the checkpoint; returns how many samples were added"""
+        added = 0
+        with self._lock:
+            try:
+                if not self._loaded:
+                    checkpoint = db.reference(f'{ROLLUPS_PATH}/checkpoint').get() or {}
+                    self.checkpoint = checkpoint.get('last_key') if isinstance(checkpoint, dict) else None
+                    self._loaded = True
+
+                while True:
+                    query = db.reference('gaitData').order_by_key()
+                    if self.checkpoint is not None:
+                        query = query.start_at(self.checkpoint)
+                    data = query.limit_to_first(settings.rollup_page_size + 1).get() or {}
+
+                    # average_scores sorts after every push key, so it never becomes the checkpoint
+                    keys = [key for key in data if key not in (self.checkpoint, 'average_scores')]
+                    if not keys:
+                        break
+                    added += self._fold([(key, data[key]) for key in keys], keys[-1])
+                    if len(data) <= settings.rollup_page_size:
+                        break
+            except Exception:
+                # In-memory periods may hold samples that were never written; start over from storage
+                self._open.clear()
+                self._loaded = False
+                raise
+
+        if added:
+            logger.info("✅ Gait rollups folded in %d new samples (checkpoint %s)", added, self.checkpoint)
+        if self.firebase_service is not None and (added or self.firebase_service.trends is None):
+            self.firebase_service.refresh_trends()
+        return added
+
+    def _fold(self, entries: List[Tuple[str, Dict]], last_key: str) -> int:
+        touched: Dict[Tuple[str, str], PeriodRollup] = {}
+        added = 0
+        for key, sample in entries:
+            if not isinstance(sample, dict):
+                continue
+            timestamp = sample_time(key, sample)
+            for period, period_key in period_keys(timestamp, self.tz).items():
+                rollup = touched.get((period, period_key)) or self._period(period, period_key)
+                touched[(period, period_key)] = rollup
+                rollup.add(timestamp, sample)
+            added += 1
+
+        # Page on the raw keys so a page of skipped entries still advances
+        updates = {'checkpoint': {'last_key': last_key, 'updated_at': time.time()}}
+        for (period, period_key), rollup in touched.items():
+            updates[f'state/{period}/{period_key}'] = rollup.state()
+            updates[f'{period}/{period_key}'] = rollup.summary()
+        db.reference(ROLLUPS_PATH).update(updates)
+
+        self.checkpoint = last_key
+        ROLLUP_SAMPLES.inc(added)
+        return added
+
+    def _period(self, period: str, period_key: str) -> PeriodRollup:
+        """An open period from memory, else its persisted state"""
+        rollup = self._open.get((period, period_key))
+        if rollup is None:
+            state = db.reference(f'{ROLLUPS_PATH}/state/{period}/{period_key}').get()
+            rollup = PeriodRollup(state if isinstance(state, dict) else None)
+            self._open[(period, period_key)] = rollup
+            while len(self._open) > MAX_OPEN_PERIODS:
+                self._open.popitem(last=False)
+        self._open.move_to_end((period, period_key))
+        return rollup
+
+
+def read_trends(days: int, weeks: int) -> Optional[Dict]:
+    """The newest daily and weekly summaries: two bounded reads however long the history"""
+    trends = {}
+    for period, limit in (('daily', days), ('weekly', weeks)):
+        if limit <= 0:
+            continue
+        data = db.reference(f'{ROLLUPS_PATH}/{period}').order_by_key().limit_to_last(limit).get() or {}
+        if isinstance(data, dict) and data:
+            trends[period] = dict(data)
+    return trends or None
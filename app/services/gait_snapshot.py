@@ -0,0 +1,269 @@
+import logging
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+from app.models.schemas import GaitAverages, GaitSample
+from app.services import realtime_db as db
+from app.services.gait_analysis import parse_sample
+from app.config.settings import get_settings
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+
+def firebase_key_order(key: str):
+    """Sort key matching Realtime Database orderByKey (32-bit integers first, then strings)"""
+    try:
+        number = int(key)
+        if -2**31 <= number < 2**31 and str(number) == key:
+            return (0, number, "")
+    except ValueError:
+        pass
+    return (1, 0, key)
+
+
+class GaitSnapshot:
+    """Versioned, thread-safe in-process copy of the latest gait sample and averages"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.version = 0
+        self.latest_key: Optional[str] = None
+        self.current: Optional[GaitSample] = None
+        self.averages: Optional[GaitAverages] = None
+        self.updated_at: Optional[float] = None
+        self.connected = False
+        self._observers: List[Callable[[], None]] = []
+
+    def add_observer(self, callback: Callable[[], None]):
+        """Call `callback` (on the updating thread) after every change"""
+        self._observers.append(callback)
+
+    def remove_observer(self, callback: Callable[[], None]):
+        if callback in self._observers:
+            self._observers.remove(callback)
+
+    def update(self, **fields):
+        """Replace some of latest_key/current/averages and bump the version"""
+        with self._lock:
+            for name, value in fields.items():
+                setattr(self, name, value)
+            self.version += 1
+            self.updated_at = time.time()
+
+        for callback in list(self._observers):
+            try:
+                callback()
+            except Exception as e:
+                logger.warning("⚠️ Gait snapshot observer failed: %s", e)
+
+    def read(self) -> Dict:
+        """Return the snapshot in the same shape as FirebaseService.get_all_data"""
+        with self._lock:
+            return {
+                "latest_key": self.latest_key,
+                "current": self.current,
+                "averages": self.averages
+            }
+
+    @property
+    def ready(self) -> bool:
+        return self.updated_at is not None
+
+    def staleness(self) -> Optional[float]:
+        """Seconds since the snapshot last changed"""
+        if self.updated_at is None:
+            return None
+        return time.time() - self.updated_at
+
+    def status(self) -> Dict:
+        with self._lock:
+            return {
+                "version": self.version,
+                "latest_key": self.latest_key,
+                "connected": self.connected,
+                "updated_at": self.updated_at,
+                "staleness_seconds": self.staleness()
+            }
+
+
+class LiveGaitListener:
+    """Keeps a GaitSnapshot current from Realtime Database streaming listeners"""
+
+    def __init__(self, firebase_service, snapshot: GaitSnapshot):
+        self.firebase_service = firebase_service
+        self.snapshot = snapshot
+        self._registrations: List = []
+        self._stop = threading.Event()
+        self._supervisor: Optional[threading.Thread] = None
+        self._latest_raw: Optional[Dict] = None
+        self._averages_raw: Optional[Dict] = None
+        self._averages_path: Optional[str] = None
+
+    def start(self):
+        """Seed the snapshot with bounded reads, then subscribe and supervise the streams"""
+        latest_key, current = self.firebase_service.get_latest_gait_entry()
+        averages = self.firebase_service.get_average_scores()
+        self._latest_raw = current.to_dict() if current else None
+        self.snapshot.update(latest_key=latest_key, current=current, averages=averages)
+
+        self._averages_path = self.firebase_service.average_scores_path
+        self._connect()
+
+        self._supervisor = threading.Thread(target=self._supervise, name="gait-snapshot-supervisor", daemon=True)
+        self._supervisor.start()
+
+    def stop(self):
+        self._stop.set()
+        self._close_registrations()
+        if self._supervisor:
+            self._supervisor.join(timeout=5)
+
+    def _connect(self):
+        self._registrations = [db.reference('gaitData').listen(self._on_gait_event)]
+
+        # gaitData/average_scores arrives through the gaitData stream; the root fallback needs its own
+        if self._averages_path and not self._averages_path.startswith('gaitData/'):
+            self._registrations.append(db.reference(self._averages_path).listen(self._on_averages_event))
+
+        self.snapshot.connected = True
+        logger.info("✅ Live gait snapshot subscribed to Firebase")
+
+    def _close_registrations(self):
+        for registration in self._registrations:
+            try:
+                registration.close()
+            except Exception as e:
+                logger.warning("⚠️ Error closing Firebase listener: %s", e)
+        self._registrations = []
+
+    def _supervise(self):
+        """Reconnect with exponential backoff whenever a listener thread dies"""
+        backoff = settings.firebase_listener_retry_seconds
+
+        while not self._stop.wait(settings.firebase_listener_check_seconds):
+            if all(registration._thread.is_alive() for registration in self._registrations):
+                backoff = settings.firebase_listener_retry_seconds
+                continue
+
+            self.snapshot.connected = False
+            logger.warning("⚠️ Firebase stream dropped, reconnecting...")
+            self._close_registrations()
+
+            try:
+                self._connect()
+            except Exception as e:
+                logger.error("❌ Error reconnecting Firebase stream: %s", e)
+                if self._stop.wait(backoff):
+                    return
+                backoff = min(backoff * 2, settings.firebase_listener_max_backoff_seconds)
+
+    def _on_gait_event(self, event):
+        try:
+            if event.event_type not in ('put', 'patch'):
+                return
+
+            parts = [part for part in event.path.split('/') if part]
+
+            if not parts:
+                if event.event_type == 'put':
+                    self._apply_tree(event.data)
+                else:
+                    for key, value in (event.data or {}).items():
+                        self._apply_child(key, value)
+                return
+
+            key, field_path = parts[0], parts[1:]
+
+            if field_path:
+                self._apply_field(key, field_path[0], event.data)
+            elif event.event_type == 'patch':
+                for field, value in (event.data or {}).items():
+                    self._apply_field(key, field, value)
+            else:
+                self._apply_child(key, event.data)
+        except Exception as e:
+            logger.exception("❌ Error applying gait event: %s", e)
+
+    def _on_averages_event(self, event):
+        try:
+            if event.event_type not in ('put', 'patch'):
+                return
+
+            parts = [part for part in event.path.split('/') if part]
+
+            if parts:
+                self._apply_field('average_scores', parts[0], event.data)
+            elif event.event_type == 'patch':
+                for field, value in (event.data or {}).items():
+                    self._apply_field('average_scores', field, value)
+            else:
+                self._apply_child('average_scores', event.data)
+        except Exception as e:
+            logger.exception("❌ Error applying average scores event: %s", e)
+
+    def _apply_tree(self, data):
+        """Handle a full gaitData payload (sent on every (re)connect)"""
+        if not isinstance(data, dict):
+            return
+
+        entries = sorted((k for k, v in data.items() if k != 'average_scores' and isinstance(v, dict)),
+                         key=firebase_key_order)
+        self.firebase_service.replace_rolling_samples([(key, data[key]) for key in entries])
+        
+        # Newest well-formed sample
+        latest_key, current = None, None
+        for key in reversed(entries):
+            current = parse_sample(key, data[key])
+            if current is not None:
+                latest_key = key
+                break
+        self._latest_raw = data[latest_key] if latest_key else None
+        fields = {"latest_key": latest_key, "current": current}
+
+        if isinstance(data.get('average_scores'), dict):
+            self._averages_raw = data['average_scores']
+            fields["averages"] = self.firebase_service._extract_average_scores(self._averages_raw)
+
+        self.snapshot.update(**fields)
+
+    def _apply_child(self, key: str, value):
+        if key == 'average_scores':
+            if isinstance(value, dict):
+                self._averages_raw = value
+                self.snapshot.update(averages=self.firebase_service._extract_average_scores(value))
+            return
+
+        latest_key = self.snapshot.latest_key
+
+        if value is None:
+            # The newest sample was removed: fall back to a bounded read
+            if key == latest_key:
+                latest_key, current = self.firebase_service.get_latest_gait_entry()
+                self._latest_raw = current.to_dict() if current else None
+                self.snapshot.update(latest_key=latest_key, current=current)
+            return
+
+        if not isinstance(value, dict):
+            return
+
+        if latest_key is None or firebase_key_order(key) >= firebase_key_order(latest_key):
+            sample = parse_sample(key, value)
+            if sample is None:
+                return
+            self._latest_raw = value
+            self.snapshot.update(latest_key=key, current=sample)
+            self.firebase_service.record_sample(key, value)
+
+    def _apply_field(self, key: str, field: str, value):
+        if key == 'average_scores':
+            averages = dict(self._averages_raw or {})
+            averages[field] = value
+            self._apply_child(key, averages)
+        elif key == self.snapshot.latest_key and self._latest_raw is not None:
+            sample = dict(self._latest_raw)
+            sample[field] = value
+            self._apply_child(key, sample)
+        elif self.snapshot.latest_key is None or firebase_key_order(key) > firebase_key_order(self.snapshot.latest_key):
+            # First field of a sample written field-by-field
+            self._apply_child(key, {field: value})
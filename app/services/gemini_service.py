@@ -1,86 +1,56 @@
+import anyio
+import asyncio
+import itertools
+import logging
+import random
+import time
 import google.generativeai as genai
-from typing import List, Dict, Optional
+from google.api_core import exceptions as google_exceptions
+from typing import AsyncIterator, List, Dict, Optional, Tuple
 from app.config.settings import get_settings
-from app.models.schemas import Message
+from app.models.schemas import GaitAverages, Message, TokenUsage
+from app.services import gait_analysis as analysis
+from app.services.gait_analysis import fmt
+from app.services.admission import AdmissionController, OverloadedError
+from app.services.deadlines import DeadlineExceeded, bounded, remaining
+from app.services.executor import run_blocking
+from app.services.fast_path import FastPathResponder
+from app.services.hedging import hedged
+from app.services.metrics import (
+    REGISTRY, STAGE_SECONDS, RESPONSES, PROMPT_CHARS, RESPONSE_CHARS, MODEL_TOKENS, REQUEST_TOKENS,
+    PROMPT_SECTION_TOKENS, PROMPT_TRIMS, span
+)
+from app.services.response_cache import ResponseCache
+from app.services.rolling_stats import trend_label
+from app.services.session_store import trim_history
+from app.services.tokens import PromptSections, estimate_tokens
+from app.services.transports import (
+    ThreadedStream, configure_gemini_rest_transport, gemini_request_options, open_gemini_channel,
+    wait_until_connected
+)
 
 settings = get_settings()
+logger = logging.getLogger(__name__)
 
-class GeminiService:
-    """Interactive Gemini AI service for gait analysis"""
-    
-    def __init__(self):
-        genai.configure(api_key=settings.gemini_api_key)
-        
-        # Use working model name
-        self.model = genai.GenerativeModel('gemini-pro')
-    
-    def create_comprehensive_context(self, gait_data: Dict) -> str:
-        """Create rich context for Gemini"""
-        
-        current = gait_data.get("current")
-        averages = gait_data.get("averages")
-        
-        if not current:
-            return """You are a friendly gait analysis assistant. 
-            
-Currently no sensor data is available. Tell the user:
-- The sensors may not be connected
-- They should start walking if they haven't
-- Data will appear once sensors are active
-
-Be helpful and answer general gait health questions."""
-        
-        # Safe formatting
-        def fmt(value, decimals=2):
-            try:
-                return f"{float(value):.{decimals}f}" if value is not None else "N/A"
-            except:
-                return str(value) if value else "N/A"
-        
-        # Extract metrics
-        steps = current.get('steps', 0)
-        cadence = current.get('cadence', 0)
-        walking_speed = current.get('walkingSpeed', 0)
-        stride_length = current.get('strideLength', 0)
-        step_width = current.get('stepWidth', 0)
-        equilibrium = current.get('equilibriumScore', 0)
-        postural_sway = current.get('posturalSway', 0)
-        frequency = current.get('frequency', 0)
-        phase_mean = current.get('gaitCyclePhaseMean', 'N/A')
-        
-        # Get averages
-        avg_score = averages.get('avgGaitScoreLast20', 0) if averages else 0
-        classification = averages.get('avgClassificationLast20', 'Unknown') if averages else 'Unknown'
-        
-        # Analyze status
-        cadence_status = "below optimal" if cadence < 100 else ("optimal" if cadence <= 120 else "above normal")
-        speed_status = "below normal" if walking_speed < 1.2 else ("optimal" if walking_speed <= 1.4 else "fast")
-        equilibrium_status = "poor" if equilibrium < 0.5 else ("fair" if equilibrium < 0.7 else "excellent")
-        
-        context = f"""You are an expert, friendly gait analysis AI assistant with deep medical knowledge.
+# Errors Gemini returns when we are over quota or rate limited
+RATE_LIMIT_ERRORS = (google_exceptions.ResourceExhausted, google_exceptions.TooManyRequests)
 
-━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
-📊 USER'S CURRENT LIVE GAIT DATA (Real-time from sensors)
-━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+# Models that reject a system instruction; the static guidance is sent inline for these
+MODELS_WITHOUT_SYSTEM_INSTRUCTION = ('gemini-pro', 'gemini-1.0-pro')
 
-STEP METRICS:
-- Total Steps Today: {steps} steps
-- Cadence: {fmt(cadence)} steps/min ({cadence_status})
-- Frequency: {fmt(frequency)} Hz
+# Rolling metrics cited in the data block
+ROLLING_LABELS = {
+    'cadence': 'cadence',
+    'walkingSpeed': 'walking_speed',
+    'equilibriumScore': 'equilibrium'
+}
 
-MOVEMENT QUALITY:
-- Walking Speed: {fmt(walking_speed)} m/s ({speed_status})
-- Stride Length: {fmt(stride_length)} meters  
-- Step Width: {fmt(step_width)} meters
+# Static guidance, built once per process and attached to the model as its system
+# instruction. Only the LIVE GAIT DATA block and the question change per request.
+SYSTEM_INSTRUCTION = """You are an expert, friendly gait analysis AI assistant with deep medical knowledge.
 
-BALANCE & STABILITY:
-- Equilibrium Score: {fmt(equilibrium)}/1.0 ({equilibrium_status})
-- Postural Sway: {fmt(postural_sway)} degrees
-- Gait Phase Mean: {phase_mean}
-
-HISTORICAL PERFORMANCE:
-- Average Gait Score: {fmt(avg_score)}/100
-- Classification: {classification}
+Every user message starts with a LIVE GAIT DATA block holding the user's real-time sensor
+metrics, each with its status against the healthy range, followed by the user's question.
 
 ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
 📋 HEALTHY ADULT REFERENCE RANGES
@@ -107,7 +77,7 @@ BODY TYPE ADJUSTMENTS:
 
 YOU MUST:
 ✅ Answer in natural, conversational language
-✅ Always use the ACTUAL NUMBERS from the user's live data above
+✅ Always use the ACTUAL NUMBERS from the LIVE GAIT DATA block
 ✅ Compare their metrics to healthy ranges
 ✅ Adjust advice based on age/height/weight if they mention it
 ✅ Give specific, actionable improvement suggestions
@@ -118,16 +88,23 @@ YOU MUST:
 ✅ Add occasional emojis for warmth 😊
 
 ANSWER THESE TYPES OF QUESTIONS:
-- "What's my step count?" → Say: "{steps} steps"
-- "Is my speed normal?" → Compare {fmt(walking_speed)} to 1.2-1.4 m/s
-- "How's my balance?" → Discuss {fmt(equilibrium)} score
-- "Should I worry?" → Assess {classification} status
+- "What's my step count?" → Say: "<steps> steps"
+- "Is my speed normal?" → Compare walking speed to 1.2-1.4 m/s
+- "How's my balance?" → Discuss the equilibrium score
+- "Should I worry?" → Assess the classification
 - "How do I improve?" → Give exercises for weak metrics
 - "Normal for 5'10\" 180lbs?" → Adjust expectations
 - "What does equilibrium mean?" → Explain simply
-- "Compare to my average" → Use {fmt(avg_score)} score
+- "Compare to my average" → Use the average gait score
+- "How was my week?" → Use the LONG-TERM TRENDS daily and weekly summaries
 - General health questions → Use your knowledge
 
+IF THE BLOCK SAYS NO SENSOR DATA IS AVAILABLE, tell the user:
+- The sensors may not be connected
+- They should start walking if they haven't
+- Data will appear once sensors are active
+and still answer general gait health questions helpfully.
+
 TONE & STYLE:
 - Talk like a knowledgeable, friendly coach
 - Be empathetic and motivating
@@ -136,66 +113,552 @@ TONE & STYLE:
 - Never diagnose medical conditions
 - Suggest doctor visits for serious concerns
 
-EXAMPLE RESPONSES:
+EXAMPLE RESPONSES (numbers come from the LIVE GAIT DATA block):
 
 Q: "What's my step count today and is it good?"
-A: "You've taken {steps} steps today! Your average gait score is {fmt(avg_score)}/100, which puts you in the {classification} category. Your cadence of {fmt(cadence)} steps/min is {cadence_status}. Keep moving! 🏃"
+A: "You've taken <steps> steps today! Your average gait score is <avg_gait_score>/100, which puts you in the <classification> category. Your cadence of <cadence> steps/min is <cadence status>. Keep moving! 🏃"
 
 Q: "Is my walking speed normal for someone 5 foot 10 and 180 pounds?"  
-A: "Your walking speed is {fmt(walking_speed)} m/s. For your height and weight, normal range is 1.2-1.4 m/s. You're doing great if above 1.2! If below, try picking up the pace slightly - even small improvements help cardiovascular health. 👍"
+A: "Your walking speed is <walking_speed> m/s. For your height and weight, normal range is 1.2-1.4 m/s. You're doing great if above 1.2! If below, try picking up the pace slightly - even small improvements help cardiovascular health. 👍"
 
 Q: "How can I improve my balance?"
-A: "Your equilibrium score is {fmt(equilibrium)}/1.0. Try these daily exercises: 1) Single-leg stands for 30 seconds each, 2) Heel-to-toe walking, 3) Balance board work. Just 5-10 minutes daily helps! Your postural sway of {fmt(postural_sway)} degrees shows your current stability."
+A: "Your equilibrium score is <equilibrium>/1.0. Try these daily exercises: 1) Single-leg stands for 30 seconds each, 2) Heel-to-toe walking, 3) Balance board work. Just 5-10 minutes daily helps! Your postural sway of <postural_sway> degrees shows your current stability."
 
 Q: "Should I be concerned about anything?"
-A: "Looking at your metrics, your walking speed of {fmt(walking_speed)} m/s is a bit low compared to the 1.2-1.4 m/s healthy range. Your equilibrium of {fmt(equilibrium)} could also improve. Try balance exercises and gradually increase walking pace. If you have pain or concerns, definitely check with your doctor! Your {classification} classification shows there's room for improvement. 😊"
+A: "Looking at your metrics, your walking speed of <walking_speed> m/s is a bit low compared to the 1.2-1.4 m/s healthy range. Your equilibrium of <equilibrium> could also improve. Try balance exercises and gradually increase walking pace. If you have pain or concerns, definitely check with your doctor! Your <classification> classification shows there's room for improvement. 😊"
 
-NOW ANSWER THE USER'S QUESTION NATURALLY AND HELPFULLY!"""
+Answer the user's question naturally and helpfully."""
 
-        return context
+class GeminiService:
+    """Interactive Gemini AI service for gait analysis"""
     
-    def generate_response(
+    def __init__(self):
+        self.fake = settings.gemini_backend == "fake"
+        self.rest = settings.gemini_transport == "rest" and not self.fake
+        
+        genai.configure(api_key=settings.gemini_api_key, transport="rest" if self.rest else None)
+        
+        model_name = settings.gemini_model
+        
+        # Static guidance goes out once as the system instruction where the model supports it
+        self.inline_instruction = model_name.removeprefix('models/') in MODELS_WITHOUT_SYSTEM_INSTRUCTION
+        self.instruction_tokens = estimate_tokens(SYSTEM_INSTRUCTION)
+        
+        # With gRPC every model gets its own channel and calls are spread over them round-robin
+        channels = 1 if self.fake or self.rest else max(1, settings.gemini_channels)
+        self._models = [self._make_model(model_name) for _ in range(channels)]
+        self._model_cycle = itertools.cycle(self._models)
+        self.model = self._models[0]
+        
+        # Faster model raced against the primary when it is slow to start answering
+        self.hedge_model = self._make_model(settings.gemini_hedge_model) if settings.gemini_hedge_model else None
+        self._channels = []
+        self._transport_ready = False
+        
+        # Answers simple metric lookups without a model round-trip
+        self.fast_path = FastPathResponder()
+        
+        # Replies reused while the question, snapshot and recent history are unchanged
+        self.response_cache = ResponseCache(settings.response_cache_size, settings.response_cache_ttl)
+        
+        # Bounds concurrent generations; excess requests queue or are shed with a 429
+        self.admission = AdmissionController(
+            max_concurrent=settings.gemini_max_concurrent,
+            max_queue=settings.gemini_max_queue,
+            queue_timeout=settings.gemini_queue_timeout
+        )
+        self.rate_limit_retries = 0
+        
+        REGISTRY.gauge("gait_chat_admission_active", "Model calls holding an admission slot",
+                       lambda: self.admission.stats()["active"])
+        REGISTRY.gauge("gait_chat_admission_queued", "Requests waiting for an admission slot",
+                       lambda: self.admission.queued)
+        REGISTRY.gauge("gait_chat_rate_limit_retries", "Gemini calls retried after a rate-limit error",
+                       lambda: self.rate_limit_retries)
+    
+    def _make_model(self, model_name: str):
+        system_instruction = None if self.inline_instruction else SYSTEM_INSTRUCTION
+        
+        if self.fake:
+            # Offline stand-in for benchmarks; no API key or network needed
+            from app.services.fakes import FakeGenerativeModel
+            return FakeGenerativeModel(
+                model_name, system_instruction,
+                latency=settings.fake_generation_latency,
+                stream_chunks=settings.fake_stream_chunks,
+                slow_fraction=settings.fake_slow_fraction
+            )
+        if system_instruction is None:
+            return genai.GenerativeModel(model_name)
+        return genai.GenerativeModel(model_name, system_instruction=system_instruction)
+    
+    def _prepare_transport(self):
+        """Open the pooled connections once (gRPC channels need the running event loop)"""
+        if self._transport_ready:
+            return
+        self._transport_ready = True
+        
+        if self.rest:
+            configure_gemini_rest_transport()
+        elif not self.fake:
+            models = self._models + ([self.hedge_model] if self.hedge_model else [])
+            self._channels = [open_gemini_channel(model) for model in models]
+    
+    async def warmup(self):
+        """Build the prompt scaffolding and connect to the model ahead of the first request"""
+        self.build_prompt("warmup", {})
+        
+        self._prepare_transport()
+        await asyncio.gather(*[wait_until_connected(channel, 5) for channel in self._channels])
+    
+    @span("create_comprehensive_context")
+    def create_comprehensive_context(self, gait_data: Dict) -> str:
+        """Create the compact per-request data block for Gemini"""
+        
+        current = gait_data.get("current")
+        averages = gait_data.get("averages")
+        
+        if not current:
+            return "LIVE GAIT DATA: no sensor data is available right now."
+        
+        # Values were validated and coerced when the sample was read (GaitSample)
+        averages = averages or GaitAverages()
+        
+        # Analyze status
+        cadence_status = analysis.cadence_status(current.cadence)
+        speed_status = analysis.speed_status(current.walking_speed)
+        equilibrium_status = analysis.equilibrium_status(current.equilibrium_score)
+        
+        block = f"""LIVE GAIT DATA (real-time from sensors):
+steps: {fmt(current.steps, 0)}
+cadence: {fmt(current.cadence)} steps/min ({cadence_status})
+frequency: {fmt(current.frequency)} Hz
+walking_speed: {fmt(current.walking_speed)} m/s ({speed_status})
+stride_length: {fmt(current.stride_length)} m
+step_width: {fmt(current.step_width)} m
+equilibrium: {fmt(current.equilibrium_score)}/1.0 ({equilibrium_status})
+postural_sway: {fmt(current.postural_sway)} degrees
+gait_phase_mean: {fmt(current.gait_cycle_phase_mean, 3)}
+avg_gait_score: {fmt(averages.avg_gait_score)}/100
+classification: {averages.classification}"""
+        
+        rolling = gait_data.get("rolling")
+        if rolling:
+            lines = []
+            for field, label in ROLLING_LABELS.items():
+                stats = rolling.get(field)
+                if stats and stats["count"] >= 2:
+                    lines.append(
+                        f"{label}: mean {fmt(stats['mean'])}, sd {fmt(stats['std'])}, "
+                        f"min {fmt(stats['min'])}, max {fmt(stats['max'])}, trend {trend_label(stats)}"
+                    )
+            if lines:
+                count = max(stats["count"] for stats in rolling.values())
+                block += f"\n\nROLLING STATISTICS (last {count} samples):\n" + "\n".join(lines)
+        
+        trends = gait_data.get("trends")
+        if trends:
+            lines = [
+                self._rollup_line(period_key, summary)
+                for period in ("weekly", "daily")
+                for period_key, summary in (trends.get(period) or {}).items()
+                if summary and summary.get("count")
+            ]
+            if lines:
+                block += "\n\nLONG-TERM TRENDS (weekly, then daily summaries, oldest first):\n" + "\n".join(lines)
+        
+        return block
+    
+    @staticmethod
+    def _rollup_line(period_key: str, summary: Dict) -> str:
+        """One gaitRollups summary: sample count, then mean and p10-p90 of the cited metrics"""
+        parts = [f"{period_key}: {summary['count']} samples"]
+        metrics = summary.get("metrics") or {}
+        for field, label in ROLLING_LABELS.items():
+            stats = metrics.get(field)
+            if stats:
+                parts.append(f"{label} {fmt(stats['mean'])} (p10-p90 {fmt(stats['p10'])}-{fmt(stats['p90'])})")
+        return "; ".join(parts)
+    
+    @staticmethod
+    def recent_history(conversation_history: Optional[List[Message]]) -> List[Message]:
+        """The part of the conversation that goes into the prompt"""
+        return trim_history(conversation_history, settings.history_token_budget)
+    
+    def build_prompt(
+        self,
+        user_message: str,
+        gait_data: Dict,
+        conversation_history: List[Message] = None,
+        history_summary: Optional[str] = None,
+        context: Optional[str] = None,
+        usage: Optional[TokenUsage] = None
+    ) -> str:
+        """Assemble context, conversation summary, recent history and the question into one prompt
+        
+        The parts are trimmed to the input token budget first; `usage`, if
+        given, receives the per-section token estimates and what was trimmed.
+        """
+        # Build context (callers answering several questions pass it in pre-built)
+        if context is None:
+            context = self.create_comprehensive_context(gait_data)
+        
+        sections = PromptSections(
+            instruction_tokens=self.instruction_tokens,
+            context=context,
+            summary=history_summary or None,
+            history=self.recent_history(conversation_history),
+            question=user_message
+        ).fit(settings.prompt_token_budget, settings.prompt_min_question_tokens)
+        
+        counts = sections.token_counts()
+        for section, tokens in counts.items():
+            PROMPT_SECTION_TOKENS.observe(tokens, section=section)
+        for part, count in sections.trimmed.items():
+            PROMPT_TRIMS.inc(count, part=part)
+        if sections.trimmed:
+            logger.info("✂️ Prompt trimmed to the %d-token budget: %s", settings.prompt_token_budget, sections.trimmed)
+        if usage is not None:
+            usage.prompt_sections = counts
+            usage.trimmed = dict(sections.trimmed)
+        
+        # Build conversation history
+        history_text = ""
+        if sections.summary:
+            history_text = f"\n\nEARLIER IN THIS CONVERSATION (summary):\n{sections.summary}\n"
+        
+        if sections.history:
+            history_text += "\n\nCONVERSATION HISTORY:\n"
+            for msg in sections.history:
+                history_text += f"{msg.role.upper()}: {msg.content}\n"
+        
+        # Create prompt
+        prompt = f"""{context}
+{history_text}
+USER QUESTION: {sections.question}"""
+        
+        if self.inline_instruction:
+            prompt = f"{SYSTEM_INSTRUCTION}\n\n{prompt}\n\nYOUR RESPONSE:"
+        
+        return prompt
+    
+    async def generate_response(
         self, 
         user_message: str, 
         gait_data: Dict,
         conversation_history: List[Message] = None,
-        user_profile: Optional[Dict] = None
+        user_profile: Optional[Dict] = None,
+        history_summary: Optional[str] = None,
+        priority: int = 0,
+        deadline: Optional[float] = None,
+        usage: Optional[TokenUsage] = None
     ) -> str:
-        """Generate intelligent response"""
+        """Generate intelligent response (DeadlineExceeded once the monotonic `deadline` passes)
         
+        Pass a TokenUsage as `usage` to get the reply's token counts filled in;
+        its source is "error" when the reply is a fallback rather than an answer.
+        """
+        usage = usage if usage is not None else TokenUsage()
         try:
-            # Build context
-            context = self.create_comprehensive_context(gait_data)
-            
-            # Build conversation history
-            history_text = ""
-            if conversation_history and len(conversation_history) > 0:
-                history_text = "\n\nCONVERSATION HISTORY:\n"
-                for msg in conversation_history[-6:]:
-                    history_text += f"{msg.role.upper()}: {msg.content}\n"
-            
-            # Create prompt
-            full_prompt = f"""{context}
-
-{history_text}
-
-USER QUESTION: {user_message}
-
-YOUR RESPONSE:"""
-            
-            print(f"\n🤖 Generating AI response...")
+            return await self._respond(user_message, gait_data, conversation_history, history_summary, priority,
+                                       deadline=deadline, usage=usage)
+        except (OverloadedError, DeadlineExceeded):
+            raise
+        except Exception as e:
+            RESPONSES.inc(source="error")
+            usage.source = "error"
+            logger.exception("❌ Gemini Error: %s", e)
+            return f"I apologize, I encountered an error. Please try again or rephrase your question."
+    
+    async def generate_batch(
+        self,
+        questions: List[str],
+        gait_data: Dict,
+        conversation_history: List[Message] = None,
+        history_summary: Optional[str] = None,
+        priority: int = 1,
+        deadline: Optional[float] = None
+    ) -> List[Tuple[Optional[str], Optional[str]]]:
+        """Answer several questions against one snapshot; returns (response, error) per question"""
+        # Context is built once and shared; the questions are answered concurrently
+        context = self.create_comprehensive_context(gait_data)
+        
+        results = await asyncio.gather(*[
+            self._respond(question, gait_data, conversation_history, history_summary, priority,
+                          context=context, deadline=deadline)
+            for question in questions
+        ], return_exceptions=True)
+        
+        answers = []
+        for question, result in zip(questions, results):
+            if isinstance(result, OverloadedError):
+                answers.append((None, f"Chat service is busy: {str(result)}"))
+            elif isinstance(result, DeadlineExceeded):
+                answers.append((None, "Deadline exceeded before the answer was ready"))
+            elif isinstance(result, Exception):
+                RESPONSES.inc(source="error")
+                logger.error("❌ Gemini Error for '%s': %s", question, result)
+                answers.append((None, f"Error generating response: {str(result)}"))
+            else:
+                answers.append((result, None))
+        return answers
+    
+    async def _respond(
+        self,
+        user_message: str,
+        gait_data: Dict,
+        conversation_history: Optional[List[Message]],
+        history_summary: Optional[str],
+        priority: int,
+        context: Optional[str] = None,
+        deadline: Optional[float] = None,
+        usage: Optional[TokenUsage] = None
+    ) -> str:
+        """Fast path, then response cache, then the model; errors propagate"""
+        usage = usage if usage is not None else TokenUsage()
+        
+        if settings.fast_path_enabled:
+            answer = self.fast_path.answer(user_message, gait_data)
+            if answer:
+                RESPONSES.inc(source="fast_path")
+                usage.source = "fast_path"
+                return answer
+        
+        if self.response_cache.enabled:
+            cache_key, fingerprint = self.response_cache.make_key(
+                user_message, gait_data, self.recent_history(conversation_history), history_summary)
+            cached = self.response_cache.get(cache_key, fingerprint)
+            if cached is not None:
+                RESPONSES.inc(source="cache")
+                usage.source = "cache"
+                return cached
+        
+        full_prompt = self.build_prompt(user_message, gait_data, conversation_history, history_summary, context, usage)
+        PROMPT_CHARS.observe(len(full_prompt))
+        
+        logger.debug("🤖 Generating AI response...")
+        
+        # Generate
+        async with self.admission.slot(priority, bounded(settings.gemini_queue_timeout, deadline), deadline):
+            with span("model_call"):
+                response = await self._call_model(full_prompt, deadline)
+        
+        if response and hasattr(response, 'text') and response.text:
+            text = response.text.strip()
+            self._record_usage(response, usage, text)
+            RESPONSES.inc(source="model")
+            RESPONSE_CHARS.observe(len(text))
+            if self.response_cache.enabled:
+                self.response_cache.put(cache_key, fingerprint, text)
+            return text
+        else:
+            usage.source = "error"
+            return "I received your question but couldn't generate a response. Could you rephrase it?"
+    
+    async def stream_response(
+        self,
+        user_message: str,
+        gait_data: Dict,
+        conversation_history: List[Message] = None,
+        history_summary: Optional[str] = None,
+        priority: int = 0,
+        deadline: Optional[float] = None,
+        usage: Optional[TokenUsage] = None
+    ) -> AsyncIterator[str]:
+        """Yield the response text incrementally as the model generates it
+        
+        `usage`, if given, has the token counts filled in once the stream ends.
+        """
+        usage = usage if usage is not None else TokenUsage()
+        
+        if settings.fast_path_enabled:
+            answer = self.fast_path.answer(user_message, gait_data)
+            if answer:
+                RESPONSES.inc(source="fast_path")
+                usage.source = "fast_path"
+                yield answer
+                return
+        
+        if self.response_cache.enabled:
+            cache_key, fingerprint = self.response_cache.make_key(
+                user_message, gait_data, self.recent_history(conversation_history), history_summary)
+            cached = self.response_cache.get(cache_key, fingerprint)
+            if cached is not None:
+                RESPONSES.inc(source="cache")
+                usage.source = "cache"
+                yield cached
+                return
+        
+        full_prompt = self.build_prompt(user_message, gait_data, conversation_history, history_summary, usage=usage)
+        PROMPT_CHARS.observe(len(full_prompt))
+        
+        logger.debug("🤖 Streaming AI response...")
+        
+        # The slot is held for the whole stream, not just the initial call
+        async with self.admission.slot(priority, bounded(settings.gemini_queue_timeout, deadline), deadline):
+            started = time.perf_counter()
+            with span("model_call"):
+                response, chunks, first = await self._call_model_stream(full_prompt, deadline)
             
-            # Generate
-            response = self.model.generate_content(full_prompt)
+            parts = []
+            try:
+                with span("model_stream"):
+                    async for chunk in self._resume(first, chunks):
+                        remaining(deadline)
+                        if chunk.text:
+                            if not parts:
+                                STAGE_SECONDS.observe(time.perf_counter() - started, stage="model_first_chunk")
+                            parts.append(chunk.text)
+                            yield chunk.text
+                text = "".join(parts).strip()
+                self._record_usage(response, usage, text)
+                RESPONSES.inc(source="model")
+                RESPONSE_CHARS.observe(len(text))
+                if text and self.response_cache.enabled:
+                    self.response_cache.put(cache_key, fingerprint, text)
+            finally:
+                # Runs on normal completion, errors and client disconnects (cancellation)
+                await self._close_stream(response)
+    
+    @staticmethod
+    async def _close_stream(response):
+        """Close an unfinished upstream iterator, tearing down the model stream
+        instead of letting the generation run to completion unobserved"""
+        iterator = getattr(response, "_iterator", None)
+        if iterator is not None and hasattr(iterator, "aclose"):
+            with anyio.CancelScope(shield=True):
+                await iterator.aclose()
+    
+    @staticmethod
+    async def _resume(first, chunks) -> AsyncIterator:
+        if first is not None:
+            yield first
+        async for chunk in chunks:
+            yield chunk
+    
+    def _hedge(self, call):
+        """Starts the hedge to race against the primary: a generation of its own, so it
+        takes a free admission slot (held until it finishes) or is skipped"""
+        def start():
+            if not self.admission.try_acquire():
+                return None
+            return self._holding_slot(call())
+        return start
+    
+    async def _holding_slot(self, call):
+        try:
+            return await call
+        finally:
+            self.admission.release()
+    
+    async def _call_model(self, prompt: str, deadline: Optional[float]):
+        """One generation within the deadline, hedged with the faster model if configured"""
+        try:
+            if self.hedge_model is None:
+                return await asyncio.wait_for(self._generate_content(prompt, deadline=deadline), remaining(deadline))
             
-            if response and hasattr(response, 'text') and response.text:
-                print(f"✅ Generated response")
-                return response.text.strip()
-            else:
-                return "I received your question but couldn't generate a response. Could you rephrase it?"
+            response, _ = await asyncio.wait_for(hedged(
+                lambda: self._generate_content(prompt, deadline=deadline),
+                self._hedge(lambda: self._generate_content(prompt, model=self.hedge_model, deadline=deadline)),
+                settings.gemini_hedge_delay
+            ), remaining(deadline))
+            return response
+        except asyncio.TimeoutError as e:
+            raise DeadlineExceeded("Request deadline exceeded") from e
+    
+    async def _open_stream(self, prompt: str, deadline: Optional[float], model=None):
+        """Start a streamed generation and wait for its first chunk"""
+        response = await self._generate_content(prompt, model=model, deadline=deadline, stream=True)
+        chunks = aiter(response)
+        try:
+            first = await anext(chunks, None)
+        except BaseException:
+            await self._close_stream(response)
+            raise
+        return response, chunks, first
+    
+    async def _call_model_stream(self, prompt: str, deadline: Optional[float]):
+        """Open a stream within the deadline; with hedging the first stream to produce a chunk is kept"""
+        try:
+            if self.hedge_model is None:
+                return await asyncio.wait_for(self._open_stream(prompt, deadline), remaining(deadline))
             
-        except Exception as e:
-            print(f"❌ Gemini Error: {e}")
-            import traceback
-            traceback.print_exc()
-            return f"I apologize, I encountered an error. Please try again or rephrase your question."
\ No newline at end of file
+            opened, _ = await asyncio.wait_for(hedged(
+                lambda: self._open_stream(prompt, deadline),
+                self._hedge(lambda: self._open_stream(prompt, deadline, model=self.hedge_model)),
+                settings.gemini_hedge_delay,
+                discard=lambda loser: self._close_stream(loser[0])
+            ), remaining(deadline))
+            return opened
+        except asyncio.TimeoutError as e:
+            raise DeadlineExceeded("Request deadline exceeded") from e
+    
+    async def _generate_content(self, prompt: str, model=None, deadline: Optional[float] = None, **kwargs):
+        """Call the model (by default the next primary), retrying rate-limit errors with jittered
+        exponential backoff; the SDK call timeout is cut to what is left of the deadline"""
+        self._prepare_transport()
+        
+        for attempt in range(settings.gemini_max_retries + 1):
+            if not self.fake:
+                kwargs["request_options"] = gemini_request_options(
+                    asynchronous=not self.rest,
+                    timeout=bounded(settings.gemini_timeout, deadline)
+                )
+            call_model = model or next(self._model_cycle)
+            try:
+                if self.rest:
+                    # The REST client is synchronous: call it on the blocking-I/O pool
+                    response = await run_blocking(call_model.generate_content, prompt, **kwargs)
+                    return ThreadedStream(response) if kwargs.get("stream") else response
+                return await call_model.generate_content_async(prompt, **kwargs)
+            except RATE_LIMIT_ERRORS as e:
+                if attempt == settings.gemini_max_retries:
+                    raise OverloadedError(f"Gemini rate limit: {e}", self.admission.retry_after()) from e
+                
+                # Full jitter keeps retries from many requests from lining up
+                delay = random.uniform(0, min(settings.gemini_retry_max_delay,
+                                              settings.gemini_retry_base_delay * 2 ** attempt))
+                left = remaining(deadline)
+                if left is not None and delay >= left:
+                    raise DeadlineExceeded("Request deadline exceeded while rate limited") from e
+                self.rate_limit_retries += 1
+                logger.warning("⚠️ Gemini rate limited, retrying in %.2fs", delay)
+                await asyncio.sleep(delay)
+    
+    @staticmethod
+    def _record_usage(response, usage: TokenUsage, text: str):
+        """Fill in a reply's token counts from the model's usage metadata, else from local estimates"""
+        metadata = getattr(response, 'usage_metadata', None)
+        if metadata and metadata.prompt_token_count:
+            usage.input_tokens = metadata.prompt_token_count
+            usage.output_tokens = metadata.candidates_token_count or 0
+            MODEL_TOKENS.inc(usage.input_tokens, kind="input")
+            MODEL_TOKENS.inc(usage.output_tokens, kind="output")
+        else:
+            usage.input_tokens = sum(usage.prompt_sections.values())
+            usage.output_tokens = estimate_tokens(text)
+            usage.estimated = True
+        
+        REQUEST_TOKENS.observe(usage.input_tokens, kind="input")
+        REQUEST_TOKENS.observe(usage.output_tokens, kind="output")
+        logger.debug("✅ Generated response (%s input / %s output tokens%s)",
+                     usage.input_tokens, usage.output_tokens, ", estimated" if usage.estimated else "")
+    
+    async def prompt_token_report(self, user_message: str, gait_data: Dict) -> Dict:
+        """Count input tokens with the static guidance inline (before), without it (after), and as actually sent"""
+        per_request = self.build_prompt(user_message, gait_data)
+        if self.inline_instruction:
+            per_request = per_request.removeprefix(f"{SYSTEM_INSTRUCTION}\n\n")
+        
+        counter = genai.GenerativeModel(settings.gemini_model)
+        inline = await counter.count_tokens_async(f"{SYSTEM_INSTRUCTION}\n\n{per_request}")
+        compact = await counter.count_tokens_async(per_request)
+        
+        return {
+            "model": settings.gemini_model,
+            "system_instruction": not self.inline_instruction,
+            "inline_prompt_tokens": inline.total_tokens,
+            "per_request_tokens": compact.total_tokens,
+            # The configured model decides which of the two each request really carries
+            "sent_prompt_tokens": inline.total_tokens if self.inline_instruction else compact.total_tokens
+        }
\ No newline at end of file
@@ -0,0 +1,75 @@
+import asyncio
+import logging
+from typing import Awaitable, Callable, Optional, Tuple, TypeVar
+from app.services.metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# outcome: primary_fast (answered before the hedge delay), primary_won / hedge_won
+# (a hedge was sent), skipped (hedge due but no admission slot was free)
+HEDGED_CALLS = REGISTRY.counter(
+    "gait_chat_hedged_calls_total", "Model calls by hedging outcome", ("outcome",))
+
+
+async def hedged(
+    primary: Callable[[], Awaitable[T]],
+    backup: Optional[Callable[[], Optional[Awaitable[T]]]],
+    delay: float,
+    discard: Optional[Callable[[T], Awaitable[None]]] = None
+) -> Tuple[T, str]:
+    """Run primary(); if it has not finished after `delay` seconds, race backup() against it
+
+    Returns the first successful result and which side produced it. The
+    loser is cancelled, or handed to `discard` if it also succeeded. An
+    error only surfaces once both sides have failed. `backup` may be None
+    to skip hedging for this call, or return None when the hedge is due to
+    skip it then.
+    """
+    first = asyncio.create_task(primary())
+    tasks = [first]
+    winner = None
+    try:
+        done, _ = await asyncio.wait(tasks, timeout=delay)
+        if done or backup is None:
+            if not done:
+                HEDGED_CALLS.inc(outcome="skipped")
+            result = await first
+            winner = first
+            if done:
+                HEDGED_CALLS.inc(outcome="primary_fast")
+            return result, "primary"
+
+        hedge = backup()
+        if hedge is None:
+            HEDGED_CALLS.inc(outcome="skipped")
+            result = await first
+            winner = first
+            return result, "primary"
+        logger.debug("🔀 No reply after %.2fs, hedging", delay)
+        tasks.append(asyncio.create_task(hedge))
+        pending = set(tasks)
+        error = None
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    winner = task
+                    side = "primary" if task is first else "hedge"
+                    HEDGED_CALLS.inc(outcome=f"{side}_won")
+                    return task.result(), side
+                error = task.exception()
+        raise error
+    finally:
+        for task in tasks:
+            if task is winner:
+                continue
+            if not task.done():
+                task.cancel()
+            elif discard is not None and not task.cancelled() and task.exception() is None:
+                # Finished in the same instant as the winner; release what it holds
+                try:
+                    await discard(task.result())
+                except Exception as e:
+                    logger.warning("⚠️ Error discarding hedged call: %s", e)
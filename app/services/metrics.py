@@ -0,0 +1,207 @@
+import bisect
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Prometheus text exposition format served by /metrics
+CONTENT_TYPE = "text/plain; version=0.0.4"
+
+# Seconds; spans range from sub-millisecond cache hits to multi-second generations
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+# Characters in a prompt or reply
+SIZE_BUCKETS = (64, 256, 512, 1024, 2048, 4096, 8192, 16384, 65536)
+
+# Tokens in a prompt section, prompt or reply
+TOKEN_BUCKETS = (16, 64, 128, 256, 512, 1024, 2048, 4096, 8192, 32768)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values)) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, description: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.description = description
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def lines(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    """Monotonic total per label set"""
+    kind = "counter"
+
+    def __init__(self, name: str, description: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, description, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+    def lines(self) -> List[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+                for key, value in values]
+
+
+class Histogram(_Metric):
+    """Bucketed observations per label set, with running sum and count"""
+    kind = "histogram"
+
+    def __init__(self, name: str, description: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, description, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # label set -> [per-bucket counts (last is +Inf), sum, count]
+        self._series: Dict[Tuple[str, ...], List] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def lines(self) -> List[str]:
+        with self._lock:
+            series = sorted((key, (list(counts), total, count))
+                            for key, (counts, total, count) in self._series.items())
+
+        names = self.labelnames + ("le",)
+        lines = []
+        for key, (counts, total, count) in series:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                labels = _format_labels(names, key + (_format_value(bound),))
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+class Gauge(_Metric):
+    """Point-in-time value read from a callback when scraped"""
+    kind = "gauge"
+
+    def __init__(self, name: str, description: str, read: Callable[[], float]):
+        super().__init__(name, description)
+        self.read = read
+
+    def lines(self) -> List[str]:
+        return [f"{self.name} {_format_value(self.read())}"]
+
+
+class MetricsRegistry:
+    """Named metrics rendered together in the Prometheus text format"""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: _Metric) -> _Metric:
+        # Re-registering a name replaces it (services may be constructed more than once)
+        with self._lock:
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, description: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, description, labelnames))
+
+    def histogram(self, name: str, description: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, description, labelnames, buckets))
+
+    def gauge(self, name: str, description: str, read: Callable[[], float]) -> Gauge:
+        return self.register(Gauge(name, description, read))
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+
+        output = []
+        for metric in metrics:
+            try:
+                lines = metric.lines()
+            except Exception as e:
+                logger.warning("Skipping metric %s: %s", metric.name, e)
+                continue
+            output.append(f"# HELP {metric.name} {_escape(metric.description)}")
+            output.append(f"# TYPE {metric.name} {metric.kind}")
+            output.extend(lines)
+        return "\n".join(output) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+STAGE_SECONDS = REGISTRY.histogram(
+    "gait_chat_stage_duration_seconds", "Time spent in each request stage", ("stage",))
+STAGE_ERRORS = REGISTRY.counter(
+    "gait_chat_stage_errors_total", "Errors raised in each request stage", ("stage",))
+RESPONSES = REGISTRY.counter(
+    "gait_chat_responses_total", "Chat replies by where they came from", ("source",))
+PROMPT_CHARS = REGISTRY.histogram(
+    "gait_chat_prompt_chars", "Size of prompts sent to the model", buckets=SIZE_BUCKETS)
+RESPONSE_CHARS = REGISTRY.histogram(
+    "gait_chat_response_chars", "Size of replies generated by the model", buckets=SIZE_BUCKETS)
+MODEL_TOKENS = REGISTRY.counter(
+    "gait_chat_model_tokens_total", "Tokens reported by the model's usage metadata", ("kind",))
+REQUEST_TOKENS = REGISTRY.histogram(
+    "gait_chat_request_tokens", "Input and output tokens per model reply (usage metadata, else local estimate)",
+    ("kind",), buckets=TOKEN_BUCKETS)
+PROMPT_SECTION_TOKENS = REGISTRY.histogram(
+    "gait_chat_prompt_section_tokens", "Estimated tokens per prompt section", ("section",), buckets=TOKEN_BUCKETS)
+PROMPT_TRIMS = REGISTRY.counter(
+    "gait_chat_prompt_trims_total", "Prompt parts dropped or cut to fit the input token budget", ("part",))
+
+
+@contextmanager
+def span(stage: str):
+    """Time a block into STAGE_SECONDS; exceptions raised inside count as stage errors"""
+    started = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        STAGE_ERRORS.inc(stage=stage)
+        raise
+    finally:
+        elapsed = time.perf_counter() - started
+        STAGE_SECONDS.observe(elapsed, stage=stage)
+        logger.debug("%s took %.1f ms", stage, elapsed * 1000)
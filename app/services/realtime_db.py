@@ -0,0 +1,34 @@
+import threading
+from typing import Optional
+from app.config.settings import get_settings
+
+settings = get_settings()
+
+# Backends selectable with FIREBASE_BACKEND
+FIREBASE_BACKENDS = ("firebase", "fake")
+
+_fake = None
+_fake_lock = threading.Lock()
+
+
+def uses_fake() -> bool:
+    return settings.firebase_backend == "fake"
+
+
+def reference(path: Optional[str] = '/'):
+    """db.reference() on the configured backend: Firebase Admin SDK or the offline fake"""
+    if uses_fake():
+        return fake_database().reference(path)
+
+    from firebase_admin import db
+    return db.reference(path)
+
+
+def fake_database():
+    """The process-wide offline database, filled with generated history on first use"""
+    global _fake
+    with _fake_lock:
+        if _fake is None:
+            from app.services.fakes import FakeRealtimeDatabase
+            _fake = FakeRealtimeDatabase.with_history(settings.fake_history_size, settings.fake_read_latency)
+        return _fake
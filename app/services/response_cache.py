@@ -0,0 +1,100 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+from app.models.schemas import Message
+from app.services.fast_path import normalize_question
+
+# Every part of get_all_data() that GeminiService.create_comprehensive_context cites
+PROMPT_SECTIONS = ("current", "averages", "rolling", "trends")
+
+def gait_fingerprint(gait_data: Dict) -> str:
+    """Short hash of every gait data section the prompt is built from"""
+    # GaitSample/GaitAverages reprs list every field, and the rolling/trend summaries are plain
+    # dicts, so a change in any cited figure invalidates cached replies
+    parts = [repr(gait_data.get(section)) for section in PROMPT_SECTIONS]
+    return hashlib.blake2b("|".join(parts).encode(), digest_size=8).hexdigest()
+
+
+class ResponseCache:
+    """Bounded LRU of model replies keyed on question, gait snapshot and recent history
+
+    Entries expire after `ttl` seconds, and all entries are dropped as soon as
+    a request arrives with a different gait snapshot.
+    """
+
+    def __init__(self, max_size: int, ttl: float):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self._fingerprint: Optional[str] = None
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_size > 0
+
+    def make_key(
+        self,
+        question: str,
+        gait_data: Dict,
+        history: Optional[List[Message]],
+        summary: Optional[str] = None
+    ) -> Tuple[str, str]:
+        """Return (key, snapshot fingerprint) for a request"""
+        fingerprint = gait_fingerprint(gait_data)
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(fingerprint.encode())
+        digest.update(b"\0" + normalize_question(question).encode())
+        digest.update(b"\0" + (summary or "").encode())
+        for msg in history or []:
+            digest.update(f"\0{msg.role}\0{msg.content}".encode())
+        return digest.hexdigest(), fingerprint
+
+    def _sync_fingerprint(self, fingerprint: str):
+        if fingerprint != self._fingerprint:
+            self.evictions += len(self._entries)
+            self._entries.clear()
+            self._fingerprint = fingerprint
+
+    def get(self, key: str, fingerprint: str) -> Optional[str]:
+        with self._lock:
+            self._sync_fingerprint(fingerprint)
+            entry = self._entries.get(key)
+
+            if entry is None or time.monotonic() - entry[0] > self.ttl:
+                if entry is not None:
+                    del self._entries[key]
+                    self.evictions += 1
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key: str, fingerprint: str, response: str):
+        with self._lock:
+            self._sync_fingerprint(fingerprint)
+            self._entries[key] = (time.monotonic(), response)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_ratio": self.hits / lookups if lookups else 0.0
+            }
@@ -0,0 +1,210 @@
+import threading
+from typing import Dict, Iterable, Optional, Tuple
+import numpy as np
+from app.services.gait_analysis import as_number
+from app.services.gait_snapshot import firebase_key_order
+
+# Sample fields tracked in the rolling window, in column order
+ROLLING_METRICS = ('cadence', 'walkingSpeed', 'strideLength', 'stepWidth',
+                   'equilibriumScore', 'posturalSway', 'frequency')
+
+
+class RollingGaitStats:
+    """Rolling per-metric statistics over the last N gait samples
+
+    Samples live in a fixed-size (window x metrics) NumPy ring buffer. Running
+    sums of y, y², t, t² and t·y are updated in O(1) per sample, giving the
+    mean, variance and least-squares trend slope without touching history;
+    min/max are a single vectorized reduction over the buffer when read.
+    Missing or malformed values are stored as NaN and excluded per metric.
+    Samples are keyed: one older than the newest sample already added is
+    skipped, so overlapping reads of the same entries count them once.
+    """
+
+    def __init__(self, window: int):
+        self.window = window
+        self._values = np.full((window, len(ROLLING_METRICS)), np.nan)
+        self._times = np.zeros(window)
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """Forget all samples"""
+        with self._lock:
+            self._values.fill(np.nan)
+            self._head = 0  # next slot to write
+            self._size = 0
+            self._tick = 0.0  # sample index since the last rebase, the trend's x axis
+            self._writes_since_rebase = 0
+            self._last_key: Optional[str] = None
+            self._reset_sums()
+
+    def _reset_sums(self):
+        width = len(ROLLING_METRICS)
+        self._n = np.zeros(width)
+        self._sum = np.zeros(width)
+        self._sum_sq = np.zeros(width)
+        self._sum_t = np.zeros(width)
+        self._sum_tt = np.zeros(width)
+        self._sum_ty = np.zeros(width)
+
+    def _accumulate(self, row: np.ndarray, t: float, sign: float):
+        mask = ~np.isnan(row)
+        y = np.where(mask, row, 0.0)
+        self._n += sign * mask
+        self._sum += sign * y
+        self._sum_sq += sign * y * y
+        self._sum_t += sign * t * mask
+        self._sum_tt += sign * t * t * mask
+        self._sum_ty += sign * t * y
+
+    @property
+    def last_key(self) -> Optional[str]:
+        """Key of the newest sample added, if it had one"""
+        return self._last_key
+
+    def _is_older(self, key: Optional[str]) -> bool:
+        return key is not None and self._last_key is not None and \
+            firebase_key_order(key) < firebase_key_order(self._last_key)
+
+    @staticmethod
+    def _to_row(sample: Dict) -> np.ndarray:
+        return np.array([
+            np.nan if (value := as_number(sample.get(field))) is None else value
+            for field in ROLLING_METRICS
+        ])
+
+    def add(self, key: Optional[str], sample: Optional[Dict]):
+        """Add a sample; a repeat of the newest key replaces it (partial writes fill in), older keys are skipped"""
+        if not isinstance(sample, dict):
+            return
+
+        row = self._to_row(sample)
+
+        with self._lock:
+            if self._is_older(key):
+                return
+            if key is not None and key == self._last_key and self._size:
+                slot = (self._head - 1) % self.window
+                self._accumulate(self._values[slot], self._times[slot], -1)
+                self._values[slot] = row
+                self._accumulate(row, self._times[slot], 1)
+                return
+
+            if self._size == self.window:
+                self._accumulate(self._values[self._head], self._times[self._head], -1)
+            else:
+                self._size += 1
+
+            self._values[self._head] = row
+            self._times[self._head] = self._tick
+            self._accumulate(row, self._tick, 1)
+            self._head = (self._head + 1) % self.window
+            self._tick += 1
+            self._last_key = key
+
+            # Periodically rebuild the sums from the buffer (vectorized) so
+            # floating-point drift cannot build up and t stays small
+            self._writes_since_rebase += 1
+            if self._writes_since_rebase >= self.window:
+                self._rebase()
+
+    def extend(self, entries: Iterable[Tuple[str, Dict]]):
+        """Add samples in key order: written straight into the buffer, then the sums rebuilt once"""
+        keys, rows = [], []
+        for key, sample in entries:
+            if not isinstance(sample, dict):
+                continue
+            if keys and key is not None and key == keys[-1]:
+                rows[-1] = self._to_row(sample)
+            else:
+                keys.append(key)
+                rows.append(self._to_row(sample))
+        if not rows:
+            return
+
+        with self._lock:
+            # Entries are in key order, so only a prefix can be older than the window
+            start = 0
+            while start < len(keys) and self._is_older(keys[start]):
+                start += 1
+            keys, rows = keys[start:], rows[start:]
+            if not rows:
+                return
+
+            if keys[0] is not None and keys[0] == self._last_key and self._size:
+                # A repeat of the newest key replaces it, as in add()
+                self._head = (self._head - 1) % self.window
+                self._size -= 1
+            rows = rows[-self.window:]
+            slots = (self._head + np.arange(len(rows))) % self.window
+            self._values[slots] = rows
+            self._head = (self._head + len(rows)) % self.window
+            self._size = min(self._size + len(rows), self.window)
+            self._last_key = keys[-1]
+            self._rebase()
+
+    def _rebase(self):
+        self._writes_since_rebase = 0
+        if not self._size:
+            return
+
+        order = (self._head - self._size + np.arange(self._size)) % self.window
+        self._times[order] = np.arange(self._size, dtype=float)
+        self._tick = float(self._size)
+
+        values = self._values[order]
+        times = self._times[order][:, None]
+        mask = ~np.isnan(values)
+        y = np.where(mask, values, 0.0)
+        self._n = mask.sum(axis=0).astype(float)
+        self._sum = y.sum(axis=0)
+        self._sum_sq = (y * y).sum(axis=0)
+        self._sum_t = (times * mask).sum(axis=0)
+        self._sum_tt = (times * times * mask).sum(axis=0)
+        self._sum_ty = (times * y).sum(axis=0)
+
+    @property
+    def size(self) -> int:
+        return self._size
+
+    def summary(self) -> Dict[str, Dict]:
+        """Mean, standard deviation, min, max and trend slope (per sample) for each metric"""
+        with self._lock:
+            if not self._size:
+                return {}
+
+            n = self._n
+            with np.errstate(invalid='ignore', divide='ignore'):
+                mean = self._sum / n
+                variance = np.maximum(self._sum_sq / n - mean * mean, 0.0)
+                denominator = n * self._sum_tt - self._sum_t * self._sum_t
+                slope = np.where(denominator > 0, (n * self._sum_ty - self._sum_t * self._sum) / denominator, 0.0)
+
+            filled = self._values[:self._size] if self._size < self.window else self._values
+            has_values = n > 0
+            minimum = np.full(len(ROLLING_METRICS), np.nan)
+            maximum = np.full(len(ROLLING_METRICS), np.nan)
+            if has_values.any():
+                minimum[has_values] = np.nanmin(filled[:, has_values], axis=0)
+                maximum[has_values] = np.nanmax(filled[:, has_values], axis=0)
+
+        return {
+            field: {
+                "count": int(n[i]),
+                "mean": float(mean[i]),
+                "std": float(np.sqrt(variance[i])),
+                "min": float(minimum[i]),
+                "max": float(maximum[i]),
+                "slope": float(slope[i])
+            }
+            for i, field in enumerate(ROLLING_METRICS) if n[i] > 0
+        }
+
+
+def trend_label(stats: Dict) -> str:
+    """Describe the slope relative to the spread over the window"""
+    change = stats["slope"] * max(stats["count"] - 1, 0)
+    if stats["count"] < 3 or abs(change) <= 0.5 * stats["std"]:
+        return "steady"
+    return "rising" if change > 0 else "falling"
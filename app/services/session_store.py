@@ -0,0 +1,225 @@
+import hashlib
+import re
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+from app.config.settings import get_settings
+from app.models.schemas import Message
+from app.services import realtime_db
+from app.services.executor import run_blocking
+from app.services.tokens import estimate_tokens, message_tokens
+
+settings = get_settings()
+
+# Backends selectable with SESSION_BACKEND
+SESSION_BACKENDS = ("memory", "firebase")
+
+SESSIONS_PATH = 'chatSessions'
+
+
+def trim_history(messages: Optional[List[Message]], token_budget: int) -> List[Message]:
+    """Keep the newest messages that fit in the token budget"""
+    kept: List[Message] = []
+    used = 0
+    for msg in reversed(messages or []):
+        used += message_tokens(msg)
+        if used > token_budget:
+            break
+        kept.append(msg)
+    kept.reverse()
+    return kept
+
+
+def _gist(text: str, limit: int = 160) -> str:
+    """First sentence of a message, clipped"""
+    text = " ".join(text.split())
+    sentence = re.split(r"(?<=[.!?])\s", text, maxsplit=1)[0]
+    return sentence if len(sentence) <= limit else sentence[:limit - 1] + "…"
+
+
+@dataclass
+class ChatSession:
+    """Server-side conversation state"""
+    session_id: str
+    messages: List[Message] = field(default_factory=list)
+    summary: str = ""
+    updated_at: float = field(default_factory=time.time)
+
+    def to_dict(self) -> Dict:
+        return {
+            "session_id": self.session_id,
+            "messages": [msg.model_dump() for msg in self.messages],
+            "summary": self.summary,
+            "updated_at": self.updated_at
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "ChatSession":
+        return cls(
+            session_id=data["session_id"],
+            messages=[Message(**msg) for msg in data.get("messages", [])],
+            summary=data.get("summary", ""),
+            updated_at=data.get("updated_at", time.time())
+        )
+
+
+class SessionStore:
+    """Storage interface for chat sessions
+
+    Backends only implement get/save/delete (sessions round-trip through
+    to_dict/from_dict, so a key-value store such as Redis fits). Opening
+    sessions, recording turns and compaction are shared. Request handlers
+    use the *_async variants, which run a `remote` backend's I/O on the
+    blocking pool.
+    """
+
+    remote = False
+
+    def get(self, session_id: str) -> Optional[ChatSession]:
+        raise NotImplementedError
+
+    def save(self, session: ChatSession):
+        raise NotImplementedError
+
+    def delete(self, session_id: str):
+        raise NotImplementedError
+
+    def open(self, session_id: Optional[str] = None, seed_history: Optional[List[Message]] = None) -> ChatSession:
+        """Load a session, or start one (seeded with client-sent history) if it does not exist
+
+        A new session always gets a fresh server-generated id, never the
+        unknown one the client sent: clients must not choose (or guess) ids.
+        """
+        session = self.get(session_id) if session_id else None
+        if session is None:
+            session = ChatSession(session_id=uuid.uuid4().hex, messages=list(seed_history or []))
+            self.compact(session)
+        return session
+
+    def record_turn(self, session: ChatSession, user_message: str, reply: str):
+        """Append a question/answer pair, compact and persist
+
+        Callers record only answers: not error fallbacks, nor the partial
+        text of a stream that failed. An empty reply records nothing.
+        """
+        if not reply:
+            return
+        session.messages.append(Message(role="user", content=user_message))
+        session.messages.append(Message(role="assistant", content=reply))
+        session.updated_at = time.time()
+        self.compact(session)
+        self.save(session)
+
+    @staticmethod
+    def compact(session: ChatSession):
+        """Fold the oldest turns into the running summary until history fits the token budget"""
+        budget = settings.history_token_budget
+        total = sum(message_tokens(msg) for msg in session.messages)
+        lines = session.summary.splitlines() if session.summary else []
+
+        while len(session.messages) > 1 and total > budget:
+            oldest = session.messages.pop(0)
+            total -= message_tokens(oldest)
+            lines.append(f"{oldest.role.upper()}: {_gist(oldest.content)}")
+
+        # Oldest summary lines go first when the summary itself is over budget
+        while lines and estimate_tokens("\n".join(lines)) > settings.history_summary_token_budget:
+            lines.pop(0)
+
+        session.summary = "\n".join(lines)
+
+    async def open_async(self, session_id: Optional[str] = None,
+                         seed_history: Optional[List[Message]] = None) -> ChatSession:
+        if not self.remote:
+            return self.open(session_id, seed_history)
+        return await run_blocking(self.open, session_id, seed_history)
+
+    async def get_async(self, session_id: str) -> Optional[ChatSession]:
+        if not self.remote:
+            return self.get(session_id)
+        return await run_blocking(self.get, session_id)
+
+    async def record_turn_async(self, session: ChatSession, user_message: str, reply: str):
+        if not self.remote:
+            return self.record_turn(session, user_message, reply)
+        return await run_blocking(self.record_turn, session, user_message, reply)
+
+    async def delete_async(self, session_id: str):
+        if not self.remote:
+            return self.delete(session_id)
+        return await run_blocking(self.delete, session_id)
+
+
+class InMemorySessionStore(SessionStore):
+    """Process-local session store with a bounded size and LRU eviction"""
+
+    def __init__(self, max_sessions: int):
+        self.max_sessions = max_sessions
+        self._sessions: "OrderedDict[str, ChatSession]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def get(self, session_id: str) -> Optional[ChatSession]:
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is not None:
+                self._sessions.move_to_end(session_id)
+            return session
+
+    def save(self, session: ChatSession):
+        with self._lock:
+            self._sessions[session.session_id] = session
+            self._sessions.move_to_end(session.session_id)
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, session_id: str):
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "sessions": len(self._sessions),
+                "max_sessions": self.max_sessions,
+                "evictions": self.evictions
+            }
+
+
+class FirebaseSessionStore(SessionStore):
+    """Sessions under the chatSessions node, shared by every worker process
+
+    Nothing is evicted: expire old sessions (by updated_at) outside the service.
+    """
+
+    remote = True
+
+    @staticmethod
+    def _reference(session_id: str):
+        # Client-chosen ids may hold characters Firebase keys cannot
+        key = session_id if re.fullmatch(r"[A-Za-z0-9_-]{1,128}", session_id) else \
+            hashlib.sha256(session_id.encode()).hexdigest()
+        return realtime_db.reference(f'{SESSIONS_PATH}/{key}')
+
+    def get(self, session_id: str) -> Optional[ChatSession]:
+        data = self._reference(session_id).get()
+        return ChatSession.from_dict(data) if isinstance(data, dict) else None
+
+    def save(self, session: ChatSession):
+        self._reference(session.session_id).set(session.to_dict())
+
+    def delete(self, session_id: str):
+        self._reference(session_id).delete()
+
+
+def build_session_store() -> SessionStore:
+    """The store selected by SESSION_BACKEND"""
+    if settings.session_backend == "firebase":
+        return FirebaseSessionStore()
+    if settings.session_backend != "memory":
+        raise ValueError(f"SESSION_BACKEND must be one of {', '.join(SESSION_BACKENDS)}")
+    return InMemorySessionStore(settings.session_max_sessions)
@@ -0,0 +1,345 @@
+import logging
+import mmap
+import multiprocessing
+import os
+import struct
+import tempfile
+import threading
+import time
+import orjson
+from typing import Callable, Dict, List, Optional
+from app.config.settings import get_settings
+from app.models.schemas import GaitAverages, GaitSample, gait_payload
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+# Segment layout: a fixed header, then the snapshot serialized as JSON.
+#   magic | sequence (odd while a write is in progress) | heartbeat | updated_at | payload length
+MAGIC = b"GAITSNP1"
+HEADER = struct.Struct("<8sQddI")
+HEADER_SIZE = 64
+SEQUENCE = struct.Struct("<Q")
+SEQUENCE_OFFSET = 8
+HEARTBEAT = struct.Struct("<d")
+HEARTBEAT_OFFSET = 16
+
+READ_ATTEMPTS = 100
+
+
+def default_snapshot_path() -> str:
+    """A per-launch file in RAM-backed /dev/shm where available"""
+    directory = "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+    return os.path.join(directory, f"gait-chat-{os.getpid()}.snapshot")
+
+
+def encode_snapshot(data: Dict) -> bytes:
+    return orjson.dumps(gait_payload(data))
+
+
+def decode_snapshot(payload: Dict) -> Dict:
+    """A decoded segment in the same shape as FirebaseService.get_all_data"""
+    data = dict(payload)
+    if data.get("current") is not None:
+        data["current"] = GaitSample.from_firebase(data["current"])
+    if data.get("averages") is not None:
+        data["averages"] = GaitAverages.from_firebase(data["averages"])
+    return data
+
+
+class SharedSnapshotWriter:
+    """Writes gait snapshots into a memory-mapped file under a seqlock
+
+    There is a single writer (the refresher process). It makes the sequence
+    odd, writes the payload, then makes it even again; readers retry a copy
+    taken while the sequence was odd or changed underneath them. Reopening
+    an existing segment keeps its sequence, so workers never see the version
+    go backwards when the refresher restarts.
+    """
+
+    def __init__(self, path: str, size: int):
+        self.path = path
+        self.size = size
+        with open(path, "a+b") as f:
+            if os.fstat(f.fileno()).st_size < size:
+                f.truncate(size)
+        self._file = open(path, "r+b")
+        self._map = mmap.mmap(self._file.fileno(), size)
+        if self._map[:len(MAGIC)] != MAGIC:
+            self._map[:HEADER_SIZE] = bytes(HEADER_SIZE)
+            self._map[:len(MAGIC)] = MAGIC
+
+    def write(self, payload: bytes):
+        if HEADER_SIZE + len(payload) > self.size:
+            raise ValueError(f"Snapshot of {len(payload)} bytes does not fit in a {self.size}-byte segment")
+
+        sequence = SEQUENCE.unpack_from(self._map, SEQUENCE_OFFSET)[0]
+        if sequence & 1:
+            # A previous writer died mid-write
+            sequence += 1
+        SEQUENCE.pack_into(self._map, SEQUENCE_OFFSET, sequence + 1)
+        self._map[HEADER_SIZE:HEADER_SIZE + len(payload)] = payload
+        now = time.time()
+        HEADER.pack_into(self._map, 0, MAGIC, sequence + 1, now, now, len(payload))
+        SEQUENCE.pack_into(self._map, SEQUENCE_OFFSET, sequence + 2)
+
+    def heartbeat(self):
+        """Tell readers the refresher is alive even when nothing changed"""
+        HEARTBEAT.pack_into(self._map, HEARTBEAT_OFFSET, time.time())
+
+    def close(self):
+        self._map.close()
+        self._file.close()
+
+
+class SharedGaitSnapshot:
+    """Read side of the shared segment, with the same interface as GaitSnapshot
+
+    Checking the version is a single 8-byte read of the mapping; the payload
+    is decoded straight from the mapped pages, only when the version has
+    changed, and reused by every request until the next change. Observers
+    are called from a thread that watches the version.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, "rb")
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        self._lock = threading.Lock()
+        self._sequence = 0
+        self._data: Dict = {"latest_key": None, "current": None, "averages": None}
+        self._observers: List[Callable[[], None]] = []
+        self._watcher: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    def _header(self):
+        return HEADER.unpack_from(self._map, 0)
+
+    def _load(self) -> Dict:
+        """The decoded snapshot for the current version (decoded at most once per version)"""
+        with self._lock:
+            for _ in range(READ_ATTEMPTS):
+                sequence = SEQUENCE.unpack_from(self._map, SEQUENCE_OFFSET)[0]
+                if sequence == self._sequence:
+                    return self._data
+                if sequence & 1:
+                    time.sleep(0)
+                    continue
+
+                length = self._header()[4]
+                try:
+                    with memoryview(self._map)[HEADER_SIZE:HEADER_SIZE + length] as view:
+                        payload = orjson.loads(view)
+                except orjson.JSONDecodeError:
+                    payload = None
+                if SEQUENCE.unpack_from(self._map, SEQUENCE_OFFSET)[0] != sequence or payload is None:
+                    continue  # torn read: the refresher wrote meanwhile
+
+                self._data = decode_snapshot(payload)
+                self._sequence = sequence
+                return self._data
+
+            logger.warning("⚠️ Shared gait snapshot kept changing while being read; serving the previous version")
+            return self._data
+
+    def read(self) -> Dict:
+        """Return the snapshot in the same shape as FirebaseService.get_all_data"""
+        return dict(self._load())
+
+    @property
+    def version(self) -> int:
+        return SEQUENCE.unpack_from(self._map, SEQUENCE_OFFSET)[0] // 2
+
+    @property
+    def ready(self) -> bool:
+        return self.version > 0
+
+    @property
+    def connected(self) -> bool:
+        """Whether the refresher has checked in recently"""
+        heartbeat = self._header()[2]
+        return heartbeat > 0 and time.time() - heartbeat <= settings.shared_snapshot_max_age
+
+    @property
+    def updated_at(self) -> Optional[float]:
+        return self._header()[3] or None
+
+    def staleness(self) -> Optional[float]:
+        """Seconds since the snapshot last changed"""
+        updated_at = self.updated_at
+        if updated_at is None:
+            return None
+        return time.time() - updated_at
+
+    def status(self) -> Dict:
+        return {
+            "version": self.version,
+            "latest_key": self._load().get("latest_key"),
+            "connected": self.connected,
+            "updated_at": self.updated_at,
+            "staleness_seconds": self.staleness()
+        }
+
+    def wait_ready(self, timeout: float) -> bool:
+        """Block until the refresher's first write, or `timeout` seconds"""
+        deadline = time.monotonic() + timeout
+        while not self.ready:
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(settings.shared_snapshot_poll)
+        return True
+
+    def add_observer(self, callback: Callable[[], None]):
+        """Call `callback` (on the watcher thread) after every change"""
+        self._observers.append(callback)
+        if self._watcher is None:
+            self._watcher = threading.Thread(target=self._watch, name="shared-snapshot-watcher", daemon=True)
+            self._watcher.start()
+
+    def remove_observer(self, callback: Callable[[], None]):
+        if callback in self._observers:
+            self._observers.remove(callback)
+
+    def _watch(self):
+        seen = self.version
+        while not self._stop.wait(settings.shared_snapshot_poll):
+            version = self.version
+            if version == seen:
+                continue
+            seen = version
+            for callback in list(self._observers):
+                try:
+                    callback()
+                except Exception as e:
+                    logger.warning("⚠️ Shared snapshot observer failed: %s", e)
+
+    def close(self):
+        self._stop.set()
+        if self._watcher:
+            self._watcher.join(timeout=1)
+        self._map.close()
+        self._file.close()
+
+
+def run_refresher(path: str):
+    """Refresher process: the only one that reads Firebase; publishes every change to the segment
+
+    Also keeps the local gait history and the gait rollups up to date, so
+    workers never write to either.
+    """
+    logging.basicConfig(
+        level=settings.log_level.upper(),
+        format="%(asctime)s %(levelname)s %(name)s: %(message)s"
+    )
+    from app.services.firebase_service import FirebaseService
+
+    writer = SharedSnapshotWriter(path, settings.shared_snapshot_size)
+    service = FirebaseService()
+    service.seed_rolling_stats()
+
+    changed = threading.Event()
+    if settings.firebase_live_snapshot:
+        service.start_live_snapshot()
+        service.live_snapshot.add_observer(changed.set)
+
+    store = None
+    if settings.history_store_enabled:
+        from app.services.gait_history import get_history_store
+        store = get_history_store()
+    last_sync = 0.0
+
+    if settings.rollups_enabled:
+        # On its own thread: a first run may page through a long history
+        threading.Thread(target=_run_rollups, args=(service,), name="gait-rollups", daemon=True).start()
+
+    logger.info("✅ Gait data refresher writing to %s", path)
+    written = None
+    while True:
+        try:
+            payload = encode_snapshot(service.get_all_data())
+            if payload != written:
+                writer.write(payload)
+                written = payload
+            writer.heartbeat()
+        except Exception as e:
+            logger.error("❌ Error refreshing shared gait snapshot: %s", e)
+
+        if store is not None and time.time() - last_sync >= settings.history_sync_interval:
+            last_sync = time.time()
+            try:
+                store.sync(settings.history_sync_page_size)
+            except Exception as e:
+                logger.error("❌ Error syncing gait history: %s", e)
+
+        changed.wait(settings.shared_snapshot_interval)
+        changed.clear()
+
+
+def _run_rollups(service):
+    from app.services.gait_rollups import GaitRollupJob
+    job = GaitRollupJob(service)
+    while True:
+        try:
+            job.run()
+        except Exception as e:
+            logger.error("❌ Error updating gait rollups: %s", e)
+        time.sleep(settings.rollup_interval)
+
+
+def _supervise_refresher(context, path: str, stop: threading.Event):
+    """Keep one refresher process running; restart it with backoff if it dies"""
+    backoff = settings.firebase_listener_retry_seconds
+    while not stop.is_set():
+        process = context.Process(target=run_refresher, args=(path,), name="gait-refresher", daemon=True)
+        process.start()
+        started = time.monotonic()
+        while process.is_alive() and not stop.wait(1.0):
+            pass
+        if stop.is_set():
+            process.terminate()
+            process.join(timeout=5)
+            return
+
+        if time.monotonic() - started > settings.firebase_listener_max_backoff_seconds:
+            backoff = settings.firebase_listener_retry_seconds
+        logger.error("❌ Gait data refresher exited with code %s, restarting in %.0fs", process.exitcode, backoff)
+        if stop.wait(backoff):
+            return
+        backoff = min(backoff * 2, settings.firebase_listener_max_backoff_seconds)
+
+
+def serve_workers(workers: int, host: str, port: int):
+    """Production launch: `workers` uvicorn processes sharing one gait data refresher
+
+    Only the gait data is shared. Sessions must live in a shared store
+    (SESSION_BACKEND=firebase), or a session id from one worker would be
+    unknown to the next. Admission limits and the response cache stay per
+    worker: up to `workers` x GEMINI_MAX_CONCURRENT generations run at once,
+    so size that setting for the Gemini quota divided by the worker count.
+    """
+    import uvicorn
+
+    if settings.session_backend == "memory":
+        raise SystemExit("❌ --workers > 1 needs a shared session store: set SESSION_BACKEND=firebase")
+
+    path = settings.shared_snapshot_path or default_snapshot_path()
+    SharedSnapshotWriter(path, settings.shared_snapshot_size).close()
+    # Workers are spawned with this environment and so attach to the segment
+    os.environ["SHARED_SNAPSHOT_PATH"] = path
+
+    stop = threading.Event()
+    supervisor = threading.Thread(
+        target=_supervise_refresher, args=(multiprocessing.get_context("spawn"), path, stop),
+        name="gait-refresher-supervisor", daemon=True
+    )
+    supervisor.start()
+    try:
+        uvicorn.run("app.main:app", host=host, port=port, workers=workers)
+    finally:
+        stop.set()
+        supervisor.join(timeout=10)
+        if not settings.shared_snapshot_path:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
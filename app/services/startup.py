@@ -0,0 +1,189 @@
+import asyncio
+import gc
+import logging
+import time
+from contextlib import contextmanager
+from typing import Dict, Optional
+from app.config.settings import get_settings
+from app.services.executor import get_blocking_executor, run_blocking
+from app.services.gait_broadcaster import GaitBroadcaster
+from app.services.gait_ingest import GaitIngestBuffer
+from app.services.session_store import SessionStore, build_session_store
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+
+class ServiceUnavailable(Exception):
+    """Services are not (yet) usable; maps to HTTP 503"""
+
+
+class ServiceContainer:
+    """Services shared by all requests, built in the background after the server starts
+
+    The Firebase and Gemini services (and the heavy SDK imports behind them)
+    are constructed off the event loop so uvicorn can bind right away; requests
+    arriving meanwhile wait for them. A warmup phase then fills the read
+    caches, opens connections and builds the static prompt, after which the
+    container reports ready. Each phase is timed.
+    """
+
+    def __init__(self):
+        self.firebase_service = None
+        self.gemini_service = None
+        self.broadcaster: Optional[GaitBroadcaster] = None
+        self.ingest: Optional[GaitIngestBuffer] = None
+        self.session_store: SessionStore = build_session_store()
+
+        self.phases: Dict[str, float] = {}
+        self.error: Optional[str] = None
+        self.ready = False
+        self._started = time.perf_counter()
+        self._services_built = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._rollup_task: Optional[asyncio.Task] = None
+
+    @contextmanager
+    def phase(self, name: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = round(time.perf_counter() - started, 4)
+            logger.info("⏱️ Startup phase %s took %.0f ms", name, self.phases[name] * 1000)
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        for task in (self._task, self._rollup_task):
+            if task and not task.done():
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+        if self.ingest is not None:
+            await self.ingest.stop()
+        if self.broadcaster is not None:
+            await self.broadcaster.stop()
+        if self.firebase_service is not None:
+            await run_blocking(self.firebase_service.stop_live_snapshot)
+
+    async def _run(self):
+        try:
+            with self.phase("firebase"):
+                self.firebase_service = await run_blocking(_build_firebase_service)
+            if settings.shared_snapshot_path:
+                with self.phase("shared_snapshot"):
+                    await run_blocking(self._attach_shared_snapshot)
+            with self.phase("gemini"):
+                self.gemini_service = await run_blocking(_build_gemini_service)
+            self.broadcaster = GaitBroadcaster(self.firebase_service)
+            self.broadcaster.start()
+            if settings.ingest_enabled and not settings.ingest_token:
+                logger.error("❌ INGEST_ENABLED needs an INGEST_TOKEN; gait ingest stays off")
+            elif settings.ingest_enabled:
+                self.ingest = GaitIngestBuffer(self.firebase_service, self.broadcaster)
+                self.ingest.start()
+        except Exception as e:
+            self.error = f"{type(e).__name__}: {e}"
+            logger.exception("❌ Error building services: %s", e)
+            return
+        finally:
+            self._services_built.set()
+
+        if settings.warmup_enabled:
+            with self.phase("warmup"):
+                await self._warmup()
+
+        with self.phase("feeds"):
+            await self._start_feeds()
+
+        # SDK modules, clients and warm caches live for the whole process; keep
+        # them out of every later full collection so those stay short
+        gc.freeze()
+
+        self.phases["total"] = round(time.perf_counter() - self._started, 4)
+        self.ready = True
+        logger.info("✅ Ready in %.0f ms (%s)", self.phases["total"] * 1000,
+                    ", ".join(f"{name} {seconds * 1000:.0f} ms" for name, seconds in self.phases.items()))
+
+    async def _warmup(self):
+        """Fill the read caches and open connections before the first real request"""
+        results = await asyncio.gather(
+            self.firebase_service.get_all_data_async(),
+            self.gemini_service.warmup(),
+            return_exceptions=True
+        )
+        for result in results:
+            if isinstance(result, Exception):
+                logger.warning("⚠️ Warmup step failed: %s", result)
+
+    def _attach_shared_snapshot(self):
+        self.firebase_service.attach_shared_snapshot(settings.shared_snapshot_path)
+        if not self.firebase_service.live_snapshot.wait_ready(settings.shared_snapshot_startup_wait):
+            logger.warning("⚠️ No shared gait snapshot yet, reading Firebase directly until the refresher writes one")
+
+    async def _start_feeds(self):
+        if settings.shared_snapshot_path:
+            # The refresher process owns the listener, rolling window, history sync and rollups
+            self.broadcaster.watch(self.firebase_service.live_snapshot)
+            return
+
+        await run_blocking(self.firebase_service.seed_rolling_stats)
+        if settings.history_store_enabled:
+            get_blocking_executor().submit(_sync_history)
+        if settings.firebase_live_snapshot:
+            await run_blocking(self.firebase_service.start_live_snapshot)
+            self.broadcaster.watch(self.firebase_service.live_snapshot)
+        if settings.rollups_enabled:
+            self._rollup_task = asyncio.create_task(self._run_rollups())
+
+    async def _run_rollups(self):
+        """Scheduler for the daily/weekly rollups: one incremental run every rollup_interval"""
+        from app.services.gait_rollups import GaitRollupJob
+        job = GaitRollupJob(self.firebase_service)
+        while True:
+            try:
+                trends = self.firebase_service.trends
+                await run_blocking(job.run)
+                if self.firebase_service.trends != trends:
+                    # New trends change the ETag; republish without waiting for a new sample
+                    self.broadcaster.invalidate()
+            except Exception as e:
+                logger.error("❌ Error updating gait rollups: %s", e)
+            await asyncio.sleep(settings.rollup_interval)
+
+    async def wait_for_services(self):
+        """Block until the services are built; ServiceUnavailable if that failed"""
+        await self._services_built.wait()
+        if self.error:
+            raise ServiceUnavailable(f"Services failed to start: {self.error}")
+
+    def status(self) -> Dict:
+        return {
+            "ready": self.ready,
+            "error": self.error,
+            "uptime_seconds": round(time.perf_counter() - self._started, 3),
+            "phases": dict(self.phases)
+        }
+
+
+def _build_firebase_service():
+    from app.services.firebase_service import FirebaseService
+    return FirebaseService(connect=not settings.shared_snapshot_path)
+
+
+def _build_gemini_service():
+    from app.services.gemini_service import GeminiService
+    return GeminiService()
+
+
+def _sync_history():
+    """Bring the local gait history up to date in the background"""
+    from app.services.gait_history import get_history_store
+    try:
+        get_history_store().sync_if_due()
+    except Exception as e:
+        logger.error("❌ Error syncing gait history: %s", e)
@@ -0,0 +1,104 @@
+import math
+import re
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+from app.models.schemas import Message
+
+# Pieces a SentencePiece tokenizer such as Gemini's rarely merges: digits are
+# split one per token, words cost about one token per four letters, and each
+# punctuation mark, symbol or emoji is at least one token.
+_PIECES = re.compile(r"\d|[^\W\d_]+|[^\w\s]|_")
+
+# Role label and line break around each history message
+MESSAGE_OVERHEAD = 2
+
+TRUNCATION_MARK = " …[message truncated]"
+
+
+def _piece_tokens(piece: str) -> int:
+    if piece[0].isalpha():
+        return math.ceil(len(piece) / 4)
+    return 1
+
+
+def estimate_tokens(text: Optional[str]) -> int:
+    """Local token estimate; no network round-trip to count_tokens"""
+    if not text:
+        return 0
+    return sum(_piece_tokens(match.group()) for match in _PIECES.finditer(text))
+
+
+def message_tokens(msg: Message) -> int:
+    return estimate_tokens(msg.content) + MESSAGE_OVERHEAD
+
+
+def truncate_to_tokens(text: str, limit: int) -> str:
+    """Cut `text` after the last piece that fits in `limit` estimated tokens (marker included)"""
+    if estimate_tokens(text) <= limit:
+        return text
+
+    budget = max(0, limit - estimate_tokens(TRUNCATION_MARK))
+    used = 0
+    end = 0
+    for match in _PIECES.finditer(text):
+        used += _piece_tokens(match.group())
+        if used > budget:
+            break
+        end = match.end()
+    return text[:end].rstrip() + TRUNCATION_MARK
+
+
+@dataclass
+class PromptSections:
+    """A prompt's parts before assembly, with their estimated token counts"""
+    instruction_tokens: int  # the static guidance is billed whether sent inline or as the system instruction
+    context: str
+    summary: Optional[str]
+    history: List[Message]
+    question: str
+    trimmed: Dict[str, int] = field(default_factory=dict)  # part -> how many were dropped or cut
+
+    def token_counts(self) -> Dict[str, int]:
+        return {
+            "instruction": self.instruction_tokens,
+            "context": estimate_tokens(self.context),
+            "summary": estimate_tokens(self.summary),
+            "history": sum(message_tokens(msg) for msg in self.history),
+            "question": estimate_tokens(self.question)
+        }
+
+    def fit(self, budget: int, min_question_tokens: int) -> "PromptSections":
+        """Trim to `budget` estimated tokens: oldest history first, then the summary, then the question
+
+        The instruction and the gait data context are never trimmed. The
+        question keeps at least `min_question_tokens`, so a prompt whose
+        fixed parts alone exceed the budget still goes out, over budget.
+        """
+        if budget <= 0:
+            return self
+
+        counts = self.token_counts()
+        excess = sum(counts.values()) - budget
+        if excess <= 0:
+            return self
+
+        history = list(self.history)
+        while history and excess > 0:
+            excess -= message_tokens(history.pop(0))
+            self._trim("history_message")
+        self.history = history
+
+        if self.summary and excess > 0:
+            excess -= counts["summary"]
+            self.summary = None
+            self._trim("summary")
+
+        if excess > 0:
+            limit = max(min_question_tokens, counts["question"] - excess)
+            if limit < counts["question"]:
+                self.question = truncate_to_tokens(self.question, limit)
+                self._trim("question")
+        return self
+
+    def _trim(self, part: str):
+        self.trimmed[part] = self.trimmed.get(part, 0) + 1
@@ -0,0 +1,180 @@
+import asyncio
+import logging
+import socket
+from typing import Dict, List, Optional
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection
+from app.config.settings import get_settings
+from app.services.executor import run_blocking
+from app.services.metrics import REGISTRY
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+# Selectable with GEMINI_TRANSPORT
+GEMINI_TRANSPORTS = ("grpc", "rest")
+
+GEMINI_HOST = "generativelanguage.googleapis.com:443"
+
+# Adapters whose connection counters are exported, by metric prefix
+_adapters: Dict[str, List["PooledHTTPAdapter"]] = {"firebase": [], "gemini": []}
+_gemini_channels = 0
+
+
+class PooledHTTPAdapter(HTTPAdapter):
+    """HTTPAdapter with a sized keep-alive pool, optional TCP keep-alive probes and connection counters
+
+    requests' default pool keeps 10 connections per host; with more worker
+    threads than that, surplus connections are discarded after each call and
+    the next call pays a new TCP + TLS handshake.
+    """
+
+    def __init__(self, pool_size: int, tcp_keepalive: bool = True, **kwargs):
+        self.tcp_keepalive = tcp_keepalive
+        super().__init__(pool_connections=pool_size, pool_maxsize=pool_size, **kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        if self.tcp_keepalive:
+            kwargs["socket_options"] = HTTPConnection.default_socket_options + [
+                (socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+            ]
+        super().init_poolmanager(*args, **kwargs)
+
+    def connection_stats(self) -> Dict[str, int]:
+        """New connections opened versus requests sent, over all hosts"""
+        pools = self.poolmanager.pools
+        opened = requests = 0
+        for key in list(pools.keys()):
+            pool = pools.get(key)
+            if pool is not None:
+                opened += pool.num_connections
+                requests += pool.num_requests
+        return {"connections_opened": opened, "requests": requests}
+
+
+def _total(prefix: str, field: str) -> int:
+    return sum(adapter.connection_stats()[field] for adapter in _adapters[prefix])
+
+
+for _prefix in _adapters:
+    REGISTRY.gauge(f"gait_chat_{_prefix}_connections_opened",
+                   f"HTTPS connections opened to {_prefix} (stays flat when connections are reused)",
+                   lambda prefix=_prefix: _total(prefix, "connections_opened"))
+    REGISTRY.gauge(f"gait_chat_{_prefix}_http_requests",
+                   f"HTTPS requests sent to {_prefix} over pooled connections",
+                   lambda prefix=_prefix: _total(prefix, "requests"))
+REGISTRY.gauge("gait_chat_gemini_grpc_channels", "gRPC channels opened to Gemini",
+               lambda: _gemini_channels)
+
+
+def mount_pool(session, prefix: str, pool_size: int, **kwargs) -> PooledHTTPAdapter:
+    """Replace a requests session's adapters with one sized, counted keep-alive pool"""
+    adapter = PooledHTTPAdapter(pool_size, settings.tcp_keepalive, **kwargs)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    _adapters[prefix].append(adapter)
+    return adapter
+
+
+def configure_firebase_transport():
+    """Size the Realtime Database client's connection pool (keeping the SDK's retry policy)"""
+    from firebase_admin import db, _http_client
+
+    client = db.reference('/')._client
+    mount_pool(client.session, "firebase", settings.firebase_pool_size,
+               max_retries=_http_client.DEFAULT_RETRY_CONFIG)
+    logger.info("✅ Firebase transport: %d pooled connections, %.0fs timeout",
+                settings.firebase_pool_size, settings.firebase_http_timeout)
+
+
+def configure_gemini_rest_transport():
+    """Size the connection pool of the REST client used for Gemini calls"""
+    from google.generativeai import client
+
+    rest_client = client.get_default_generative_client()
+    mount_pool(rest_client._transport._session, "gemini", settings.gemini_max_concurrent)
+    logger.info("✅ Gemini REST transport: %d pooled connections", settings.gemini_max_concurrent)
+
+
+def open_gemini_channel(model):
+    """Give a GenerativeModel its own gRPC channel, with keep-alive pings so idle connections survive"""
+    from google.auth import _default as google_auth_default
+    from google.ai.generativelanguage_v1beta.services.generative_service import GenerativeServiceAsyncClient
+    from google.ai.generativelanguage_v1beta.services.generative_service.transports import (
+        GenerativeServiceGrpcAsyncIOTransport
+    )
+    global _gemini_channels
+
+    keepalive_ms = int(settings.gemini_keepalive_seconds * 1000)
+    channel = GenerativeServiceGrpcAsyncIOTransport.create_channel(
+        GEMINI_HOST,
+        credentials=google_auth_default.get_api_key_credentials(settings.gemini_api_key),
+        options=[
+            ("grpc.keepalive_time_ms", keepalive_ms),
+            ("grpc.keepalive_timeout_ms", 20000),
+            ("grpc.keepalive_permit_without_calls", 1),
+            ("grpc.http2.max_pings_without_data", 0),
+            ("grpc.max_send_message_length", -1),
+            ("grpc.max_receive_message_length", -1),
+        ]
+    )
+    transport = GenerativeServiceGrpcAsyncIOTransport(host=GEMINI_HOST, channel=channel)
+    model._async_client = GenerativeServiceAsyncClient(transport=transport)
+    _gemini_channels += 1
+    return channel
+
+
+def gemini_request_options(asynchronous: bool = True, timeout: Optional[float] = None) -> Dict:
+    """Per-call deadline; the SDK's own retries on UNAVAILABLE are bounded by it too (default 600s)"""
+    from google.api_core import exceptions, retry, retry_async
+
+    timeout = settings.gemini_timeout if timeout is None else timeout
+    policy = retry_async.AsyncRetry if asynchronous else retry.Retry
+    return {
+        "timeout": timeout,
+        "retry": policy(
+            initial=0.25,
+            maximum=2.0,
+            multiplier=2,
+            predicate=retry.if_exception_type(exceptions.ServiceUnavailable),
+            timeout=timeout
+        )
+    }
+
+
+class ThreadedStream:
+    """Async view of a blocking streamed response, iterated on the blocking-I/O pool"""
+
+    def __init__(self, response):
+        self._response = response
+        self._chunks = iter(response)
+        self._iterator = self._iterate()
+
+    @property
+    def usage_metadata(self):
+        return self._response.usage_metadata
+
+    async def _iterate(self):
+        done = object()
+        try:
+            while True:
+                chunk = await run_blocking(next, self._chunks, done)
+                if chunk is done:
+                    return
+                yield chunk
+        finally:
+            # Closes the HTTP response if the stream is abandoned part-way
+            cancel = getattr(getattr(self._response, "_iterator", None), "cancel", None)
+            if cancel is not None:
+                cancel()
+
+    def __aiter__(self):
+        return self._iterator
+
+
+async def wait_until_connected(channel, timeout: float):
+    """Open a gRPC channel's connection now rather than on the first call"""
+    try:
+        await asyncio.wait_for(channel.channel_ready(), timeout)
+    except asyncio.TimeoutError:
+        logger.warning("⚠️ Gemini channel not connected after %.0fs", timeout)
@@ -0,0 +1,280 @@
+"""Offline load benchmark for the chat API
+
+Runs the app in-process against the fake Firebase and Gemini backends
+(app/services/fakes.py), so it needs no network or credentials, and reports
+throughput and p50/p95/p99 latency per endpoint and concurrency level.
+
+    python -m benchmarks.load                   # run and compare with benchmarks/baseline.json
+    python -m benchmarks.load --save            # run and record a new baseline
+    python -m benchmarks.load --endpoints chat --concurrency 1 16 64
+
+Backend latencies come from the FAKE_* settings and can be overridden with
+environment variables (e.g. FAKE_GENERATION_LATENCY=1.0). Each level runs
+--repeat times and keeps its best figures, so one noisy run neither fails
+the comparison nor ends up in a saved baseline.
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import sys
+import time
+from typing import Dict, List, Optional, Tuple
+
+# Offline backends; set before the app (and so its settings) is imported
+OFFLINE_ENV = {
+    "GEMINI_API_KEY": "offline",
+    "FIREBASE_DB_URL": "https://offline.invalid",
+    "FIREBASE_BACKEND": "fake",
+    "GEMINI_BACKEND": "fake",
+    "FAKE_HISTORY_SIZE": "1000",
+    "FAKE_READ_LATENCY": "0.02",
+    "FAKE_GENERATION_LATENCY": "0.2",
+    "HISTORY_STORE_ENABLED": "false",
+    "ROLLUPS_ENABLED": "false",
+    "INGEST_ENABLED": "true",
+    "INGEST_TOKEN": "benchmark",
+    # Measure sustained ingest throughput, not load shedding
+    "INGEST_MAX_PENDING": "1000000",
+    "LOG_LEVEL": "WARNING",
+}
+for name, value in OFFLINE_ENV.items():
+    os.environ.setdefault(name, value)
+
+import numpy as np
+from app.main import app
+
+# Request numbers are unique across levels so chat questions never repeat
+_sequence = itertools.count()
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+
+# Samples per ingest request; ingest results also report samples/s, timed until written
+INGEST_BATCH = 100
+SAMPLES_PER_REQUEST = {"ingest": INGEST_BATCH}
+
+# Endpoint name -> (method, path, body for the i-th request)
+ENDPOINTS = {
+    # Distinct questions, so every request goes past the fast path and response cache to the model
+    "chat": ("POST", "/api/chat/", lambda i: {"message": f"How can I improve my walking? (#{i})"}),
+    "gait-data": ("GET", "/api/chat/gait-data", lambda i: None),
+    "ingest": ("POST", "/api/gait/ingest", lambda i: {"samples": [
+        {"cadence": 100 + (i + n) % 20, "walkingSpeed": 1.2, "strideLength": 1.3, "equilibriumScore": 0.8}
+        for n in range(INGEST_BATCH)
+    ]}),
+}
+
+
+class ASGIDriver:
+    """Calls an ASGI app directly: no sockets, no HTTP client overhead"""
+
+    def __init__(self, app):
+        self.app = app
+        self._lifespan: Optional[Tuple[asyncio.Task, asyncio.Queue, asyncio.Queue]] = None
+
+    async def startup(self):
+        inbox, outbox = asyncio.Queue(), asyncio.Queue()
+        task = asyncio.create_task(self.app({"type": "lifespan", "asgi": {"version": "3.0"}}, inbox.get, outbox.put))
+        await inbox.put({"type": "lifespan.startup"})
+        message = await outbox.get()
+        if message["type"] != "lifespan.startup.complete":
+            raise RuntimeError(f"Startup failed: {message.get('message')}")
+        self._lifespan = (task, inbox, outbox)
+
+        # Services are built and warmed in the background; measure the warm server
+        while await self.request("GET", "/api/chat/ready") != 200:
+            await asyncio.sleep(0.05)
+
+    async def shutdown(self):
+        if self._lifespan:
+            task, inbox, outbox = self._lifespan
+            await inbox.put({"type": "lifespan.shutdown"})
+            await outbox.get()
+            await task
+
+    async def request(self, method: str, path: str, body: Optional[Dict] = None) -> int:
+        """Send one request and read the whole (possibly streamed) response; returns the status"""
+        payload = json.dumps(body).encode() if body is not None else b""
+        scope = {
+            "type": "http",
+            "asgi": {"version": "3.0"},
+            "http_version": "1.1",
+            "method": method,
+            "scheme": "http",
+            "path": path,
+            "raw_path": path.encode(),
+            "query_string": b"",
+            "root_path": "",
+            "headers": [(b"host", b"benchmark"), (b"content-type", b"application/json"),
+                        (b"content-length", str(len(payload)).encode()),
+                        (b"x-ingest-token", os.environ["INGEST_TOKEN"].encode())],
+            "client": ("127.0.0.1", 0),
+            "server": ("benchmark", 80),
+        }
+        finished = asyncio.Event()
+        sent_body = False
+        status = 0
+
+        async def receive():
+            nonlocal sent_body
+            if not sent_body:
+                sent_body = True
+                return {"type": "http.request", "body": payload, "more_body": False}
+            await finished.wait()
+            return {"type": "http.disconnect"}
+
+        async def send(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body" and not message.get("more_body", False):
+                finished.set()
+
+        await self.app(scope, receive, send)
+        finished.set()
+        return status
+
+
+async def run_level(driver: ASGIDriver, endpoint: str, concurrency: int, total: int) -> Dict:
+    """Send `total` requests from `concurrency` concurrent workers"""
+    method, path, make_body = ENDPOINTS[endpoint]
+    latencies: List[float] = []
+    statuses: Dict[int, int] = {}
+    remaining = iter(range(total))
+
+    async def worker():
+        for _ in remaining:
+            body = make_body(next(_sequence))
+            started = time.perf_counter()
+            status = await driver.request(method, path, body)
+            latencies.append(time.perf_counter() - started)
+            statuses[status] = statuses.get(status, 0) + 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*[worker() for _ in range(concurrency)])
+    if endpoint in SAMPLES_PER_REQUEST:
+        # Until everything accepted has been written to the (fake) database
+        while driver.app.state.services.ingest.pending:
+            await asyncio.sleep(0.001)
+    elapsed = time.perf_counter() - started
+
+    p50, p95, p99 = np.percentile(np.array(latencies) * 1000, [50, 95, 99])
+    result = {
+        "endpoint": endpoint,
+        "concurrency": concurrency,
+        "requests": total,
+        "errors": sum(count for status, count in statuses.items() if not 200 <= status < 300),
+        "throughput_rps": round(total / elapsed, 2),
+        "p50_ms": round(float(p50), 2),
+        "p95_ms": round(float(p95), 2),
+        "p99_ms": round(float(p99), 2),
+    }
+    if endpoint in SAMPLES_PER_REQUEST:
+        result["samples_per_s"] = round(total * SAMPLES_PER_REQUEST[endpoint] / elapsed, 1)
+    return result
+
+
+def best_of(runs: List[Dict]) -> Dict:
+    """The best figures of repeated runs of one level (noise only ever makes a run slower)"""
+    best = dict(min(runs, key=lambda r: r["p95_ms"]))
+    best["throughput_rps"] = max(r["throughput_rps"] for r in runs)
+    if "samples_per_s" in best:
+        best["samples_per_s"] = max(r["samples_per_s"] for r in runs)
+    # Errors are not noise: the worst run counts
+    best["errors"] = max(r["errors"] for r in runs)
+    best["runs"] = len(runs)
+    return best
+
+
+async def run(endpoints: List[str], levels: List[int], per_worker: int, minimum: int, repeat: int = 1) -> List[Dict]:
+    driver = ASGIDriver(app)
+    await driver.startup()
+    try:
+        results = []
+        for endpoint in endpoints:
+            # Warm caches and connection-free code paths before measuring
+            await run_level(driver, endpoint, 2, 4)
+            for concurrency in levels:
+                total = max(minimum, concurrency * per_worker)
+                result = best_of([await run_level(driver, endpoint, concurrency, total) for _ in range(repeat)])
+                print_result(result)
+                results.append(result)
+        return results
+    finally:
+        await driver.shutdown()
+
+
+def print_result(result: Dict):
+    print(f"{result['endpoint']:>10}  c={result['concurrency']:<4} n={result['requests']:<5} "
+          f"{result['throughput_rps']:>9.1f} req/s  p50 {result['p50_ms']:>8.1f} ms  "
+          f"p95 {result['p95_ms']:>8.1f} ms  p99 {result['p99_ms']:>8.1f} ms  errors {result['errors']}"
+          + (f"  {result['samples_per_s']:.0f} samples/s" if "samples_per_s" in result else ""))
+
+
+def compare(results: List[Dict], baseline: Dict, tolerance: float, slack_ms: float = 0.0) -> List[str]:
+    """Describe results whose p95 or throughput is worse than the baseline by more than `tolerance`
+
+    p95 may also exceed the baseline by `slack_ms` on top of that: a few
+    milliseconds of scheduler jitter is most of a sub-10 ms latency.
+    """
+    recorded = {(r["endpoint"], r["concurrency"]): r for r in baseline.get("results", [])}
+    regressions = []
+    for result in results:
+        base = recorded.get((result["endpoint"], result["concurrency"]))
+        if not base:
+            continue
+        label = f"{result['endpoint']} c={result['concurrency']}"
+        if result["p95_ms"] > base["p95_ms"] * (1 + tolerance) + slack_ms:
+            regressions.append(f"{label}: p95 {result['p95_ms']} ms vs baseline {base['p95_ms']} ms")
+        if result["throughput_rps"] < base["throughput_rps"] * (1 - tolerance):
+            regressions.append(f"{label}: {result['throughput_rps']} req/s vs baseline {base['throughput_rps']} req/s")
+        if result["errors"] > base["errors"]:
+            regressions.append(f"{label}: {result['errors']} errors vs baseline {base['errors']}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline load benchmark for the chat API")
+    parser.add_argument("--endpoints", nargs="+", choices=list(ENDPOINTS), default=list(ENDPOINTS))
+    parser.add_argument("--concurrency", nargs="+", type=int, default=[1, 8, 32])
+    parser.add_argument("--requests-per-worker", type=int, default=10)
+    parser.add_argument("--min-requests", type=int, default=50)
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--save", action="store_true", help="record these results as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed relative regression")
+    parser.add_argument("--slack-ms", type=float, default=2.0, help="allowed p95 regression on top of the tolerance")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per level; the best figures are kept")
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args.endpoints, args.concurrency, args.requests_per_worker, args.min_requests,
+                              max(1, args.repeat)))
+    config = {name: os.environ[name] for name in OFFLINE_ENV if name.startswith("FAKE_")}
+
+    if args.save:
+        with open(args.baseline, "w") as f:
+            json.dump({"config": config, "results": results}, f, indent=2)
+            f.write("\n")
+        print(f"\n✅ Baseline saved to {args.baseline}")
+        return
+
+    if not os.path.exists(args.baseline):
+        print(f"\n⚠️ No baseline at {args.baseline}; run with --save to record one")
+        return
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    if baseline.get("config") != config:
+        print(f"\n⚠️ Baseline was recorded with different fake backend settings: {baseline.get('config')}")
+
+    regressions = compare(results, baseline, args.tolerance, args.slack_ms)
+    if regressions:
+        print("\n❌ Regressions against baseline:")
+        for line in regressions:
+            print(f"   {line}")
+        sys.exit(1)
+    print("\n✅ No regressions against baseline")
+
+
+if __name__ == "__main__":
+    main()
@@ -13,7 +13,7 @@ try:
     
     if current:
         print("\n✅ SUCCESS! Current Data:")
-        for key, value in current.items():
+        for key, value in current.to_dict().items():
             if isinstance(value, (int, float)):
                 print(f"   {key}: {value:.2f}" if isinstance(value, float) else f"   {key}: {value}")
             else:
@@ -27,8 +27,8 @@ try:
     
     if averages:
         print("\n✅ SUCCESS! Average Data:")
-        print(f"   Avg Score: {averages.get('avgGaitScoreLast20', 'N/A')}")
-        print(f"   Classification: {averages.get('avgClassificationLast20', 'N/A')}")
+        print(f"   Avg Score: {averages.avg_gait_score}")
+        print(f"   Classification: {averages.classification}")
     else:
         print("\n❌ FAILED to get averages")
     
@@ -0,0 +1,28 @@
+import asyncio
+import time
+from app.services.firebase_service import FirebaseService
+from app.services.gemini_service import GeminiService
+
+print("="*70)
+print("Prompt Size: Inline Guidance vs System Instruction")
+print("="*70 + "\n")
+
+QUESTION = "Is my walking speed normal? Should I be concerned?"
+
+async def main():
+    firebase_service = FirebaseService()
+    gemini_service = GeminiService()
+    
+    gait_data = await firebase_service.get_all_data_async()
+    
+    report = await gemini_service.prompt_token_report(QUESTION, gait_data)
+    print(f"Model: {report['model']} (system instruction: {'✅' if report['system_instruction'] else '❌ inline'})")
+    print(f"Input tokens before (guidance inline): {report['inline_prompt_tokens']}")
+    print(f"Input tokens after (per-request block): {report['per_request_tokens']}")
+    print(f"Input tokens sent per request with this model: {report['sent_prompt_tokens']}")
+    
+    start = time.perf_counter()
+    response = await gemini_service.generate_response(QUESTION, gait_data)
+    print(f"\nResponse in {time.perf_counter() - start:.2f}s:\n{response}")
+
+asyncio.run(main())
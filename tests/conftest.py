@@ -0,0 +1,48 @@
+import os
+
+# Offline backends, set before the app (and so its settings) is imported
+os.environ.update({
+    "GEMINI_API_KEY": "offline",
+    "FIREBASE_DB_URL": "https://offline.invalid",
+    "FIREBASE_BACKEND": "fake",
+    "GEMINI_BACKEND": "fake",
+    "FAKE_HISTORY_SIZE": "50",
+    "FAKE_READ_LATENCY": "0",
+    "FAKE_GENERATION_LATENCY": "0",
+    "HISTORY_STORE_ENABLED": "false",
+    "ROLLUPS_ENABLED": "false",
+    "LOG_LEVEL": "WARNING",
+})
+
+import time
+import pytest
+from fastapi.testclient import TestClient
+from app.config.settings import get_settings
+from app.services import realtime_db
+from app.services.fakes import FakeRealtimeDatabase
+
+
+@pytest.fixture
+def settings():
+    """The shared settings object; change fields with monkeypatch so they are restored"""
+    return get_settings()
+
+
+@pytest.fixture
+def fake_db(monkeypatch, settings):
+    """A fresh fake database holding `fake_history_size` generated samples"""
+    database = FakeRealtimeDatabase.with_history(settings.fake_history_size)
+    monkeypatch.setattr(realtime_db, "_fake", database)
+    return database
+
+
+@pytest.fixture
+def client(fake_db):
+    """The app, started and warmed up against the fakes"""
+    from app.main import app
+    with TestClient(app) as client:
+        deadline = time.monotonic() + 10
+        while client.get("/api/chat/ready").status_code != 200:
+            assert time.monotonic() < deadline, "app did not become ready"
+            time.sleep(0.01)
+        yield client
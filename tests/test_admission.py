@@ -0,0 +1,60 @@
+import asyncio
+import pytest
+from app.services.admission import AdmissionController, OverloadedError
+
+QUESTION = "What should I work on before my next physiotherapy visit?"
+
+
+def test_full_queue_is_shed_with_a_retry_hint():
+    async def scenario():
+        admission = AdmissionController(max_concurrent=1, max_queue=0, queue_timeout=1.0)
+        await admission.acquire()
+        with pytest.raises(OverloadedError) as shed:
+            await admission.acquire()
+        return admission, shed.value
+
+    admission, error = asyncio.run(scenario())
+    assert error.retry_after >= 1 and admission.rejected == 1
+
+
+def test_queue_timeout_is_shed():
+    async def scenario():
+        admission = AdmissionController(max_concurrent=1, max_queue=4, queue_timeout=0.01)
+        await admission.acquire()
+        with pytest.raises(OverloadedError, match="Timed out"):
+            await admission.acquire()
+        return admission
+
+    admission = asyncio.run(scenario())
+    assert admission.timed_out == 1 and admission.queued == 0
+
+
+def test_freed_slots_go_to_the_lowest_priority_first():
+    async def scenario():
+        admission = AdmissionController(max_concurrent=1, max_queue=4, queue_timeout=1.0)
+        await admission.acquire()
+        order = []
+
+        async def waiter(name, priority):
+            await admission.acquire(priority)
+            order.append(name)
+            admission.release()
+
+        tasks = [asyncio.create_task(waiter("batch", 1)), asyncio.create_task(waiter("chat", 0))]
+        await asyncio.sleep(0)
+        admission.release()
+        await asyncio.gather(*tasks)
+        return order
+
+    assert asyncio.run(scenario()) == ["chat", "batch"]
+
+
+def test_chat_answers_429_when_overloaded(client, monkeypatch):
+    admission = client.app.state.services.gemini_service.admission
+    # Every slot busy and no room to queue
+    monkeypatch.setattr(admission, "_active", admission.max_concurrent)
+    monkeypatch.setattr(admission, "max_queue", 0)
+
+    reply = client.post("/api/chat/", json={"message": QUESTION})
+
+    assert reply.status_code == 429 and int(reply.headers["Retry-After"]) >= 1
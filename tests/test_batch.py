@@ -0,0 +1,53 @@
+from app.services.fakes import FakeGenerativeModel
+
+QUESTIONS = [
+    "How can I improve my stride?",
+    "Which exercises help with postural sway?",
+    "Should I walk more in the mornings?",
+]
+
+
+def test_one_failing_question_does_not_fail_the_others(client, monkeypatch):
+    answer = FakeGenerativeModel.generate_content_async
+
+    async def fail_on_sway(self, contents, **kwargs):
+        if "postural sway" in str(contents):
+            raise RuntimeError("model unavailable")
+        return await answer(self, contents, **kwargs)
+    monkeypatch.setattr(FakeGenerativeModel, "generate_content_async", fail_on_sway)
+
+    reply = client.post("/api/chat/batch", json={"questions": QUESTIONS})
+
+    assert reply.status_code == 200
+    results = reply.json()["results"]
+    assert [result["question"] for result in results] == QUESTIONS
+    assert results[1]["response"] is None and "model unavailable" in results[1]["error"]
+    assert all(results[i]["response"] and results[i]["error"] is None for i in (0, 2))
+    assert "cadence" in reply.json()["gait_data_summary"]
+
+
+def test_too_many_questions_answer_400(client, monkeypatch, settings):
+    monkeypatch.setattr(settings, "batch_max_questions", 2)
+
+    assert client.post("/api/chat/batch", json={"questions": QUESTIONS}).status_code == 400
+    assert client.post("/api/chat/batch", json={"questions": []}).status_code == 400
+
+
+def test_gait_data_is_fetched_and_the_context_built_once(client, monkeypatch):
+    services = client.app.state.services
+    calls = {"fetch": 0, "context": 0}
+
+    def counted(name, func):
+        def wrapper(*args, **kwargs):
+            calls[name] += 1
+            return func(*args, **kwargs)
+        return wrapper
+    monkeypatch.setattr(services.firebase_service, "get_all_data_async",
+                        counted("fetch", services.firebase_service.get_all_data_async))
+    monkeypatch.setattr(services.gemini_service, "create_comprehensive_context",
+                        counted("context", services.gemini_service.create_comprehensive_context))
+
+    reply = client.post("/api/chat/batch", json={"questions": QUESTIONS})
+
+    assert all(result["response"] for result in reply.json()["results"])
+    assert calls == {"fetch": 1, "context": 1}
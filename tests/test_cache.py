@@ -0,0 +1,93 @@
+import threading
+from app.services.cache import CachedCall
+
+
+def test_ttl_single_flight():
+    calls = []
+    release = threading.Event()
+
+    def fetch():
+        calls.append(1)
+        release.wait(1)
+        return len(calls)
+
+    cache = CachedCall("test", fetch, ttl=60)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get())) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert results == [1] * 5
+    assert len(calls) == 1
+    assert cache.get() == 1
+
+
+def test_failed_fetch_is_not_cached():
+    values = iter([RuntimeError("down"), "ok"])
+
+    def fetch():
+        value = next(values)
+        if isinstance(value, Exception):
+            raise value
+        return value
+
+    cache = CachedCall("test", fetch, ttl=60)
+    try:
+        cache.get()
+    except RuntimeError:
+        pass
+    assert cache.get() == "ok"
+    assert cache.stats()["errors"] == 1
+
+
+def test_set_wins_over_a_refresh_that_started_before_it():
+    started, release = threading.Event(), threading.Event()
+    reads = iter(["old", "stale read"])
+
+    def fetch():
+        value = next(reads)
+        if value == "stale read":
+            started.set()
+            release.wait(1)
+        return value
+
+    cache = CachedCall("test", fetch, ttl=0, mode="swr", max_stale=60)
+    assert cache.get() == "old"
+
+    # Serves "old" and starts a background refresh, which blocks mid-read
+    assert cache.get() == "old"
+    assert started.wait(1)
+    cache.set("written")
+    release.set()
+
+    for _ in range(100):
+        if cache.stats()["refreshes"] == 2:
+            break
+        threading.Event().wait(0.01)
+    assert cache.stats()["refreshes"] == 2
+    cache.ttl = 60
+    assert cache.get() == "written"
+
+
+def test_miss_waiting_on_an_older_fetch_gets_the_newer_value():
+    started, release = threading.Event(), threading.Event()
+
+    def fetch():
+        started.set()
+        release.wait(1)
+        return "stale read"
+
+    cache = CachedCall("test", fetch, ttl=60)
+    result = []
+    reader = threading.Thread(target=lambda: result.append(cache.get()))
+    reader.start()
+    assert started.wait(1)
+    cache.set("written")
+    release.set()
+    reader.join()
+
+    assert result == ["written"]
+    assert cache.get() == "written"
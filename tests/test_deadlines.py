@@ -0,0 +1,67 @@
+import time
+import pytest
+from app.services.deadlines import DeadlineExceeded, deadline_after, remaining
+from app.services.fakes import FakeGenerativeModel
+
+QUESTION = "Why does my balance feel worse in the evening?"
+
+
+@pytest.fixture
+def gemini_service(client):
+    return client.app.state.services.gemini_service
+
+
+def test_clients_cannot_extend_the_server_deadline(monkeypatch, settings):
+    monkeypatch.setattr(settings, "chat_deadline", 5.0)
+
+    assert deadline_after(60) - time.monotonic() <= 5.0
+    assert deadline_after(0.5) - time.monotonic() <= 0.5
+    with pytest.raises(DeadlineExceeded):
+        remaining(time.monotonic() - 1)
+
+
+def test_slow_model_answers_504(client, gemini_service, monkeypatch):
+    monkeypatch.setattr(gemini_service.model, "latency", 2.0)
+
+    started = time.monotonic()
+    reply = client.post("/api/chat/", json={"message": QUESTION, "timeout": 0.2})
+
+    assert reply.status_code == 504
+    assert time.monotonic() - started < 1.5
+
+
+def test_deadline_running_out_in_the_admission_queue_answers_504(client, gemini_service, monkeypatch):
+    admission = gemini_service.admission
+    monkeypatch.setattr(admission, "_active", admission.max_concurrent)
+
+    reply = client.post("/api/chat/", json={"message": QUESTION, "timeout": 0.1})
+
+    assert reply.status_code == 504
+    assert admission.queued == 0
+
+
+def test_hedge_answers_when_the_primary_is_slow(client, gemini_service, monkeypatch, settings):
+    hedge = FakeGenerativeModel("gemini-1.5-flash-8b")
+    monkeypatch.setattr(gemini_service.model, "latency", 2.0)
+    monkeypatch.setattr(gemini_service, "hedge_model", hedge)
+    monkeypatch.setattr(settings, "gemini_hedge_delay", 0.05)
+
+    reply = client.post("/api/chat/", json={"message": QUESTION, "timeout": 1.0})
+
+    assert reply.status_code == 200 and reply.json()["usage"]["source"] == "model"
+    assert hedge.calls == 1
+
+
+def test_hedge_needs_a_free_admission_slot(client, gemini_service, monkeypatch, settings):
+    hedge = FakeGenerativeModel("gemini-1.5-flash-8b")
+    monkeypatch.setattr(gemini_service.model, "latency", 0.3)
+    monkeypatch.setattr(gemini_service, "hedge_model", hedge)
+    monkeypatch.setattr(gemini_service.admission, "max_concurrent", 1)
+    monkeypatch.setattr(settings, "gemini_hedge_delay", 0.05)
+
+    reply = client.post("/api/chat/", json={"message": QUESTION, "timeout": 2.0})
+
+    # The primary holds the only slot, so the hedge is skipped and the primary answers
+    assert reply.status_code == 200 and reply.json()["usage"]["source"] == "model"
+    assert hedge.calls == 0
+    assert gemini_service.admission.stats()["active"] == 0
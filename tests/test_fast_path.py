@@ -0,0 +1,62 @@
+import pytest
+from app.models.schemas import GaitAverages, GaitSample
+from app.services.fast_path import FastPathResponder
+
+GAIT_DATA = {
+    "current": GaitSample(steps=4321, cadence=92.5, walking_speed=1.3, equilibrium_score=0.91),
+    "averages": GaitAverages(avg_gait_score=78.5, classification="Normal"),
+}
+
+
+@pytest.fixture
+def responder():
+    return FastPathResponder()
+
+
+@pytest.mark.parametrize("question, expected", [
+    ("What's my cadence?", "Your cadence is 92.50 steps/min, which is below optimal"),
+    ("how many steps have I taken today", "You've taken 4321 steps today!"),
+    ("Hey, show me my walking speed please", "Your walking speed is 1.30 m/s, which is optimal"),
+    ("What is my balance score right now?", "Your equilibrium score is 0.91/1.0"),
+])
+def test_lookups_are_answered_from_the_data(responder, question, expected):
+    assert responder.answer(question, GAIT_DATA).startswith(expected)
+
+
+def test_range_checks_use_the_status_logic(responder):
+    assert responder.answer("Is my cadence normal?", GAIT_DATA).startswith(
+        "Your cadence of 92.50 steps/min is below optimal")
+    assert responder.answer("is my walking speed healthy", GAIT_DATA).startswith(
+        "Yes! Your walking speed of 1.30 m/s is optimal")
+
+
+def test_gait_score_comes_from_the_averages(responder):
+    assert responder.answer("What is my gait score?", GAIT_DATA) == (
+        "Your average gait score is 78.50/100, which puts you in the Normal category.")
+
+
+@pytest.mark.parametrize("question", [
+    "How can I improve my cadence?",
+    "Why is my cadence low compared to last week?",
+    "What is my cadence and how do I raise it?",
+    "Is my posture affecting my stride?",
+])
+def test_open_ended_questions_fall_through_to_the_model(responder, question):
+    assert responder.answer(question, GAIT_DATA) is None
+
+
+def test_missing_values_render_as_na(responder):
+    gait_data = {"current": GaitSample(steps=10)}
+
+    assert responder.answer("what is my stride length", gait_data) == (
+        "Your stride length is N/A: the latest sample has no stride length reading.")
+    assert "N/A" in responder.answer("Is my cadence normal?", gait_data)
+    assert responder.answer("What is my cadence?", {"current": None}) is None  # no sample at all
+
+
+def test_stats_count_hits_and_fall_throughs(responder):
+    responder.answer("What's my cadence?", GAIT_DATA)
+    responder.answer("How can I improve my cadence?", GAIT_DATA)
+
+    assert responder.stats() == {
+        "answered": 1, "fell_through": 1, "hit_rate": 0.5, "intents": {"lookup:cadence": 1}}
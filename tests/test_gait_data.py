@@ -0,0 +1,79 @@
+import pytest
+
+
+@pytest.fixture
+def broadcaster(client):
+    return client.app.state.services.broadcaster
+
+
+def test_unchanged_data_answers_304(client):
+    first = client.get("/api/chat/gait-data")
+    etag = first.headers["ETag"]
+
+    assert first.status_code == 200 and first.json()["current"]
+    again = client.get("/api/chat/gait-data", headers={"If-None-Match": etag})
+    assert again.status_code == 304 and again.headers["ETag"] == etag
+    assert client.get("/api/chat/gait-data", headers={"If-None-Match": '"stale"'}).status_code == 200
+
+
+def test_long_poll_answers_304_when_the_wait_ends(client):
+    etag = client.get("/api/chat/gait-data").headers["ETag"]
+
+    reply = client.get("/api/chat/gait-data", params={"wait": 0.05}, headers={"If-None-Match": etag})
+
+    assert reply.status_code == 304
+
+
+def test_long_poll_answers_404_when_the_data_goes_during_the_wait(client, broadcaster, monkeypatch):
+    etag = client.get("/api/chat/gait-data").headers["ETag"]
+
+    async def data_removed(etag, timeout):
+        broadcaster.publish({"current": None})
+        return True
+    monkeypatch.setattr(broadcaster, "wait_for_change", data_removed)
+
+    reply = client.get("/api/chat/gait-data", params={"wait": 5}, headers={"If-None-Match": etag})
+
+    assert reply.status_code == 404
+
+
+def test_new_trends_change_the_etag(client, broadcaster):
+    etag = client.get("/api/chat/gait-data").headers["ETag"]
+
+    client.app.state.services.firebase_service.trends = {"daily": {"2026-10-17": {"samples": 1200}}}
+    broadcaster.invalidate()
+    reply = client.get("/api/chat/gait-data", headers={"If-None-Match": etag})
+
+    assert reply.status_code == 200 and reply.headers["ETag"] != etag
+    assert reply.json()["trends"]["daily"]["2026-10-17"]["samples"] == 1200
+
+
+def test_rollups_are_opt_in():
+    from app.config.settings import Settings
+    assert Settings.model_fields["rollups_enabled"].default is False
+
+
+def test_repeated_conditional_polls_share_one_read(client, fake_db):
+    etag = client.get("/api/chat/gait-data").headers["ETag"]
+    reads = fake_db.reads
+
+    for _ in range(20):
+        assert client.get("/api/chat/gait-data", headers={"If-None-Match": etag}).status_code == 304
+
+    # Within one poll interval every poller is answered from the feed's last read
+    assert fake_db.reads == reads
+
+
+def test_conditional_polls_do_not_read_firebase_with_a_live_snapshot(request, monkeypatch, settings, fake_db):
+    monkeypatch.setattr(settings, "firebase_live_snapshot", True)
+    monkeypatch.setattr(settings, "firebase_cache_ttl", 0)  # no read cache to hide Firebase reads
+    client = request.getfixturevalue("client")
+    broadcaster = client.app.state.services.broadcaster
+    monkeypatch.setattr(broadcaster, "poll_interval", 0)  # the feed re-reads on every request
+    etag = client.get("/api/chat/gait-data").headers["ETag"]
+    reads = fake_db.reads
+
+    for _ in range(20):
+        assert client.get("/api/chat/gait-data", headers={"If-None-Match": etag}).status_code == 304
+
+    assert fake_db.reads == reads
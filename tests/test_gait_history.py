@@ -0,0 +1,71 @@
+import threading
+import pytest
+from app.services.gait_history import GaitHistoryStore
+
+BASE = 1_700_000_000.0
+
+
+@pytest.fixture
+def store(tmp_path):
+    """A store holding 10 samples, one per second from BASE, cadence 100..109 (105 missing)"""
+    store = GaitHistoryStore(str(tmp_path / "history"), initial_capacity=4)
+    store.append([
+        (f"k{index:02d}", {"timestamp": (BASE + index) * 1000, "cadence": None if index == 5 else 100 + index})
+        for index in range(10)
+    ])
+    return store
+
+
+def test_range_is_sliced_inclusively(store):
+    result = store.query(start=BASE + 2, end=BASE + 4, metrics=["cadence"])
+
+    assert result["timestamps"] == [BASE + 2, BASE + 3, BASE + 4]
+    assert result["series"]["cadence"] == [102, 103, 104]
+    assert result["summary"]["cadence"] == {"count": 3, "mean": 103, "min": 102, "max": 104}
+
+
+def test_buckets_average_the_values_present(store):
+    result = store.query(metrics=["cadence"], bucket_seconds=4)
+
+    # Buckets start on multiples of 4 s: BASE is one, so [0-3], [4-7] (105 missing), [8-9]
+    assert result["timestamps"] == [BASE, BASE + 4, BASE + 8]
+    assert result["series"]["cadence"] == [101.5, (104 + 106 + 107) / 3, 108.5]
+
+
+def test_pages_with_offset_and_limit(store):
+    result = store.query(metrics=["cadence"], offset=4, limit=3)
+
+    assert result["total"] == 10
+    assert result["series"]["cadence"] == [104, None, 106]
+
+
+def test_missing_values_are_null(store):
+    result = store.query(start=BASE + 5, end=BASE + 5, metrics=["cadence"])
+
+    assert result["series"]["cadence"] == [None]
+    assert result["summary"]["cadence"] == {"count": 0, "mean": None, "min": None, "max": None}
+
+
+def test_sync_resumes_from_the_last_key(tmp_path, fake_db):
+    directory = str(tmp_path / "history")
+    store = GaitHistoryStore(directory)
+    assert store.sync(page_size=7) == 50
+
+    newest = fake_db.new_key()
+    fake_db.reference(f"gaitData/{newest}").set({"timestamp": BASE * 1000, "cadence": 99.0})
+    reopened = GaitHistoryStore(directory)
+
+    assert reopened.sync(page_size=7) == 1
+    assert reopened.count == 51 and reopened.last_key == newest
+
+
+def test_due_sync_does_not_wait_for_a_running_one(tmp_path, fake_db):
+    store = GaitHistoryStore(str(tmp_path / "history"))
+    store._sync_lock.acquire()
+    try:
+        done = threading.Event()
+        threading.Thread(target=lambda: (store.sync_if_due(), done.set())).start()
+        assert done.wait(2), "sync_if_due blocked on the running sync"
+    finally:
+        store._sync_lock.release()
+    assert store.count == 0
@@ -0,0 +1,39 @@
+import subprocess
+import sys
+import pytest
+from app.services.gemini_service import SYSTEM_INSTRUCTION, GeminiService
+
+
+@pytest.fixture
+def gait_data(fake_db):
+    from app.services.firebase_service import FirebaseService
+    return FirebaseService().get_all_data()
+
+
+def test_default_model_takes_the_guidance_as_system_instruction(gait_data):
+    service = GeminiService()
+
+    assert not service.inline_instruction
+    assert service.model.system_instruction == SYSTEM_INSTRUCTION
+    assert SYSTEM_INSTRUCTION not in service.build_prompt("How is my cadence?", gait_data)
+
+
+def test_models_without_system_instruction_get_it_inline(monkeypatch, settings, gait_data):
+    monkeypatch.setattr(settings, "gemini_model", "gemini-pro")
+    service = GeminiService()
+
+    assert service.inline_instruction
+    assert service.model.system_instruction is None
+    assert service.build_prompt("How is my cadence?", gait_data).startswith(SYSTEM_INSTRUCTION)
+
+
+def test_real_backends_do_not_import_the_fakes():
+    # A fresh interpreter: the test session itself has the fakes loaded
+    code = (
+        "import os, sys\n"
+        "os.environ.update(FIREBASE_BACKEND='firebase', GEMINI_BACKEND='gemini')\n"
+        "import app.main, app.services.gemini_service, app.services.firebase_service\n"
+        "assert 'app.services.fakes' not in sys.modules, 'fakes imported'\n"
+    )
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
@@ -0,0 +1,58 @@
+import pytest
+
+TOKEN = "sensor-secret"
+SAMPLE = {"cadence": 111.0, "walkingSpeed": 1.25, "strideLength": 1.3}
+
+
+@pytest.fixture
+def ingest_client(request, monkeypatch, settings):
+    """The app with ingest enabled; patched before startup builds the ingest buffer"""
+    monkeypatch.setattr(settings, "ingest_enabled", True)
+    monkeypatch.setattr(settings, "ingest_token", TOKEN)
+    return request.getfixturevalue("client")
+
+
+def post(client, samples, token=TOKEN):
+    headers = {"X-Ingest-Token": token} if token else {}
+    return client.post("/api/gait/ingest", json={"samples": samples}, headers=headers)
+
+
+def test_ingest_is_off_by_default(client):
+    assert post(client, [SAMPLE]).status_code == 404
+
+
+def test_ingest_stays_off_without_a_token(request, monkeypatch, settings):
+    monkeypatch.setattr(settings, "ingest_enabled", True)
+    client = request.getfixturevalue("client")
+
+    assert post(client, [SAMPLE]).status_code == 404
+
+
+@pytest.mark.parametrize("token", [None, "wrong"])
+def test_ingest_requires_the_token(ingest_client, token):
+    assert post(ingest_client, [SAMPLE], token=token).status_code == 401
+
+
+def test_ingested_samples_are_served_right_away(ingest_client):
+    reply = post(ingest_client, [SAMPLE])
+
+    assert reply.status_code == 202 and reply.json()["accepted"] == 1
+    current = ingest_client.get("/api/chat/gait-data").json()["current"]
+    assert current["cadence"] == 111.0 and current["walkingSpeed"] == 1.25
+
+
+def test_invalid_samples_are_reported_by_index(ingest_client):
+    reply = post(ingest_client, [SAMPLE, "oops", {"cadence": "fast"}, {"note": "no gait fields"}])
+
+    body = reply.json()
+    assert reply.status_code == 202 and body["accepted"] == 1
+    assert [error["index"] for error in body["rejected"]] == [1, 2, 3]
+    assert post(ingest_client, ["oops"]).status_code == 422
+
+
+def test_full_buffer_answers_429(ingest_client, monkeypatch):
+    monkeypatch.setattr(ingest_client.app.state.services.ingest, "max_pending", 2)
+
+    reply = post(ingest_client, [SAMPLE] * 3)
+
+    assert reply.status_code == 429 and int(reply.headers["Retry-After"]) >= 1
@@ -0,0 +1,51 @@
+import asyncio
+import pytest
+from app.models.schemas import GaitAverages, GaitSample
+from app.services.gemini_service import GeminiService
+from app.services.response_cache import ResponseCache, gait_fingerprint
+
+QUESTION = "How can I improve my walking?"
+
+
+def gait_data(**sections):
+    data = {
+        "latest_key": "-key",
+        "current": GaitSample(cadence=110.0, walking_speed=1.3),
+        "averages": GaitAverages(avg_gait_score=80.0, classification="Normal"),
+    }
+    data.update(sections)
+    return data
+
+
+def test_entries_expire_and_evict():
+    cache = ResponseCache(max_size=2, ttl=60)
+    fingerprint = gait_fingerprint(gait_data())
+    for question in ("a", "b", "c"):
+        cache.put(question, fingerprint, question.upper())
+
+    assert cache.get("a", fingerprint) is None
+    assert cache.get("c", fingerprint) == "C"
+
+
+@pytest.mark.parametrize("section, before, after", [
+    ("rolling", {"cadence": {"count": 5, "mean": 110.0}}, {"cadence": {"count": 6, "mean": 112.0}}),
+    ("trends", {"daily": {"2026-10-17": {"count": 10}}}, {"daily": {"2026-10-17": {"count": 11}}}),
+])
+def test_fingerprint_covers_every_prompt_section(section, before, after):
+    assert gait_fingerprint(gait_data(**{section: before})) != gait_fingerprint(gait_data(**{section: after}))
+    assert gait_fingerprint(gait_data(**{section: before})) == gait_fingerprint(gait_data(**{section: dict(before)}))
+
+
+def test_new_trends_are_not_answered_from_the_cache():
+    service = GeminiService()
+
+    async def ask(data):
+        return await service.generate_response(QUESTION, data)
+
+    trends = {"weekly": {"2026-W42": {"count": 10, "metrics": {}}}}
+    asyncio.run(ask(gait_data(trends=trends)))
+    asyncio.run(ask(gait_data(trends=trends)))
+    assert service.model.calls == 1
+
+    asyncio.run(ask(gait_data(trends={"weekly": {"2026-W42": {"count": 11, "metrics": {}}}})))
+    assert service.model.calls == 2
@@ -0,0 +1,89 @@
+import random
+import time
+import pytest
+from app.services.fakes import fake_gait_sample, push_key
+from app.services.firebase_service import FirebaseService
+from app.services.rolling_stats import RollingGaitStats
+
+
+def samples(count, start_millis=1_700_000_000_000, seed=1):
+    rng = random.Random(seed)
+    return [
+        (push_key(start_millis + index * 1000, rng), fake_gait_sample(index, start_millis + index * 1000, rng))
+        for index in range(count)
+    ]
+
+
+def test_repeated_entries_are_counted_once():
+    stats = RollingGaitStats(window=100)
+    entries = samples(10)
+    stats.extend(entries)
+    summary = stats.summary()
+
+    for _ in range(3):
+        stats.extend(entries[-5:])
+        for key, sample in entries:
+            stats.add(key, sample)
+
+    assert stats.size == 10
+    assert stats.summary() == summary
+
+
+def test_repeat_of_the_newest_key_replaces_it():
+    stats = RollingGaitStats(window=100)
+    entries = samples(3)
+    stats.extend(entries)
+    key, sample = entries[-1]
+
+    stats.add(key, dict(sample, cadence=200.0))
+
+    assert stats.size == 3
+    assert stats.summary()["cadence"]["max"] == 200.0
+
+
+def test_overlapping_batches_add_only_new_samples():
+    stats = RollingGaitStats(window=100)
+    entries = samples(10)
+    stats.extend(entries[:6])
+    stats.extend(entries[3:])
+
+    reference = RollingGaitStats(window=100)
+    for key, sample in entries:
+        reference.add(key, sample)
+
+    assert stats.size == 10
+    for metric, expected in reference.summary().items():
+        assert stats.summary()[metric] == pytest.approx(expected)
+
+
+@pytest.fixture
+def service(monkeypatch, settings, fake_db):
+    monkeypatch.setattr(settings, "firebase_cache_mode", "off")
+    service = FirebaseService()
+    service.seed_rolling_stats()
+    return service
+
+
+def test_repeated_reads_leave_the_window_unchanged(monkeypatch, settings, service):
+    monkeypatch.setattr(settings, "firebase_latest_window", 5)
+    before = service.get_all_data()["rolling"]
+
+    for _ in range(10):
+        data = service.get_all_data()
+
+    assert service.rolling_stats.size == settings.fake_history_size
+    assert data["rolling"]["cadence"]["count"] == settings.fake_history_size
+    assert data["rolling"] == before
+
+
+def test_polling_keeps_every_sample_written_between_reads(fake_db, settings, service):
+    rng = random.Random(2)
+    now = int(time.time() * 1000) + 60_000
+    written = {push_key(now + index, rng): fake_gait_sample(index, now + index, rng) for index in range(3)}
+    fake_db.reference('gaitData').update(written)
+
+    latest_key, current = service.get_latest_gait_entry()
+
+    assert latest_key == max(written)
+    assert service.rolling_stats.size == settings.fake_history_size + 3
+    assert service.rolling_stats.last_key == latest_key
@@ -0,0 +1,47 @@
+import pytest
+from app.models.schemas import ChatResponse, GaitAverages, GaitSample
+from app.services.gait_analysis import REJECTED_SAMPLES, parse_averages, parse_sample
+from app.services.gait_ingest import validate_sample
+
+RAW = {"steps": "120", "cadence": 104.5, "walkingSpeed": "fast", "strideLength": float("nan"), "timestamp": 1700000000000}
+
+
+def test_invalid_fields_are_dropped_and_the_rest_kept():
+    errors = []
+    sample = GaitSample.from_firebase(RAW, errors)
+
+    assert sample.steps == 120 and sample.cadence == 104.5
+    assert sample.walking_speed is None and sample.stride_length is None
+    assert len(errors) == 2
+
+
+def test_strict_parsing_raises_on_an_invalid_field():
+    with pytest.raises(ValueError, match="walkingSpeed"):
+        GaitSample.from_firebase(RAW)
+    with pytest.raises(ValueError, match="walkingSpeed"):
+        validate_sample(RAW)
+
+
+def test_parse_sample_counts_dropped_fields_and_rejects_non_objects():
+    fields = REJECTED_SAMPLES.value(kind="field")
+    samples = REJECTED_SAMPLES.value(kind="sample")
+
+    assert parse_sample("k1", RAW).cadence == 104.5
+    assert parse_sample("k2", [1, 2, 3]) is None
+    assert parse_sample("k3", "oops") is None
+
+    assert REJECTED_SAMPLES.value(kind="field") == fields + 2
+    assert REJECTED_SAMPLES.value(kind="sample") == samples + 2
+
+
+def test_invalid_20_sample_score_falls_back_to_the_100_sample_one():
+    averages = parse_averages({"avgGaitScoreLast20": "n/a", "avgGaitScoreLast100": 81, "avgClassificationLast20": "Normal"})
+
+    assert averages == GaitAverages(avg_gait_score=81.0, classification="Normal")
+
+
+def test_chat_response_matches_its_model(client):
+    body = client.post("/api/chat/", json={"message": "How is my cadence?"}).json()
+
+    assert ChatResponse.model_validate(body).gait_data_summary == body["gait_data_summary"]
+    assert "cadence" in body["gait_data_summary"]
@@ -0,0 +1,101 @@
+import orjson
+import pytest
+from app.models.schemas import Message
+from app.services.fakes import FakeGenerativeModel, FakeStreamResponse
+from app.services.session_store import FirebaseSessionStore, InMemorySessionStore
+from app.services.shared_snapshot import serve_workers
+from app.services.tokens import estimate_tokens, message_tokens
+
+QUESTION = "How can I improve my walking?"
+
+
+def sse_events(body: str):
+    events = []
+    for block in body.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.splitlines())
+        events.append((lines["event"], orjson.loads(lines["data"])))
+    return events
+
+
+@pytest.fixture
+def store(client):
+    return client.app.state.services.session_store
+
+
+def test_answered_turns_are_recorded(client, store):
+    reply = client.post("/api/chat/", json={"message": QUESTION}).json()
+
+    session = store.get(reply["session_id"])
+    assert [msg.role for msg in session.messages] == ["user", "assistant"]
+    assert session.messages[1].content == reply["response"]
+
+
+def test_unknown_session_ids_are_not_adopted(client, store):
+    first = client.post("/api/chat/", json={"message": QUESTION, "session_id": "chosen-by-client"}).json()
+
+    assert first["session_id"] != "chosen-by-client" and len(first["session_id"]) == 32
+    assert store.get("chosen-by-client") is None
+
+    second = client.post("/api/chat/", json={"message": "And my balance?", "session_id": first["session_id"]}).json()
+    assert second["session_id"] == first["session_id"]
+    assert len(store.get(first["session_id"]).messages) == 4
+
+
+def test_failed_generation_is_not_recorded(client, store, monkeypatch):
+    async def fail(self, contents, **kwargs):
+        raise RuntimeError("model unavailable")
+    monkeypatch.setattr(FakeGenerativeModel, "generate_content_async", fail)
+
+    reply = client.post("/api/chat/", json={"message": QUESTION}).json()
+
+    assert reply["usage"]["source"] == "error"
+    assert store.get(reply["session_id"]) is None
+
+
+def test_failed_stream_keeps_no_partial_reply(client, store, monkeypatch):
+    async def broken_chunks(self):
+        yield type("Chunk", (), {"text": "Your gait "})()
+        raise RuntimeError("stream reset")
+    monkeypatch.setattr(FakeStreamResponse, "_chunks", broken_chunks)
+
+    body = client.post("/api/chat/stream", json={"message": QUESTION}).text
+
+    assert [event for event, _ in sse_events(body)] == ["token", "error"]
+    assert store.stats()["sessions"] == 0
+
+
+def test_compaction_folds_old_turns_into_the_summary(monkeypatch, settings):
+    monkeypatch.setattr(settings, "history_token_budget", 40)
+    monkeypatch.setattr(settings, "history_summary_token_budget", 30)
+    store = InMemorySessionStore(max_sessions=10)
+    session = store.open()
+
+    for turn in range(10):
+        store.record_turn(session, f"Question {turn} about my cadence?", f"Answer {turn}. More detail follows here.")
+
+    assert sum(message_tokens(msg) for msg in session.messages) <= 40
+    assert session.messages[-1] == Message(role="assistant", content="Answer 9. More detail follows here.")
+    assert session.summary
+    assert estimate_tokens(session.summary) <= 30
+    assert "Question 0" not in session.summary  # the oldest summary lines went first
+    assert store.get(session.session_id) is session
+
+
+def test_firebase_sessions_are_shared_between_stores(fake_db):
+    worker_a, worker_b = FirebaseSessionStore(), FirebaseSessionStore()
+    session = worker_a.open()
+    worker_a.record_turn(session, QUESTION, "Take longer strides.")
+
+    shared = worker_b.get(session.session_id)
+    assert [msg.content for msg in shared.messages] == [QUESTION, "Take longer strides."]
+    assert worker_b.get("user/42.a") is None  # not a valid Firebase key, looked up hashed
+
+    worker_b.delete(session.session_id)
+    assert worker_a.get(session.session_id) is None
+
+
+def test_workers_refuse_an_in_memory_session_store(monkeypatch, settings):
+    monkeypatch.setattr(settings, "session_backend", "memory")
+
+    with pytest.raises(SystemExit, match="SESSION_BACKEND"):
+        serve_workers(2, host="127.0.0.1", port=0)
@@ -0,0 +1,92 @@
+import pytest
+from app.models.schemas import GaitAverages, GaitSample
+from app.services import shared_snapshot
+from app.services.shared_snapshot import (
+    SEQUENCE, SEQUENCE_OFFSET, SharedGaitSnapshot, SharedSnapshotWriter, encode_snapshot
+)
+
+SIZE = 4096
+
+
+def snapshot(key: str, cadence: float) -> dict:
+    return {
+        "latest_key": key,
+        "current": GaitSample(steps=120, cadence=cadence),
+        "averages": GaitAverages(avg_gait_score=78.5, classification="Normal"),
+    }
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "gait.snapshot")
+
+
+@pytest.fixture
+def writer(path):
+    writer = SharedSnapshotWriter(path, SIZE)
+    yield writer
+    writer.close()
+
+
+@pytest.fixture
+def reader(path, writer):
+    reader = SharedGaitSnapshot(path)
+    yield reader
+    reader.close()
+
+
+def test_round_trip(writer, reader):
+    assert not reader.ready
+
+    writer.write(encode_snapshot(snapshot("k1", 104.0)))
+
+    assert reader.ready and reader.version == 1
+    assert reader.read() == snapshot("k1", 104.0)
+
+
+def test_payload_is_decoded_once_per_version(writer, reader, monkeypatch):
+    decoded = []
+    decode = shared_snapshot.decode_snapshot
+    monkeypatch.setattr(shared_snapshot, "decode_snapshot", lambda payload: decoded.append(1) or decode(payload))
+
+    writer.write(encode_snapshot(snapshot("k1", 104.0)))
+    for _ in range(5):
+        reader.read()
+    writer.write(encode_snapshot(snapshot("k2", 106.0)))
+
+    assert reader.read()["current"].cadence == 106.0
+    assert len(decoded) == 2
+
+
+def test_reopened_writer_keeps_the_sequence(path, writer, reader):
+    writer.write(encode_snapshot(snapshot("k1", 104.0)))
+    writer.write(encode_snapshot(snapshot("k2", 106.0)))
+
+    restarted = SharedSnapshotWriter(path, SIZE)
+    assert reader.version == 2 and reader.read()["latest_key"] == "k2"
+    restarted.write(encode_snapshot(snapshot("k3", 108.0)))
+    restarted.close()
+
+    assert reader.version == 3 and reader.read()["latest_key"] == "k3"
+
+
+def test_recovers_from_a_writer_that_died_mid_write(path, writer, reader):
+    writer.write(encode_snapshot(snapshot("k1", 104.0)))
+    assert reader.read()["latest_key"] == "k1"
+
+    # Died after making the sequence odd, before the payload was complete
+    SEQUENCE.pack_into(writer._map, SEQUENCE_OFFSET, 3)
+    writer._map[shared_snapshot.HEADER_SIZE:shared_snapshot.HEADER_SIZE + 8] = b"{garbage"
+    assert reader.read()["latest_key"] == "k1"  # the last good version is served meanwhile
+
+    restarted = SharedSnapshotWriter(path, SIZE)
+    restarted.write(encode_snapshot(snapshot("k2", 106.0)))
+    restarted.close()
+
+    assert reader.version == 3  # the dead write's version is skipped, never reused
+    assert reader.read() == snapshot("k2", 106.0)
+
+
+def test_oversized_payload_is_refused(writer):
+    with pytest.raises(ValueError, match="does not fit"):
+        writer.write(b"x" * SIZE)
@@ -0,0 +1,82 @@
+from app.models.schemas import Message, TokenUsage
+from app.services.gemini_service import GeminiService
+from app.services.tokens import (
+    TRUNCATION_MARK, PromptSections, estimate_tokens, message_tokens, truncate_to_tokens
+)
+
+CONTEXT = "CURRENT GAIT DATA: cadence 108 steps/min, walking speed 1.25 m/s."
+
+
+def sections(history_turns=4, question="How is my gait today?", summary="USER: asked about cadence"):
+    return PromptSections(
+        instruction_tokens=100,
+        context=CONTEXT,
+        summary=summary,
+        history=[Message(role="user" if turn % 2 == 0 else "assistant", content=f"Message number {turn} here.")
+                 for turn in range(history_turns)],
+        question=question
+    )
+
+
+def test_estimate_counts_digits_words_and_punctuation():
+    assert estimate_tokens("") == 0 and estimate_tokens(None) == 0
+    assert estimate_tokens("2024") == 4  # one token per digit
+    assert estimate_tokens("walking") == 2  # one per four letters
+    assert estimate_tokens("Hi, there!") == 5  # Hi + , + the|re + !
+
+
+def test_truncate_keeps_text_that_fits_and_marks_a_cut():
+    assert truncate_to_tokens("short question", 10) == "short question"
+
+    cut = truncate_to_tokens("word " * 100, 20)
+    assert cut.endswith(TRUNCATION_MARK)
+    assert estimate_tokens(cut) <= 20
+
+
+def test_fitting_prompt_is_left_alone():
+    fitted = sections().fit(budget=10_000, min_question_tokens=8)
+
+    assert fitted.trimmed == {} and len(fitted.history) == 4 and fitted.summary
+
+
+def test_oldest_history_goes_first():
+    full = sections()
+    over = sum(full.token_counts().values()) - message_tokens(full.history[0])
+
+    fitted = sections().fit(budget=over, min_question_tokens=8)
+
+    assert fitted.trimmed == {"history_message": 1}
+    assert [msg.content for msg in fitted.history] == [f"Message number {turn} here." for turn in (1, 2, 3)]
+    assert fitted.summary
+
+
+def test_summary_goes_after_the_history_then_the_question_is_cut():
+    question = "Tell me everything about my walking " * 20
+    fitted = sections(question=question).fit(budget=100 + estimate_tokens(CONTEXT) + 30, min_question_tokens=30)
+
+    assert fitted.trimmed == {"history_message": 4, "summary": 1, "question": 1}
+    assert fitted.history == [] and fitted.summary is None
+    assert fitted.question.endswith(TRUNCATION_MARK) and estimate_tokens(fitted.question) <= 30
+
+
+def test_instruction_and_context_are_never_trimmed_and_the_question_keeps_its_minimum():
+    question = "Tell me everything about my walking " * 20
+    fitted = sections(question=question).fit(budget=10, min_question_tokens=40)
+
+    counts = fitted.token_counts()
+    assert fitted.context == CONTEXT and counts["instruction"] == 100
+    assert 30 < counts["question"] <= 40  # over budget rather than below the minimum
+
+
+def test_build_prompt_reports_sections_and_trims(fake_db, monkeypatch, settings):
+    from app.services.firebase_service import FirebaseService
+    gait_data = FirebaseService().get_all_data()
+    monkeypatch.setattr(settings, "prompt_token_budget", 1)
+    history = [Message(role="user", content="Earlier question about balance?")]
+    usage = TokenUsage()
+
+    prompt = GeminiService().build_prompt("How is my cadence?", gait_data, history, "USER: hi", usage=usage)
+
+    assert "Earlier question" not in prompt and "USER QUESTION: How is my cadence?" in prompt
+    assert usage.trimmed == {"history_message": 1, "summary": 1}
+    assert usage.prompt_sections["history"] == 0 and usage.prompt_sections["context"] > 0
@@ -0,0 +1,82 @@
+import dataclasses
+import orjson
+import pytest
+from app.services.gait_broadcaster import WS_RESYNCS
+
+WS_PATH = "/api/chat/ws"
+
+
+@pytest.fixture
+def services(client):
+    return client.app.state.services
+
+
+def receive(ws) -> dict:
+    return orjson.loads(ws.receive_text())
+
+
+def publish(client, services, *cadences):
+    """Publish one new sample per cadence on the app's event loop, with no await in between"""
+    data = services.firebase_service.get_all_data()
+
+    def publish_all():
+        for index, cadence in enumerate(cadences):
+            current = dataclasses.replace(data["current"], cadence=cadence)
+            services.broadcaster.publish({**data, "latest_key": f"zz-test-{index}", "current": current})
+    client.portal.call(publish_all)
+
+
+def test_first_message_is_the_full_snapshot(client):
+    with client.websocket_connect(WS_PATH) as ws:
+        message = receive(ws)
+
+    assert message["type"] == "gait_snapshot"
+    assert message["current"]["cadence"] and message["averages"]["avgClassificationLast20"]
+
+
+def test_deltas_carry_only_the_changed_fields(client, services):
+    with client.websocket_connect(WS_PATH) as ws:
+        snapshot = receive(ws)
+        publish(client, services, 123.0)
+        delta = receive(ws)
+
+    assert delta["type"] == "gait_delta" and delta["seq"] == snapshot["seq"] + 1
+    assert delta["current"] == {"cadence": 123.0}
+    assert "averages" not in delta
+
+
+def test_a_client_that_falls_behind_gets_a_fresh_snapshot(client, services, monkeypatch, settings):
+    monkeypatch.setattr(settings, "ws_max_pending", 2)
+    resyncs = WS_RESYNCS.value()
+
+    with client.websocket_connect(WS_PATH) as ws:
+        receive(ws)
+        publish(client, services, 101.0, 102.0, 103.0, 104.0, 105.0)
+        message = receive(ws)
+
+    assert message["type"] == "gait_snapshot" and message["current"]["cadence"] == 105.0
+    assert WS_RESYNCS.value() > resyncs
+
+
+def test_chat_replies_are_tagged_with_the_client_id(client):
+    with client.websocket_connect(WS_PATH) as ws:
+        ws.send_text(orjson.dumps({"type": "chat", "id": "q1", "message": "How can I improve my stride?"}).decode())
+        replies = []
+        while not replies or replies[-1]["type"] not in ("done", "error"):
+            message = receive(ws)
+            if message["type"] not in ("gait_snapshot", "gait_delta"):
+                replies.append(message)
+
+    assert [reply["type"] for reply in replies][-1] == "done"
+    assert {reply["type"] for reply in replies[:-1]} == {"token"}
+    assert all(reply["id"] == "q1" for reply in replies)
+    assert replies[-1]["session_id"] and replies[-1]["usage"]["source"] == "model"
+
+
+def test_ping_and_bad_messages(client):
+    with client.websocket_connect(WS_PATH) as ws:
+        receive(ws)
+        ws.send_text('{"type": "ping"}')
+        assert receive(ws)["type"] == "pong"
+        ws.send_text("not json")
+        assert receive(ws) == {"type": "error", "detail": "Messages must be JSON"}